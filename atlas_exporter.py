@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+atlas_exporter.py
+Atlas de diagrammes en tâche de fond (QgsTask) ; le rendu et l'écriture des
+fichiers sont dans core/atlas.py.
+"""
+__all__ = ["ATLAS_FORMATS", "MAX_WORKERS", "AtlasJob", "table_jobs", "export_atlas", "AtlasTask"]
+
+from qgis.core import QgsTask
+
+from .core.atlas import ATLAS_FORMATS, MAX_WORKERS, AtlasJob, table_jobs, export_atlas
+from .profiling import timer
+
+
+class AtlasTask(QgsTask):
+    """Atlas en arrière-plan ; annulable depuis la barre des tâches QGIS."""
+    def __init__(self, renderer, snapshot, jobs, out_dir, formats, max_workers=MAX_WORKERS):
+        super().__init__('Atlas LinQ', QgsTask.CanCancel)
+        self.renderer = renderer
+        self.snapshot = snapshot
+        self.jobs = jobs
+        self.out_dir = out_dir
+        self.formats = formats
+        self.max_workers = max_workers
+        self.written = 0
+        self.errors = []
+        self.error = None
+
+    def run(self):
+        try:
+            with timer('atlas', f"{len(self.jobs)} diagramme(s)"):
+                self.written, self.errors = export_atlas(
+                    self.renderer, self.snapshot, self.jobs, self.out_dir, self.formats,
+                    self.max_workers, self.setProgress, self.isCanceled)
+        except Exception as ex:
+            self.error = str(ex)
+            return False
+        return not self.isCanceled()
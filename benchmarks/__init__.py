@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks
+Mesures de performance de LinQ sur des projets synthétiques (synthetic.py),
+lancées par run.py avec le Python de QGIS :
+
+    python -m linq.benchmarks.run --scale tables=10,50,200 -o bench.json
+    python -m linq.benchmarks.run --scale tables=10,50,200 --compare bench.json
+"""
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/run.py
+Mesure les opérations coûteuses de LinQ sur des projets synthétiques, pour un
+ou plusieurs points d'une courbe (--scale tables=10,50,200), et écrit le
+résultat en JSON (-o) pour comparer deux versions (--compare ancien.json).
+
+    python -m linq.benchmarks.run --features 2000 --scale tables=10,50,200 -o bench.json
+
+Chaque opération est répétée (--repeat) ; on garde toutes les durées, le
+minimum et la médiane (secondes). Le code de sortie vaut 1 si --compare trouve
+une opération plus lente que --threshold fois la référence.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from .synthetic import SYNTHETIC_PARAMS, STORAGES, SyntheticSpec, build_project
+
+OPERATIONS = (
+    'capture', 'detect_link_tables', 'build_dot', 'render', 'layout_native', 'set_graph',
+    'tree_rebuild', 'expand_all', 'drop_1n', 'drop_nn',
+    'export_drawio', 'export_html', 'export_compact', 'export_links', 'export_atlas',
+)
+ATLAS_JOBS = 20   # diagrammes de l'atlas mesuré (les premières tables)
+
+
+def _start_app():
+    """QgsApplication avec interface (hors écran) et iface factice de qgis.testing."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from qgis.testing import start_app
+    from qgis.testing.mocked import get_iface
+    app = start_app()
+    return app, get_iface()
+
+
+def _plugin_version() -> str:
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'metadata.txt')
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('version='):
+                    return line.split('=', 1)[1].strip()
+    except OSError:
+        pass
+    return ''
+
+
+class Bench:
+    """Chronomètre : chaque mesure est précédée de `setup` et suivie de `teardown` (non chronométrés)."""
+    def __init__(self, repeat):
+        self.repeat = max(1, repeat)
+        self.timings = {}
+        self.errors = {}
+
+    def measure(self, name, func, setup=None, teardown=None):
+        runs = []
+        try:
+            for _ in range(self.repeat):
+                state = setup() if setup else None
+                t = time.perf_counter()
+                func(state) if setup else func()
+                runs.append(time.perf_counter() - t)
+                if teardown:
+                    teardown(state)
+        except Exception as ex:
+            self.errors[name] = f"{type(ex).__name__}: {ex}"
+            return
+        self.timings[name] = {'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+
+def run_point(spec, ops, repeat, iface, workdir):
+    """Toutes les mesures pour un projet synthétique ; retourne le dict JSON du point."""
+    from qgis.core import QgsProject
+    from ..relation_utils import RelationsSnapshot, LayerNode, detect_link_tables, find_direct_relation
+    from ..graphviz_renderer import GraphvizRenderer
+    from ..core.layout import parse_plain
+    from ..core.drawio import write_drawio, layout_from_plain
+    from ..core.atlas import table_jobs, export_atlas
+    from ..diagram_canvas import DiagramCanvas
+    from .. import selected_panel
+    from ..selected_panel import ColumnWidget
+    from ..report_writer import write_html_report, write_compact_report
+    from ..links_exporter import link_relations, iter_links, _CsvSink
+
+    t = time.perf_counter()
+    synth = build_project(spec, workdir=workdir)
+    build_s = time.perf_counter() - t
+    project = QgsProject.instance()
+    bench = Bench(repeat)
+    want = set(ops)
+
+    snapshot = RelationsSnapshot.capture(project)
+    gv = GraphvizRenderer()
+    if 'capture' in want:
+        bench.measure('capture', lambda: RelationsSnapshot.capture(project))
+    if 'detect_link_tables' in want:
+        def fresh_layers():
+            return {nid: LayerNode(id=nid, name=n.name) for nid, n in snapshot.layers.items()}
+        bench.measure('detect_link_tables',
+                      lambda layers: detect_link_tables(project, layers, project.relationManager()),
+                      setup=fresh_layers)
+    if 'build_dot' in want:
+        bench.measure('build_dot', lambda: gv._build_dot(snapshot))
+    if 'render' in want:
+        # Cache vidé : on mesure l'appel à dot, pas la mémoire du rendu précédent
+        if gv.available():
+            bench.measure('render', lambda _: gv.render_formats(snapshot, ['plain', 'svg']),
+                          setup=gv._cache.clear)
+        else:
+            bench.errors['render'] = "Graphviz (dot) introuvable."
+    if 'layout_native' in want:
+        bench.measure('layout_native', lambda: gv.render_plain_native(snapshot))
+
+    plain = gv.render_plain(snapshot)
+    link_ids = {nid for nid, n in snapshot.layers.items() if n.is_link_table}
+    if 'set_graph' in want:
+        bench.measure('set_graph', lambda canvas: canvas.set_graph(plain, link_ids=link_ids, fit=True),
+                      setup=DiagramCanvas, teardown=lambda canvas: canvas.deleteLater())
+
+    def column(layer):
+        col = ColumnWidget(layer, iface, set, lambda: False, lambda: 0)
+        col.display_expr = '"name"'
+        return col
+
+    parent = synth.busiest_parent()
+    col = column(parent)
+    if 'tree_rebuild' in want:
+        bench.measure('tree_rebuild', col.model.rebuild)
+    if 'expand_all' in want:
+        bench.measure('expand_all', lambda _: col._expand_all(), setup=col.model.rebuild)
+
+    # Dépôts en masse : confirmation acceptée, couche déjà en édition, modifications annulées ensuite
+    ask = selected_panel.ConfirmFKDialog.ask
+    selected_panel.ConfirmFKDialog.ask = staticmethod(lambda *args: True)
+    try:
+        drop_n = max(1, spec.children)
+        if 'drop_1n' in want:
+            pair = next(((p, c) for p, c in synth.one_to_many), None)
+            if pair:
+                p_layer, c_layer = pair
+                p_col = column(p_layer)
+                fids = [f.id() for _, f in zip(range(drop_n * 20), c_layer.getFeatures())]
+
+                def drop_1n_setup():
+                    c_layer.startEditing()
+                    return p_col.proxy.index(0, 0)
+                bench.measure('drop_1n', lambda target: p_col.handle_drop({'layer': c_layer.id(), 'fids': fids}, target),
+                              setup=drop_1n_setup, teardown=lambda _: c_layer.rollBack())
+        if 'drop_nn' in want:
+            # Table d'association sans relation directe entre ses deux couches (sinon dépôt 1→N)
+            case = next(((l, a, b) for l, a, b in synth.link_tables
+                         if not find_direct_relation(project, a, b) and not find_direct_relation(project, b, a)),
+                        None)
+            if case:
+                l_layer, a_layer, b_layer = case
+                b_col = column(b_layer)
+                fids = [f.id() for _, f in zip(range(drop_n * 20), a_layer.getFeatures())]
+
+                def drop_nn_setup():
+                    l_layer.startEditing()
+                    return b_col.proxy.index(0, 0)
+                bench.measure('drop_nn', lambda target: b_col.handle_drop({'layer': a_layer.id(), 'fids': fids}, target),
+                              setup=drop_nn_setup, teardown=lambda _: l_layer.rollBack())
+    finally:
+        selected_panel.ConfirmFKDialog.ask = ask
+
+    if 'export_drawio' in want:
+        def drawio():
+            pos, routes = layout_from_plain(plain, snapshot)
+            write_drawio(io.StringIO(), snapshot, node_positions=pos, routes=routes)
+        bench.measure('export_drawio', drawio)
+    if 'export_html' in want:
+        bench.measure('export_html', lambda: write_html_report(io.StringIO(), [col.report_column(True)]))
+    if 'export_compact' in want:
+        bench.measure('export_compact', lambda: write_compact_report(io.StringIO(), [col.report_column(True)]))
+    if 'export_links' in want:
+        def links():
+            sink = _CsvSink(os.path.join(workdir, 'links.csv'))
+            try:
+                for rel in link_relations(snapshot, project=project):
+                    for batch in iter_links(rel):
+                        sink.write(batch)
+            finally:
+                sink.close()
+        bench.measure('export_links', links)
+    if 'export_atlas' in want:
+        formats = ('svg', 'drawio') if gv.available() else ('drawio',)
+        jobs = table_jobs(snapshot)[:ATLAS_JOBS]
+        bench.measure('export_atlas',
+                      lambda _: export_atlas(gv, snapshot, jobs, os.path.join(workdir, 'atlas'), formats),
+                      setup=gv._cache.clear)
+
+    nodes, edges = parse_plain(plain)
+    return {
+        'spec': spec.as_dict(),
+        'counts': {'layers': len(snapshot.layers), 'relations': len(snapshot.edges),
+                   'features': synth.feature_count, 'link_tables': len(link_ids),
+                   'tree_rows': len(col.model.root.children)},
+        'build_seconds': build_s,
+        'timings': bench.timings,
+        'errors': bench.errors,
+    }
+
+
+def _print_table(runs, ops, scale_param, stream=sys.stdout):
+    heads = [f"{scale_param}={r['spec'][scale_param]}" if scale_param else 'ms' for r in runs]
+    w = max(len(op) for op in ops)
+    stream.write(f"{'opération (médiane, ms)':<{w}}  " + "  ".join(f"{h:>14}" for h in heads) + "\n")
+    for op in ops:
+        cells = []
+        for r in runs:
+            t = r['timings'].get(op)
+            cells.append(f"{t['median'] * 1000:14.1f}" if t else f"{'—':>14}")
+        stream.write(f"{op:<{w}}  " + "  ".join(cells) + "\n")
+    for r in runs:
+        for op, err in r['errors'].items():
+            stream.write(f"! {op} ({scale_param}={r['spec'].get(scale_param)}) : {err}\n" if scale_param
+                         else f"! {op} : {err}\n")
+
+
+def compare(current, baseline, threshold, stream=sys.stdout) -> int:
+    """Affiche le rapport actuel / référence des médianes ; retourne le nombre de régressions."""
+    base = {json.dumps(r['spec'], sort_keys=True): r for r in baseline.get('runs', [])}
+    regressions = 0
+    stream.write(f"\nComparaison avec la version {baseline.get('linq_version') or '?'} "
+                 f"(seuil ×{threshold:g}) :\n")
+    for run in current['runs']:
+        ref = base.get(json.dumps(run['spec'], sort_keys=True))
+        if ref is None:
+            continue
+        for op, t in run['timings'].items():
+            old = ref['timings'].get(op)
+            if not old or old['median'] <= 0:
+                continue
+            ratio = t['median'] / old['median']
+            flag = ''
+            if ratio > threshold:
+                regressions += 1
+                flag = '  ← régression'
+            stream.write(f"  {op:<20} {old['median'] * 1000:10.1f} → {t['median'] * 1000:10.1f} ms"
+                         f"  ×{ratio:.2f}{flag}\n")
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python -m linq.benchmarks.run',
+                                 description="Mesures de performance LinQ sur des projets synthétiques.")
+    defaults = SyntheticSpec()
+    for name in SYNTHETIC_PARAMS:
+        ap.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=getattr(defaults, name))
+    ap.add_argument('--storage', choices=STORAGES, default='memory')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--scale', default='',
+                    help="courbe : PARAMÈTRE=v1,v2,… (ex. tables=10,50,200 ou features=100,1000,10000)")
+    ap.add_argument('--ops', default=','.join(OPERATIONS), help="opérations mesurées, séparées par des virgules")
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('-o', '--output', help="fichier JSON des résultats")
+    ap.add_argument('--compare', help="JSON d'une mesure précédente (référence)")
+    ap.add_argument('--threshold', type=float, default=1.25, help="rapport au-delà duquel une opération régresse")
+    args = ap.parse_args(argv)
+
+    ops = [op.strip() for op in args.ops.split(',') if op.strip()]
+    unknown = [op for op in ops if op not in OPERATIONS]
+    if unknown:
+        ap.error(f"opération(s) inconnue(s) : {', '.join(unknown)}")
+    base = SyntheticSpec(**{k: getattr(args, k) for k in SYNTHETIC_PARAMS},
+                         storage=args.storage, seed=args.seed)
+    scale_param, values = None, [None]
+    if args.scale:
+        scale_param, _, raw = args.scale.partition('=')
+        scale_param = scale_param.strip().replace('-', '_')
+        if scale_param not in SYNTHETIC_PARAMS:
+            ap.error(f"--scale : paramètre inconnu « {scale_param} »")
+        try:
+            values = [int(v) for v in raw.split(',') if v.strip()]
+        except ValueError:
+            ap.error("--scale : valeurs entières attendues")
+
+    app, iface = _start_app()
+    from qgis.core import Qgis
+    gv_path = None
+    try:
+        from ..graphviz_renderer import GraphvizRenderer
+        gv_path = GraphvizRenderer().dot_path
+    except Exception:
+        pass
+
+    result = {
+        'linq_version': _plugin_version(),
+        'qgis_version': Qgis.version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'graphviz': gv_path,
+        'repeat': args.repeat,
+        'scale': {'param': scale_param, 'values': values if scale_param else []},
+        'runs': [],
+    }
+    with tempfile.TemporaryDirectory(prefix='linq_bench_') as workdir:
+        for v in values:
+            spec = base.with_value(scale_param, v) if scale_param else base
+            sys.stderr.write(f"… {spec.as_dict()}\n")
+            result['runs'].append(run_point(spec, ops, args.repeat, iface, workdir))
+            app.processEvents()
+
+    _print_table(result['runs'], ops, scale_param)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+    regressions = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
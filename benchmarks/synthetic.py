@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/synthetic.py
+Projets synthétiques pour les mesures : N tables reliées (1→N), des relations
+réflexives (parent_id), des tables d'association N↔N, en couches mémoire ou
+dans un GeoPackage. Tout est déterministe (graine) : deux versions de LinQ
+mesurent exactement le même projet.
+
+Chaque table a `features` entités (id = 1…features) ; dans chaque relation,
+un parent sur `children` reçoit `children` enfants.
+"""
+__all__ = ["SYNTHETIC_PARAMS", "SyntheticSpec", "SyntheticProject", "build_project"]
+
+import os
+import random
+
+from qgis.core import (
+    QgsProject, QgsVectorLayer, QgsFeature, QgsRelation, QgsVectorFileWriter,
+    QgsCoordinateTransformContext
+)
+
+SYNTHETIC_PARAMS = ('tables', 'relations', 'reflexive', 'link_tables', 'features', 'children')
+STORAGES = ('memory', 'gpkg')
+
+
+class SyntheticSpec:
+    """Paramètres d'un projet synthétique (entiers, sauf storage et seed)."""
+    def __init__(self, tables=20, relations=30, reflexive=2, link_tables=3, features=1000,
+                 children=5, storage='memory', seed=0):
+        self.tables = max(2, int(tables))
+        self.relations = max(0, int(relations))
+        self.reflexive = max(0, min(int(reflexive), self.tables))
+        self.link_tables = max(0, int(link_tables))
+        self.features = max(1, int(features))
+        self.children = max(1, int(children))
+        self.storage = storage if storage in STORAGES else 'memory'
+        self.seed = int(seed)
+
+    def as_dict(self) -> dict:
+        return {k: getattr(self, k) for k in SYNTHETIC_PARAMS + ('storage', 'seed')}
+
+    def with_value(self, name, value) -> 'SyntheticSpec':
+        d = self.as_dict()
+        d[name] = value
+        return SyntheticSpec(**d)
+
+
+class SyntheticProject:
+    """Couches créées et quelques cas d'usage repérés pour les mesures."""
+    def __init__(self):
+        self.tables = []          # QgsVectorLayer des tables « métier »
+        self.link_tables = []     # (table d'association, couche A, couche B)
+        self.one_to_many = []     # (couche parente, couche enfant)
+        self.feature_count = 0
+
+    def busiest_parent(self):
+        """Table parente du plus grand nombre de relations (colonne la plus chargée)."""
+        count = {}
+        for parent, _ in self.one_to_many:
+            count[parent.id()] = count.get(parent.id(), 0) + 1
+        best = max(count, key=count.get, default=None)
+        return next((l for l in self.tables if l.id() == best), self.tables[0])
+
+
+def _memory_layer(name, fields):
+    uri = "None?" + "&".join(f"field={n}:{t}" for n, t in fields)
+    return QgsVectorLayer(uri, name, "memory")
+
+
+def _fill(layer, rows):
+    feats = []
+    for values in rows:
+        f = QgsFeature(layer.fields())
+        f.setAttributes(list(values))
+        feats.append(f)
+    layer.dataProvider().addFeatures(feats)
+    return len(feats)
+
+
+def _to_gpkg(layer, path):
+    """Copie la couche mémoire dans le GeoPackage et renvoie la couche OGR correspondante."""
+    opts = QgsVectorFileWriter.SaveVectorOptions()
+    opts.driverName = 'GPKG'
+    opts.layerName = layer.name()
+    opts.actionOnExistingFile = (QgsVectorFileWriter.CreateOrOverwriteLayer if os.path.exists(path)
+                                 else QgsVectorFileWriter.CreateOrOverwriteFile)
+    err = QgsVectorFileWriter.writeAsVectorFormatV3(layer, path, QgsCoordinateTransformContext(), opts)
+    if err[0] != QgsVectorFileWriter.NoError:
+        raise RuntimeError(f"GeoPackage : {err[1]}")
+    out = QgsVectorLayer(f"{path}|layername={layer.name()}", layer.name(), 'ogr')
+    if not out.isValid():
+        raise RuntimeError(f"GeoPackage : couche {layer.name()} illisible.")
+    return out
+
+
+def build_project(spec: SyntheticSpec, project: QgsProject = None, workdir=None) -> SyntheticProject:
+    """
+    Vide `project` (projet courant par défaut) et y crée le projet synthétique.
+    storage='gpkg' écrit les couches dans workdir/synthetic.gpkg.
+    """
+    project = project or QgsProject.instance()
+    project.clear()
+    rng = random.Random(spec.seed)
+    n, cpp = spec.features, spec.children
+
+    names = [f"T{i:03d}" for i in range(spec.tables)]
+    # 1→N : chaque table i ≥ 1 reçoit à tour de rôle une FK vers une table antérieure (pas de cycle)
+    fks = {name: [] for name in names}                 # {enfant: [(champ, parent)]}
+    for k in range(spec.relations):
+        c = 1 + k % (spec.tables - 1)
+        p = rng.randrange(c)
+        fks[names[c]].append((f"fk{k}", names[p]))
+    for name in names[:spec.reflexive]:
+        fks[name].append(('parent_id', name))
+    links, used = [], set()
+    for k in range(spec.link_tables):
+        # Paires distinctes tant que possible : un dépôt N↔N n'a alors qu'une table candidate
+        for _ in range(20):
+            a, b = rng.sample(names, 2)
+            if frozenset((a, b)) not in used:
+                break
+        used.add(frozenset((a, b)))
+        links.append((f"L{k:03d}", a, b))
+
+    def fk_value(i, field):
+        if field == 'parent_id':
+            return None if i < cpp else i // cpp   # parent d'id plus petit
+        return (i // cpp) % n + 1
+
+    mem = {}
+    for name in names:
+        fields = [('id', 'integer'), ('name', 'string')] + [(f, 'integer') for f, _ in fks[name]]
+        layer = _memory_layer(name, fields)
+        _fill(layer, ([i + 1, f"{name} {i + 1}"] + [fk_value(i, f) for f, _ in fks[name]]
+                      for i in range(n)))
+        mem[name] = layer
+    for name, a, b in links:
+        layer = _memory_layer(name, [('id', 'integer'), ('a_id', 'integer'), ('b_id', 'integer')])
+        _fill(layer, ([i + 1, (i // cpp) % n + 1, (i * 7) % n + 1] for i in range(n)))
+        mem[name] = layer
+
+    if spec.storage == 'gpkg':
+        path = os.path.join(workdir or os.getcwd(), 'synthetic.gpkg')
+        if os.path.exists(path):
+            os.remove(path)
+        layers = {name: _to_gpkg(layer, path) for name, layer in mem.items()}
+    else:
+        layers = mem
+    for layer in layers.values():
+        layer.setDisplayExpression('"name"' if layer.fields().indexOf('name') >= 0 else '"id"')
+    project.addMapLayers(list(layers.values()))
+
+    out = SyntheticProject()
+    out.tables = [layers[name] for name in names]
+    relmgr = project.relationManager()
+
+    def relate(rid, parent, child, fk):
+        rel = QgsRelation()
+        rel.setId(rid)
+        rel.setName(f"{parent.name()} → {child.name()} ({fk})")
+        rel.setReferencedLayer(parent.id())
+        rel.setReferencingLayer(child.id())
+        rel.addFieldPair(fk, 'id')
+        if rel.isValid():
+            relmgr.addRelation(rel)
+        return rel.isValid()
+
+    for child in names:
+        for fk, parent in fks[child]:
+            if relate(f"rel_{child}_{fk}", layers[parent], layers[child], fk) and parent != child:
+                out.one_to_many.append((layers[parent], layers[child]))
+    for name, a, b in links:
+        relate(f"rel_{name}_a", layers[a], layers[name], 'a_id')
+        relate(f"rel_{name}_b", layers[b], layers[name], 'b_id')
+        out.link_tables.append((layers[name], layers[a], layers[b]))
+    out.feature_count = n * len(layers)
+    return out
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+cli.py
+Export LinQ sans interface, pour des lots de projets (.qgz / .qgs) :
+
+    python -m linq.cli projets/*.qgz -o sortie --formats dot,svg,drawio,json --jobs 4
+
+(`linq` = nom du dossier de l'extension ; son dossier parent doit être dans
+PYTHONPATH, avec l'environnement Python de QGIS.)
+
+Chaque projet est ouvert dans un QgsApplication sans affichage, capturé
+(RelationsSnapshot.capture) puis écrit dans sortie/<projet>/ :
+<projet>.dot, .svg, .drawio, .json. Les projets sont répartis sur des
+processus de travail (--jobs) ; un résumé des durées est affiché et écrit
+dans sortie/summary.json.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+CLI_FORMATS = ('dot', 'svg', 'drawio', 'json')
+
+_QGS_APP = None
+
+
+def _init_qgis():
+    """QgsApplication sans interface, une fois par processus."""
+    global _QGS_APP
+    if _QGS_APP is not None:
+        return
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from qgis.core import QgsApplication
+    _QGS_APP = QgsApplication([], False)
+    _QGS_APP.initQgis()
+    import atexit
+    atexit.register(_QGS_APP.exitQgis)
+
+
+def _read_project(project, path):
+    from qgis.core import Qgis
+    try:
+        # Métadonnées des couches supposées à jour : ouverture bien plus rapide
+        return project.read(path, Qgis.ProjectReadFlags(Qgis.ProjectReadFlag.TrustLayerMetadata))
+    except (AttributeError, TypeError):
+        return project.read(path)
+
+
+def export_project(path, out_dir, formats, options):
+    """
+    Exporte un projet (dans le processus courant). Retourne un dict :
+    projet, ok, erreur, nombre de couches / relations, fichiers, durées (s).
+    """
+    _init_qgis()
+    from qgis.core import QgsProject
+    from .relation_utils import RelationsSnapshot
+    from .graphviz_renderer import GraphvizRenderer
+    from .core.drawio import write_drawio, layout_from_plain
+
+    result = {'project': path, 'ok': False, 'error': '', 'layers': 0, 'relations': 0,
+              'files': [], 'timings': {}}
+    timings = result['timings']
+    t_all = time.perf_counter()
+    try:
+        t = time.perf_counter()
+        project = QgsProject.instance()
+        project.clear()
+        if not _read_project(project, path):
+            raise RuntimeError(f"projet illisible : {project.error() if hasattr(project, 'error') else path}")
+        timings['load'] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        snapshot = RelationsSnapshot.capture(project)
+        timings['capture'] = time.perf_counter() - t
+        result['layers'], result['relations'] = len(snapshot.layers), len(snapshot.edges)
+
+        gv = GraphvizRenderer()
+        if options.get('dot_path'):
+            gv.dot_path = options['dot_path']
+        if options.get('engine'):
+            gv.engine = options['engine']
+
+        stem = options['stems'][path]
+        target = os.path.join(out_dir, stem)
+        os.makedirs(target, exist_ok=True)
+
+        def write(ext, data, binary=False):
+            fn = os.path.join(target, f"{stem}.{ext}")
+            with open(fn, 'wb' if binary else 'w', **({} if binary else {'encoding': 'utf-8'})) as f:
+                f.write(data)
+            result['files'].append(fn)
+
+        t = time.perf_counter()
+        if 'dot' in formats:
+            write('dot', gv._build_dot(snapshot))
+        outputs, plain = {}, ''
+        if 'svg' in formats:
+            if not gv.available():
+                raise RuntimeError("Graphviz (dot) introuvable : format svg impossible.")
+            # Un seul appel à dot pour le SVG et la mise en page du draw.io
+            with_plain = 'drawio' in formats and not gv.use_native(len(snapshot.layers))
+            outputs = gv.render_formats(snapshot, (['plain'] if with_plain else []) + ['svg'])
+            if 'svg' not in outputs:
+                raise RuntimeError(gv.last_error or "dot a échoué.")
+            plain = outputs.get('plain', b'').decode('utf-8', errors='ignore')
+        if 'drawio' in formats and not plain:
+            plain = gv.render_plain(snapshot)
+        timings['render'] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        if 'svg' in outputs:
+            write('svg', outputs['svg'], binary=True)
+        if 'drawio' in formats:
+            pos, routes = layout_from_plain(plain, snapshot) if plain else (None, None)
+            fn = os.path.join(target, f"{stem}.drawio")
+            with open(fn, 'w', encoding='utf-8') as f:
+                write_drawio(f, snapshot, node_positions=pos, routes=routes,
+                             compressed=options.get('compressed', False))
+            result['files'].append(fn)
+        if 'json' in formats:
+            write('json', json.dumps(snapshot.to_dict(), ensure_ascii=False, indent=1))
+        timings['write'] = time.perf_counter() - t
+        result['ok'] = True
+    except Exception as ex:
+        result['error'] = str(ex)
+    finally:
+        try:
+            QgsProject.instance().clear()
+        except Exception:
+            pass
+    timings['total'] = time.perf_counter() - t_all
+    return result
+
+
+def _stems(paths):
+    """Nom de sous-dossier unique par projet."""
+    out, used = {}, set()
+    for p in paths:
+        base = stem = os.path.splitext(os.path.basename(p))[0] or 'projet'
+        k = 2
+        while stem.lower() in used:
+            stem = f"{base}_{k}"; k += 1
+        used.add(stem.lower())
+        out[p] = stem
+    return out
+
+
+def _print_summary(results, wall, stream=sys.stdout):
+    cols = ('load', 'capture', 'render', 'write', 'total')
+    name_w = max([len('Projet')] + [len(os.path.basename(r['project'])) for r in results])
+    stream.write(f"{'Projet':<{name_w}}  {'couches':>7} {'relations':>9} " +
+                 " ".join(f"{c:>8}" for c in cols) + "\n")
+    for r in results:
+        times = " ".join(f"{r['timings'].get(c, 0.0):8.2f}" for c in cols)
+        line = f"{os.path.basename(r['project']):<{name_w}}  {r['layers']:>7} {r['relations']:>9} {times}"
+        if not r['ok']:
+            line += f"  ÉCHEC : {r['error']}"
+        stream.write(line + "\n")
+    ok = sum(1 for r in results if r['ok'])
+    cpu = sum(r['timings'].get('total', 0.0) for r in results)
+    stream.write(f"{ok}/{len(results)} projet(s) exporté(s) en {wall:.2f} s "
+                 f"(cumul des projets : {cpu:.2f} s).\n")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python -m linq.cli',
+                                 description="Export des diagrammes de relations LinQ pour des projets QGIS, sans interface.")
+    ap.add_argument('projects', nargs='+', help="fichiers .qgz / .qgs")
+    ap.add_argument('-o', '--output', required=True, help="dossier de sortie")
+    ap.add_argument('--formats', default='dot,svg,drawio,json',
+                    help=f"formats séparés par des virgules parmi {','.join(CLI_FORMATS)}")
+    ap.add_argument('-j', '--jobs', type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                    help="processus de travail en parallèle (1 = dans ce processus)")
+    ap.add_argument('--dot', dest='dot_path', default=None, help="chemin du binaire dot")
+    ap.add_argument('--engine', choices=('auto', 'dot', 'native'), default=None,
+                    help="moteur de mise en page (par défaut : réglage de l'extension)")
+    ap.add_argument('--compress', action='store_true', help="draw.io compressé")
+    args = ap.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in CLI_FORMATS]
+    if unknown or not formats:
+        ap.error(f"format(s) inconnu(s) : {', '.join(unknown) or '(aucun)'}")
+    paths = [os.path.abspath(p) for p in dict.fromkeys(args.projects)]
+    os.makedirs(args.output, exist_ok=True)
+    options = {'dot_path': args.dot_path, 'engine': args.engine, 'compressed': args.compress,
+               'stems': _stems(paths)}
+
+    t0 = time.perf_counter()
+    results = []
+    if args.jobs <= 1 or len(paths) == 1:
+        for p in paths:
+            results.append(export_project(p, args.output, formats, options))
+    else:
+        # « spawn » : chaque processus démarre son propre QgsApplication, sans état Qt hérité
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=args.jobs, mp_context=ctx) as pool:
+            futures = {pool.submit(export_project, p, args.output, formats, options): p for p in paths}
+            for fut in as_completed(futures):
+                try:
+                    results.append(fut.result())
+                except Exception as ex:   # processus de travail perdu
+                    results.append({'project': futures[fut], 'ok': False, 'error': str(ex),
+                                    'layers': 0, 'relations': 0, 'files': [], 'timings': {}})
+    wall = time.perf_counter() - t0
+    results.sort(key=lambda r: paths.index(r['project']))
+
+    _print_summary(results, wall)
+    with open(os.path.join(args.output, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({'wall_seconds': wall, 'projects': results}, f, ensure_ascii=False, indent=1)
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
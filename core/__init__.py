@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+core
+Cœur de LinQ sans QGIS ni Qt : modèle des relations (snapshot, voisinage,
+groupes, recherche, tables de liaison), DOT et rendu Graphviz, moteur de mise
+en page, exports draw.io et atlas. Ne dépend que de données simples : il
+s'importe vite et tourne dans un Python ordinaire (processus de travail,
+intégration continue). Les adaptateurs QGIS (capture du projet, réglages,
+tâches) restent dans les modules de l'extension.
+"""
+from .model import (
+    RelationEdge, LayerNode, ClusterNode, RelationsSnapshot, AdjacencyIndex, NameIndex,
+    FOCUS_DIRECTIONS, CLUSTER_MODES, cluster_node_id, detect_communities, community_labels,
+    mark_link_tables
+)
+from .dot import DotRenderer, LAYOUT_ENGINES
+from .layout import parse_plain, layered_layout, incremental_layout
+from .drawio import write_drawio, build_drawio, layout_from_plain
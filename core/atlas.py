@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+core/atlas.py
+Atlas de diagrammes : un diagramme par ensemble de focus (en général une table
+et son voisinage), écrit en SVG, PNG et/ou draw.io dans un dossier.
+- les ensembles identiques ne sont rendus qu'une fois (plusieurs fichiers au besoin) ;
+- les appels à `dot` indépendants tournent en parallèle, au plus `max_workers`
+  processus à la fois ; chaque job demande tous ses formats en un seul appel ;
+- sans Graphviz, seul le draw.io est produit (moteur de mise en page intégré).
+"""
+__all__ = ["ATLAS_FORMATS", "MAX_WORKERS", "AtlasJob", "table_jobs", "export_atlas"]
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .drawio import build_drawio, layout_from_plain
+
+ATLAS_FORMATS = ('svg', 'png', 'drawio')
+MAX_WORKERS = 4
+
+_UNSAFE = re.compile(r'[^\w\-. ]+', re.UNICODE)
+
+
+class AtlasJob:
+    """Un diagramme de l'atlas : nom de fichier (sans extension) et tables de focus."""
+    def __init__(self, name, focus_ids):
+        self.name = name
+        self.focus_ids = frozenset(focus_ids)
+
+
+def _file_stem(name) -> str:
+    stem = _UNSAFE.sub('_', str(name)).strip(' ._')
+    return stem or 'diagramme'
+
+
+def table_jobs(snapshot, layer_ids=None):
+    """Un job par table (toutes, ou celles de layer_ids), noms de fichiers uniques."""
+    ids = [nid for nid in (layer_ids if layer_ids is not None else snapshot.layers) if nid in snapshot.layers]
+    ids.sort(key=lambda nid: str(snapshot.layers[nid].name).lower())
+    jobs, used = [], set()
+    for nid in ids:
+        stem = base = _file_stem(snapshot.layers[nid].name)
+        k = 2
+        while stem.lower() in used:
+            stem = f"{base}_{k}"; k += 1
+        used.add(stem.lower())
+        jobs.append(AtlasJob(stem, {nid}))
+    return jobs
+
+
+def _render(renderer, snapshot, focus_ids, formats, canceled):
+    """{format: bytes} pour un ensemble de focus (thread de travail) ; None si annulé."""
+    if canceled():
+        return None
+    out = {}
+    gv_formats = [f for f in formats if f in ('svg', 'png')]
+    need_plain = 'drawio' in formats
+    if renderer.available() and gv_formats:
+        # Erreur propre à ce rendu : last_error est partagé entre les threads
+        res, err = renderer.render_outputs(snapshot, (['plain'] if need_plain else []) + gv_formats,
+                                           focus_ids=focus_ids)
+        if not res:
+            raise RuntimeError(err or "dot a échoué.")
+        out.update({f: res[f] for f in gv_formats if f in res})
+        plain = res.get('plain', b'').decode('utf-8', errors='ignore') if need_plain else ''
+    elif need_plain:
+        keep_nodes, _ = renderer._focus_subgraph(snapshot, focus_ids)
+        if renderer.layout_mode(keep_nodes) == 'dot':
+            res, err = renderer.render_outputs(snapshot, ['plain'], focus_ids=focus_ids)
+            if not res:
+                raise RuntimeError(err or "dot a échoué.")
+            plain = res['plain'].decode('utf-8', errors='ignore')
+        else:
+            plain = renderer.render_plain_native(snapshot, focus_ids=focus_ids)
+    else:
+        plain = ''
+    if need_plain:
+        pos, routes = layout_from_plain(plain, snapshot) if plain else (None, None)
+        out['drawio'] = build_drawio(snapshot, node_positions=pos, routes=routes, focus_ids=focus_ids,
+                                     focus_depth=renderer.focus_depth,
+                                     focus_direction=renderer.focus_direction)
+    return out
+
+
+def export_atlas(renderer, snapshot, jobs, out_dir, formats=('svg',), max_workers=MAX_WORKERS,
+                 progress=None, canceled=None):
+    """
+    Écrit les fichiers de l'atlas dans out_dir. Retourne (nb de fichiers écrits,
+    [(nom, message d'erreur)]). progress(pourcentage), canceled() -> bool.
+    Après annulation, aucun nouveau `dot` n'est lancé et la fonction rend la
+    main sans attendre ceux en cours.
+    """
+    progress = progress or (lambda pct: None)
+    canceled = canceled or (lambda: False)
+    formats = [f for f in ATLAS_FORMATS if f in formats]
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Focus identiques : un seul rendu
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job.focus_ids, []).append(job.name)
+
+    written, errors = 0, []
+    done = 0
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    stopped = False
+    try:
+        futures = {pool.submit(_render, renderer, snapshot, focus, formats, canceled): focus
+                   for focus in groups}
+        for fut in as_completed(futures):
+            names = groups[futures[fut]]
+            done += 1
+            if canceled():
+                stopped = True
+                break
+            try:
+                outputs = fut.result()
+                for name in names:
+                    for fmt, data in (outputs or {}).items():
+                        with open(os.path.join(out_dir, f"{name}.{fmt}"), 'wb') as f:
+                            f.write(data)
+                        written += 1
+            except Exception as ex:
+                errors.extend((name, str(ex)) for name in names)
+            progress(100.0 * done / len(groups))
+    finally:
+        pool.shutdown(wait=not stopped, cancel_futures=True)
+    return written, errors
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+core/dot.py
+Diagramme en DOT et rendu Graphviz, sans QGIS : DotRenderer construit le DOT
+du snapshot (focus, surlignage, positions épinglées), lance `dot` pour un ou
+plusieurs formats en un seul appel (cache LRU) ou passe par le moteur intégré.
+"""
+import re, subprocess, shutil, sys, threading
+from collections import OrderedDict
+
+from .layout import layered_layout, incremental_layout, parse_plain
+from .model import FOCUS_DIRECTIONS
+
+# Moteur de mise en page : 'auto' = moteur intégré pour les petites vues
+# (ou si dot est absent), Graphviz au-delà ; 'dot' ; 'native'.
+LAYOUT_ENGINES = ('auto', 'dot', 'native')
+NATIVE_AUTO_MAX_NODES = 30
+
+# Rendus mémorisés (clé : commande + texte DOT), les plus anciens oubliés d'abord
+RENDER_CACHE_SIZE = 32
+
+# Fin de sortie des formats auto-délimités : permet de découper la sortie d'un
+# seul appel `dot -Tplain -Tsvg …` (les sorties sont concaténées sur stdout).
+_FORMAT_END = {
+    'plain': re.compile(rb'^stop\r?\n', re.M),
+    'plain-ext': re.compile(rb'^stop\r?\n', re.M),
+    'svg': re.compile(rb'</svg>\r?\n'),
+}
+
+def _esc(s: str) -> str:
+    if s is None:
+        return ""
+    return str(s).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+def _run_no_console(args, input_bytes=None):
+    # Évite la fenêtre console éphémère sous Windows
+    if sys.platform.startswith('win'):
+        si = subprocess.STARTUPINFO()
+        si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        try:
+            flags = subprocess.CREATE_NO_WINDOW
+        except AttributeError:
+            flags = 0
+        return subprocess.run(args, input=input_bytes, capture_output=True, startupinfo=si, creationflags=flags)
+    else:
+        return subprocess.run(args, input=input_bytes, capture_output=True)
+
+def _order_formats(formats):
+    """Formats auto-délimités d'abord ; un seul format « libre » possible, en dernier."""
+    formats = list(dict.fromkeys(formats))
+    delimited = [f for f in formats if f in _FORMAT_END]
+    others = [f for f in formats if f not in _FORMAT_END]
+    if len(others) > 1:
+        raise ValueError(f"Impossible de combiner les formats {others} dans un seul appel à dot.")
+    return delimited + others
+
+def _split_outputs(data: bytes, formats) -> dict:
+    """Découpe la sortie concaténée de dot ; `formats` doit venir de _order_formats()."""
+    out, pos = {}, 0
+    for fmt in formats:
+        end_re = _FORMAT_END.get(fmt)
+        m = end_re.search(data, pos) if end_re else None
+        end = m.end() if m else len(data)
+        out[fmt] = data[pos:end]
+        pos = end
+    return out
+
+class DotRenderer:
+    """
+    Construction du DOT et rendu par `dot` (sous-processus) ou par le moteur
+    intégré. Réglages en attributs simples ; GraphvizRenderer les lit dans QgsSettings.
+    """
+    def __init__(self, dot_path=None, engine='auto', focus_depth=1, focus_direction='both'):
+        self.dot_path = dot_path or shutil.which('dot')
+        self.engine = engine if engine in LAYOUT_ENGINES else 'auto'
+        self.focus_depth = max(1, int(focus_depth))
+        self.focus_direction = focus_direction if focus_direction in FOCUS_DIRECTIONS else 'both'
+        self.last_error = ""
+        self._cache = OrderedDict()          # {(args, dot): {format: bytes}}
+        self._cache_lock = threading.Lock()  # render_formats peut tourner dans plusieurs threads
+
+    def available(self) -> bool:
+        return self.dot_path is not None
+
+    def use_native(self, node_count: int) -> bool:
+        """Vrai si la mise en page doit passer par le moteur intégré."""
+        if self.engine == 'native' or not self.available():
+            return True
+        if self.engine == 'dot':
+            return False
+        return node_count <= NATIVE_AUTO_MAX_NODES
+
+    def _focus_subgraph(self, snapshot, focus_ids=None):
+        """(ids des couches gardées, arêtes gardées) : focus + voisinage (profondeur/sens réglés)."""
+        return snapshot.neighbourhood(focus_ids, self.focus_depth, self.focus_direction)
+
+    @staticmethod
+    def _pinned(keep_nodes, positions):
+        """Positions connues ({id: (x, y)} en pouces) des couches affichées."""
+        positions = positions or {}
+        return {nid: positions[nid] for nid in keep_nodes if nid in positions}
+
+    def layout_mode(self, keep_nodes, positions=None) -> str:
+        """
+        'native' / 'dot' : mise en page complète ;
+        'incremental' : moteur intégré, les positions connues sont conservées et
+        seules les couches nouvelles sont placées (la hiérarchie de `dot` reste
+        celle du dernier rendu complet).
+        """
+        if self._pinned(keep_nodes, positions):
+            return 'incremental'
+        return 'native' if self.use_native(len(keep_nodes)) else 'dot'
+
+    def _native_inputs(self, snapshot, keep_nodes, keep_edges):
+        nodes = [(nid, n.name) for nid, n in snapshot.layers.items() if nid in keep_nodes]
+        edges = [
+            (e.parent_layer_id, e.child_layer_id, '\n'.join(f'{p} → {c}' for p, c in e.pairs))
+            for e in keep_edges
+        ]
+        return nodes, edges
+
+    def _fixed_layout(self, snapshot, keep_nodes, keep_edges, positions):
+        """
+        Centres ({id: (x, y)} en pouces) de toutes les couches affichées quand des
+        positions sont connues : celles-ci sont gardées, les autres placées par
+        incremental_layout. {} sans position connue (mise en page complète).
+        """
+        pinned = self._pinned(keep_nodes, positions)
+        if not pinned:
+            return {}
+        nodes, edges = self._native_inputs(snapshot, keep_nodes, keep_edges)
+        placed, _ = parse_plain(incremental_layout(nodes, edges, pinned))
+        return {nid: (x, y) for nid, (x, y, _w, _h) in placed.items()}
+
+    def _build_dot(self, snapshot, highlight_ids=None, focus_ids=None, positions=None):
+        highlight_ids = set(highlight_ids or [])
+        keep_nodes, keep_edges = self._focus_subgraph(snapshot, focus_ids)
+        fixed = self._fixed_layout(snapshot, keep_nodes, keep_edges, positions)
+
+        def node_stmt(n):
+            base = f'"{_esc(n.id)}" [label="{_esc(n.name)}", shape=box'
+            if getattr(n, 'is_link_table', False):
+                base += ', style=filled, fillcolor="#FFE0B2"'
+            if n.id in highlight_ids:
+                base += ', penwidth=2'
+            if n.id in fixed:
+                # neato -n2 : positions en points, utilisées telles quelles
+                x, y = fixed[n.id]
+                base += f', pos="{x * 72:.2f},{y * 72:.2f}!"'
+            base += ']'
+            return base
+
+        lines = [
+            'digraph relations {',
+            '  rankdir=LR;',
+            '  graph [splines=true, notranslate=true];' if fixed else
+            '  graph [splines=true, overlap=false];',
+            '  node [fontname="Helvetica", fontsize=10];',
+            '  edge [fontname="Helvetica", fontsize=9];'
+        ]
+        for nid, n in snapshot.layers.items():
+            if nid in keep_nodes:
+                lines.append('  ' + node_stmt(n))
+        for e in keep_edges:
+            label = '\\n'.join([f'{_esc(p)} → {_esc(c)}' for p, c in e.pairs])
+            style = f' [label="{label}"]' if label else ''
+            lines.append(f'  "{_esc(e.parent_layer_id)}" -> "{_esc(e.child_layer_id)}"{style};')
+        lines.append('}')
+        return '\n'.join(lines)
+
+    def _engine_args(self, snapshot, focus_ids=None, positions=None):
+        """
+        Positions connues : toutes les couches sont placées d'avance (moteur
+        intégré) et neato -n2 ne fait que tracer les arcs ; sinon `dot`.
+        """
+        keep_nodes, _ = self._focus_subgraph(snapshot, focus_ids)
+        return ['-Kneato', '-n2'] if self._pinned(keep_nodes, positions) else []
+
+    def render_formats(self, snapshot, formats, highlight_ids=None, focus_ids=None, positions=None) -> dict:
+        """
+        Un seul appel à `dot` (DOT sur stdin, sorties sur stdout, aucun fichier
+        temporaire) pour tous les formats demandés. Retourne {format: bytes},
+        ou {} en cas d'échec (message dans last_error). Avec `positions`, le rendu
+        reprend la mise en page incrémentale du diagramme (mêmes positions qu'à l'écran).
+        Un même DOT avec les mêmes options n'est rendu qu'une fois (cache LRU).
+        """
+        out, self.last_error = self.render_outputs(snapshot, formats, highlight_ids, focus_ids, positions)
+        return out
+
+    def render_outputs(self, snapshot, formats, highlight_ids=None, focus_ids=None, positions=None):
+        """
+        Comme render_formats, mais retourne ({format: bytes}, stderr de dot) sans
+        toucher à last_error : sûr quand plusieurs threads partagent le renderer.
+        """
+        if not self.available():
+            return {}, "Graphviz (dot) introuvable."
+        formats = _order_formats(formats)
+        dot = self._build_dot(snapshot, highlight_ids, focus_ids, positions)
+        args = [self.dot_path] + self._engine_args(snapshot, focus_ids, positions) + ['-T' + f for f in formats]
+        key = (tuple(args), dot)
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return dict(hit), ""
+        proc = _run_no_console(args, dot.encode('utf-8'))
+        err = proc.stderr.decode('utf-8', errors='ignore').strip()
+        if proc.returncode != 0:
+            return {}, err or f"dot a échoué (code {proc.returncode})."
+        out = _split_outputs(proc.stdout, formats)
+        with self._cache_lock:
+            self._cache[key] = out
+            while len(self._cache) > RENDER_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return dict(out), err
+
+    def render_svg(self, snapshot, highlight_ids=None, focus_ids=None, positions=None) -> bytes:
+        return self.render_formats(snapshot, ['svg'], highlight_ids, focus_ids, positions).get('svg')
+
+    def render_plain_native(self, snapshot, highlight_ids=None, focus_ids=None, positions=None) -> str:
+        """Même sortie que `dot -Tplain`, calculée par le moteur intégré."""
+        keep_nodes, keep_edges = self._focus_subgraph(snapshot, focus_ids)
+        nodes, edges = self._native_inputs(snapshot, keep_nodes, keep_edges)
+        pinned = self._pinned(keep_nodes, positions)
+        if pinned:
+            return incremental_layout(nodes, edges, pinned)
+        return layered_layout(nodes, edges)
+
+    def render_plain(self, snapshot, highlight_ids=None, focus_ids=None, positions=None) -> str:
+        keep_nodes, _ = self._focus_subgraph(snapshot, focus_ids)
+        if self.layout_mode(keep_nodes, positions) in ('native', 'incremental'):
+            return self.render_plain_native(snapshot, highlight_ids, focus_ids, positions)
+        out = self.render_formats(snapshot, ['plain'], highlight_ids, focus_ids, positions).get('plain')
+        return out.decode('utf-8', errors='ignore') if out else ""
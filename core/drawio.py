@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+core/drawio.py
+Export LinQ -> .drawio (diagrams.net) avec boîtes "tables" repliables :
+- Swimlane parent (collapsible) = en-tête nom de table
+- Corps = grille 2 colonnes construite avec de vraies sous-cellules :
+    [PK | FKx]  |  [nom_champ souligné]
+- Tables N↔N : en-tête orangé
+Le fichier est écrit au fil de l'eau (write_drawio), éventuellement compressé
+(format natif de draw.io : deflate brut + base64) et réparti sur plusieurs
+pages (par groupe ou par focus), avec des renvois cliquables entre pages.
+Les tables peuvent être placées d'après la mise en page du diagramme
+(layout_from_plain : sortie -Tplain de dot ou du moteur intégré), tracés
+des relations compris.
+"""
+
+import base64
+import io
+import zlib
+from urllib.parse import quote
+from xml.sax.saxutils import escape as _esc, quoteattr as _qa
+
+from .layout import parse_plain
+
+# ---- Thème (proche de ton exemple noir & blanc) ----------------------------
+BORDER_OUT    = "#424242"
+GRID_COLOR    = "#BDBDBD"
+HEADER_NORM_BG= "#FFFFFF"
+HEADER_NORM_FG= "#111111"
+BODY_BG       = "#FFFFFF"
+
+# Tables de liaison (N↔N) : petit repère visuel
+HEADER_LINK_BG= "#FFE0B2"
+HEADER_LINK_FG= "#111111"
+
+EDGE_COLOR    = "#616161"
+EDGE_STYLE = (
+    "edgeStyle=orthogonalEdgeStyle;"
+    "endArrow=block;endFill=1;"
+    f"strokeColor={EDGE_COLOR};"
+    "rounded=0;orthogonalLoop=1;jettySize=auto;html=1;"
+    "labelBackgroundColor=#FFFFFF;fontSize=11;"
+)
+
+# Relation suivant le tracé de la mise en page (points de passage)
+EDGE_ROUTED_STYLE = (
+    "edgeStyle=none;curved=1;"
+    "endArrow=block;endFill=1;"
+    f"strokeColor={EDGE_COLOR};"
+    "html=1;labelBackgroundColor=#FFFFFF;fontSize=11;"
+)
+
+# Renvoi vers une table d'une autre page (clic = changement de page)
+STUB_STYLE = (
+    "shape=rectangle;rounded=1;dashed=1;html=1;whiteSpace=wrap;"
+    f"strokeColor={EDGE_COLOR};fillColor=#F5F5F5;fontColor=#424242;fontSize=11;"
+)
+STUB_W, STUB_H = 200, 44
+
+# Caractères laissés tels quels par encodeURIComponent (décodage de draw.io)
+URI_SAFE = "-_.!~*'()"
+
+# ---------------------------------------------------------------------------
+
+GRAPH_OPEN = (
+    '<mxGraphModel dx="1280" dy="720" grid="1" gridSize="10" guides="1" '
+    'tooltips="1" connect="1" arrows="1" fold="1" page="1" pageScale="1" pageWidth="1654" pageHeight="1169">\n'
+    '      <root>\n'
+    '        <mxCell id="0"/>\n'
+    '        <mxCell id="1" parent="0"/>\n'
+)
+GRAPH_CLOSE = (
+    '      </root>\n'
+    '    </mxGraphModel>\n'
+)
+
+
+class _DiagramSink:
+    """
+    Contenu d'un <diagram>, écrit au fil de l'eau : tel quel, ou compressé comme
+    le fait draw.io (encodeURIComponent → deflate brut → base64), par morceaux.
+    """
+    def __init__(self, out, compressed=False):
+        self.out = out
+        self.compressed = compressed
+        if compressed:
+            self._z = zlib.compressobj(9, zlib.DEFLATED, -15)
+            self._pending = b''   # base64 se code par blocs de 3 octets
+
+    def write(self, text):
+        if not self.compressed:
+            self.out.write(text)
+            return
+        self._push(self._z.compress(quote(text, safe=URI_SAFE).encode('ascii')))
+
+    def _push(self, data, final=False):
+        data = self._pending + data
+        cut = len(data) if final else len(data) - len(data) % 3
+        if cut:
+            self.out.write(base64.b64encode(data[:cut]).decode('ascii'))
+        self._pending = data[cut:]
+
+    def close(self):
+        if self.compressed:
+            self._push(self._z.flush(), final=True)
+
+def _gather_pk_fk(snapshot):
+    """ {layer_id: {'pk': set(), 'fk': list()}} """
+    pkfk = {lid: {'pk': set(), 'fk': []} for lid in snapshot.layers.keys()}
+    for e in snapshot.edges:
+        for p, c in e.pairs:
+            pkfk[e.parent_layer_id]['pk'].add(p)
+            if c not in pkfk[e.child_layer_id]['fk']:
+                pkfk[e.child_layer_id]['fk'].append(c)
+    return pkfk
+
+def _grid_positions(n, start_x=40, start_y=40, cell_w=300, cell_h=170, cols=4):
+    pos = []
+    for i in range(n):
+        r = i // cols
+        c = i % cols
+        pos.append((start_x + c * cell_w, start_y + r * cell_h))
+    return pos
+
+# métriques
+HEADER_H = 28
+ROW_H    = 22
+LEFT_W   = 56
+MIN_ROWS = 1    # au moins la ligne "…"
+BASE_W   = 280
+
+
+def _box_wh(row_count):
+    rows = max(MIN_ROWS, row_count + 1)    # +1 pour "…"
+    return BASE_W, HEADER_H + rows * ROW_H
+
+
+PT_PER_INCH = 72.0     # unités draw.io ≈ points
+LAYOUT_GAP = 40        # écart minimal entre deux tables (px draw.io)
+COLUMN_TOL = 36.0      # boîtes plus proches que ça en x : même colonne (rang)
+
+
+def _axis_scales(centre, size, gap):
+    """
+    Étirements (sx, sy) ≥ 1 pour que les tables draw.io, plus grandes que les
+    boîtes du diagramme, ne se chevauchent pas : sx sépare les colonnes (rangs),
+    sy sépare les tables qui restent côte à côte horizontalement.
+    """
+    xs = sorted({round(x) for x, _ in centre.values()})
+    dx = [b - a for a, b in zip(xs, xs[1:]) if b - a > COLUMN_TOL]
+    sx = max([1.0] + [(BASE_W + gap) / d for d in dx])
+
+    sy = 1.0
+    order = sorted(centre, key=lambda nid: centre[nid][0])
+    for i, a in enumerate(order):
+        ax, ay = centre[a]
+        for b in order[i + 1:]:
+            bx, by = centre[b]
+            if (bx - ax) * sx > (size[a][0] + size[b][0]) / 2.0 + gap - 1.0:
+                break
+            d = abs(by - ay)
+            if d >= 1.0:
+                sy = max(sy, ((size[a][1] + size[b][1]) / 2.0 + gap) / d)
+    return sx, sy
+
+
+def layout_from_plain(plain, snapshot, centres=None, gap=LAYOUT_GAP):
+    """
+    Mise en page draw.io tirée d'une sortie -Tplain (dot ou moteur intégré) :
+    ({layer_id: (x, y)} coins haut-gauche, {(parent, enfant): [[(x, y), ...], ...]}
+    points de passage des relations, dans l'ordre du texte). Les deux sont à
+    passer à write_drawio (node_positions, routes).
+    centres : {layer_id: (x, y)} en pouces, repère plain, prioritaires sur le
+    texte (boîtes déplacées à la main) ; leurs relations perdent leur tracé.
+    """
+    nodes, edges = parse_plain(plain)
+    pkfk = _gather_pk_fk(snapshot)
+    size = {nid: _box_wh(len(pkfk[nid]['pk']) + len(pkfk[nid]['fk'])) for nid in nodes if nid in snapshot.layers}
+    centre = {nid: (x * PT_PER_INCH, -y * PT_PER_INCH) for nid, (x, y, w, h) in nodes.items() if nid in size}
+    moved = set()
+    for nid, (x, y) in (centres or {}).items():
+        if nid not in size:
+            continue
+        pt = (x * PT_PER_INCH, -y * PT_PER_INCH)
+        if abs(pt[0] - centre[nid][0]) > 1.0 or abs(pt[1] - centre[nid][1]) > 1.0:
+            centre[nid] = pt
+            moved.add(nid)
+    if not centre:
+        return {}, {}
+
+    sx, sy = _axis_scales(centre, size, gap)
+    pos = {nid: (x * sx - size[nid][0] / 2.0, y * sy - size[nid][1] / 2.0) for nid, (x, y) in centre.items()}
+    x0 = min(x for x, _ in pos.values()) - 40
+    y0 = min(y for _, y in pos.values()) - 40
+    pos = {nid: (x - x0, y - y0) for nid, (x, y) in pos.items()}
+
+    def inside(nid, px, py):
+        x, y = pos[nid]
+        w, h = size[nid]
+        return x <= px <= x + w and y <= py <= y + h
+
+    routes = {}
+    for tail, head, pts, _, _ in edges:
+        if tail not in pos or head not in pos:
+            continue
+        way = []
+        if tail not in moved and head not in moved and tail != head:
+            for x, y in pts[1:-1]:
+                px, py = x * PT_PER_INCH * sx - x0, -y * PT_PER_INCH * sy - y0
+                if not inside(tail, px, py) and not inside(head, px, py):
+                    way.append((px, py))
+        routes.setdefault((tail, head), []).append(way)
+    return pos, routes
+
+
+def cluster_pages(snapshot, mode):
+    """Une page par groupe (voir RelationsSnapshot.clusters), plus une page pour les tables restantes."""
+    groups = snapshot.clusters(mode)
+    labels = snapshot.cluster_labels(mode, groups)
+    pages = [(labels[key], ids) for key, ids in groups.items()]
+    grouped = {nid for _, ids in pages for nid in ids}
+    rest = [nid for nid in sorted(snapshot.layers, key=lambda i: str(snapshot.layers[i].name).lower())
+            if nid not in grouped]
+    if rest:
+        pages.append(('Autres tables', rest))
+    return pages
+
+
+def focus_pages(snapshot, focus_ids, depth=1, direction='both'):
+    """Une page par table de focus : la table et son voisinage."""
+    pages = []
+    for fid in sorted(focus_ids or [], key=lambda i: str(snapshot.layers[i].name).lower() if i in snapshot.layers else i):
+        if fid not in snapshot.layers:
+            continue
+        keep, _ = snapshot.neighbourhood({fid}, depth, direction)
+        pages.append((snapshot.layers[fid].name, sorted(keep)))
+    return pages
+
+
+def _page_positions(ids, node_positions, box_h):
+    """
+    ({layer_id: (x, y)}, (dx, dy)) pour une page : positions connues ramenées
+    à l'origine de la page (décalage dx, dy), tables sans position en grille
+    sous le bloc placé.
+    """
+    known = {nid: node_positions[nid] for nid in ids if node_positions and nid in node_positions}
+    unknown = [nid for nid in ids if nid not in known]
+    pos = {}
+    start_y = 40
+    shift = (0, 0)
+    if known:
+        shift = (40 - min(x for x, _ in known.values()), 40 - min(y for _, y in known.values()))
+        for nid, (x, y) in known.items():
+            pos[nid] = (x + shift[0], y + shift[1])
+        start_y = max(y + box_h[nid] for nid, (x, y) in pos.items()) + 60
+    grid = _grid_positions(len(unknown), start_y=start_y)
+    for i, nid in enumerate(unknown):
+        pos[nid] = grid[i]
+    return pos, shift
+
+
+def _write_table(sink, cell_id, node, pkfk, x, y):
+    lid   = node.id
+    is_ln = bool(getattr(node, 'is_link_table', False))
+    pk    = sorted(pkfk[lid]['pk'])
+    fk    = list(pkfk[lid]['fk'])
+    w, h  = _box_wh(len(pk) + len(fk))
+
+    head_bg = HEADER_LINK_BG if is_ln else HEADER_NORM_BG
+    head_fg = HEADER_LINK_FG if is_ln else HEADER_NORM_FG
+    swim_style = (
+        "shape=swimlane;collapsible=1;fold=0;rounded=1;html=1;"
+        f"strokeColor={BORDER_OUT};"
+        f"fillColor={head_bg};fontColor={head_fg};"
+        f"swimlaneFillColor={BODY_BG};"
+        f"startSize={HEADER_H};"
+        "fontStyle=1;fontSize=12;"
+    )
+    sink.write(
+        f'        <mxCell id="{cell_id}" value={_qa(_esc(node.name))} style="{swim_style}" vertex="1" parent="1">\n'
+        f'          <mxGeometry x="{int(x)}" y="{int(y)}" width="{w}" height="{h}" as="geometry"/>\n'
+        '        </mxCell>\n'
+    )
+
+    # Lignes : d'abord PK (peut en avoir plusieurs), puis FK1..n, puis "…"
+    rows = [("PK", p) for p in pk]
+    rows += [(f"FK{i}", f) for i, f in enumerate(sorted(fk), start=1)]
+    rows.append(("", "…"))
+
+    left_style = (
+        "shape=rectangle;html=1;rounded=0;"
+        f"strokeColor={GRID_COLOR};fillColor={BODY_BG};"
+        "align=center;verticalAlign=middle;fontSize=11;fontStyle=0;"
+    )
+    right_style = (
+        "shape=rectangle;html=1;rounded=0;"
+        f"strokeColor={GRID_COLOR};fillColor={BODY_BG};"
+        "align=left;verticalAlign=middle;spacingLeft=8;fontSize=11;"
+    )
+    # Cellules internes : rectangles bordés pour dessiner la grille (y relatif au swimlane)
+    for r_idx, (tag, field) in enumerate(rows):
+        ry = HEADER_H + r_idx * ROW_H
+        field_html = f'<span style="text-decoration:underline">{_esc(field)}</span>' if field != "…" else "…"
+        sink.write(
+            f'        <mxCell id="{cell_id}l{r_idx}" value={_qa(_esc(tag))} style="{left_style}" vertex="1" parent="{cell_id}">\n'
+            f'          <mxGeometry x="0" y="{ry}" width="{LEFT_W}" height="{ROW_H}" as="geometry"/>\n'
+            '        </mxCell>\n'
+            f'        <mxCell id="{cell_id}r{r_idx}" value={_qa(field_html)} style="{right_style}" vertex="1" parent="{cell_id}">\n'
+            f'          <mxGeometry x="{LEFT_W}" y="{ry}" width="{w - LEFT_W}" height="{ROW_H}" as="geometry"/>\n'
+            '        </mxCell>\n'
+        )
+    return h
+
+
+def _edge_label(e, id2name):
+    parent_name = id2name.get(e.parent_layer_id, 'parent')
+    child_name  = id2name.get(e.child_layer_id,  'child')
+    return '<br>'.join(_esc(f'{parent_name}.{p} → {child_name}.{c}') for (p, c) in e.pairs)
+
+
+def _waypoints(points, shift):
+    if not points:
+        return ''
+    pts = ''.join(f'<mxPoint x="{int(x + shift[0])}" y="{int(y + shift[1])}"/>' for x, y in points)
+    return f'<Array as="points">{pts}</Array>'
+
+
+def _write_page(sink, page, nodes, edge_list, node_positions, routes, pkfk, id2name, home, page_meta):
+    """Une page : ses tables, les relations entre elles, et un renvoi par table d'une autre page."""
+    name, ids = page
+    box_h = {nid: _box_wh(len(pkfk[nid]['pk']) + len(pkfk[nid]['fk']))[1] for nid in ids}
+    pos, shift = _page_positions(ids, node_positions, box_h)
+    on_page = set(ids)
+    placed = {nid for nid in ids if node_positions and nid in node_positions}
+    pending = {key: list(ways) for key, ways in (routes or {}).items()}
+
+    sink.write(GRAPH_OPEN)
+    cell_of = {}
+    for i, nid in enumerate(ids):
+        cell_of[nid] = f"t{i}"
+        x, y = pos[nid]
+        _write_table(sink, cell_of[nid], nodes[nid], pkfk, x, y)
+
+    # Renvois (à droite du bloc de tables)
+    stub_x = max((x for x, _ in pos.values()), default=40) + BASE_W + 120
+    stubs = {}
+    for k, e in enumerate(edge_list):
+        p_in, c_in = e.parent_layer_id in on_page, e.child_layer_id in on_page
+        if not (p_in or c_in):
+            continue
+        ends = []
+        for nid, here in ((e.parent_layer_id, p_in), (e.child_layer_id, c_in)):
+            if here:
+                ends.append(cell_of[nid])
+                continue
+            if nid not in stubs:
+                stubs[nid] = f"x{len(stubs)}"
+                target_id, target_name = page_meta[home[nid]] if nid in home else (None, '')
+                label = f"↗ {_esc(id2name.get(nid, nid))}"
+                link = ''
+                if target_id is not None:
+                    label += f"<br><i>page {_esc(target_name)}</i>"
+                    link = f' link={_qa("data:page/id," + target_id)}'
+                sink.write(
+                    f'        <UserObject id="{stubs[nid]}" label={_qa(label)}{link}>\n'
+                    f'          <mxCell style="{STUB_STYLE}" vertex="1" parent="1">\n'
+                    f'            <mxGeometry x="{int(stub_x)}" y="{40 + (len(stubs) - 1) * (STUB_H + 16)}" '
+                    f'width="{STUB_W}" height="{STUB_H}" as="geometry"/>\n'
+                    '          </mxCell>\n'
+                    '        </UserObject>\n'
+                )
+            ends.append(stubs[nid])
+        # Tracé de la mise en page (seulement entre deux tables placées d'après elle)
+        ways = pending.get((e.parent_layer_id, e.child_layer_id))
+        way = ways.pop(0) if ways else None
+        if way is not None and not (e.parent_layer_id in placed and e.child_layer_id in placed):
+            way = None
+        style = EDGE_ROUTED_STYLE if way else EDGE_STYLE
+        sink.write(
+            f'        <mxCell id="e{k}" value={_qa(_edge_label(e, id2name))} '
+            f'style="{style}" edge="1" parent="1" source="{ends[0]}" target="{ends[1]}">\n'
+            f'          <mxGeometry relative="1" as="geometry">{_waypoints(way, shift)}</mxGeometry>\n'
+            '        </mxCell>\n'
+        )
+    sink.write(GRAPH_CLOSE)
+
+
+def write_drawio(out, snapshot, node_positions=None, style=None, focus_ids=None,
+                 focus_depth=1, focus_direction='both', compressed=False, pages=None, routes=None):
+    """
+    Écrit le fichier .drawio dans `out` (flux texte), sans construire le document en mémoire.
+    snapshot.layers: dict id->LayerNode(id, name, is_link_table)
+    snapshot.edges: list RelationEdge(id, parent_layer_id, child_layer_id, pairs=[(pk, fk), ...])
+    node_positions : {layer_id: (x, y)} coin haut-gauche, px (sinon grille)
+    routes : {(parent, enfant): [[(x, y), ...], ...]} points de passage des
+    relations, même repère que node_positions (voir layout_from_plain)
+    focus_depth / focus_direction : voisinage gardé autour de focus_ids
+    (nombre de relations ; 'both', 'parents' ou 'children').
+    compressed : contenu des pages au format compressé de draw.io.
+    pages : [(nom, [layer_ids])] pour répartir les tables sur plusieurs pages
+    (voir cluster_pages / focus_pages) ; une table présente sur plusieurs pages
+    est « chez elle » sur la première, c'est là que mènent les renvois.
+    """
+    id2name = {n.id: n.name for n in snapshot.layers.values()}
+    pkfk = _gather_pk_fk(snapshot)
+
+    # Filtrage optionnel des couches / relations (même logique que GraphvizRenderer)
+    focus_ids = set(focus_ids or [])
+    name_key = lambda nid: str(snapshot.layers[nid].name).lower()
+    if focus_ids:
+        keep_nodes, edge_list = snapshot.neighbourhood(focus_ids, focus_depth, focus_direction)
+    else:
+        keep_nodes, edge_list = set(snapshot.layers.keys()), list(snapshot.edges)
+
+    if pages:
+        pages = [(name, sorted((nid for nid in dict.fromkeys(ids) if nid in keep_nodes), key=name_key))
+                 for name, ids in pages]
+        pages = [p for p in pages if p[1]]
+    if not pages:
+        pages = [('LinQ', sorted(keep_nodes, key=name_key))]
+
+    single = len(pages) == 1
+    page_meta = [("linq-relations" if single else f"linq-relations-{i + 1}", name)
+                 for i, (name, _) in enumerate(pages)]
+    home = {}
+    for i, (_, ids) in enumerate(pages):
+        for nid in ids:
+            home.setdefault(nid, i)
+
+    out.write('<mxfile host="app.diagrams.net"' + (' compressed="true"' if compressed else '') + '>\n')
+    for i, page in enumerate(pages):
+        pid, name = page_meta[i]
+        out.write(f'  <diagram id={_qa(pid)} name={_qa(name)}>')
+        if not compressed:
+            out.write('\n    ')
+        sink = _DiagramSink(out, compressed)
+        _write_page(sink, page, snapshot.layers, edge_list, node_positions, routes, pkfk, id2name, home, page_meta)
+        sink.close()
+        out.write('</diagram>\n' if compressed else '  </diagram>\n')
+    out.write('</mxfile>\n')
+
+
+def build_drawio(snapshot, node_positions=None, style=None, focus_ids=None,
+                 focus_depth=1, focus_direction='both', compressed=False, pages=None, routes=None) -> bytes:
+    """Comme write_drawio, mais retourne le fichier complet (octets UTF-8)."""
+    buf = io.StringIO()
+    write_drawio(buf, snapshot, node_positions, style, focus_ids, focus_depth, focus_direction,
+                 compressed, pages, routes)
+    return buf.getvalue().encode('utf-8')
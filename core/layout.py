@@ -0,0 +1,538 @@
+# -*- coding: utf-8 -*-
+"""
+core/layout.py
+Mise en page « en couches » (Sugiyama) en pur Python, utilisée quand Graphviz
+est absent ou pour les petites vues (plus rapide que de lancer `dot`) :
+  1. suppression des cycles (inversion des arcs retour d'un parcours en profondeur),
+  2. affectation des rangs (plus long chemin) + nœuds fictifs sur les arcs longs,
+  3. réduction des croisements (barycentres, balayages alternés),
+  4. affectation des coordonnées (médianes + compaction sous contraintes d'écart).
+
+La sortie reproduit le format `dot -Tplain` (pouces, origine en bas à gauche,
+rankdir=LR) : DiagramCanvas.set_graph la consomme sans distinction.
+"""
+
+import re
+from collections import defaultdict
+
+FONT_SIZE = 10.0
+CHAR_W = 0.55 * FONT_SIZE / 72.0      # largeur moyenne d'un caractère (pouces)
+LINE_H = 1.2 * FONT_SIZE / 72.0
+NODE_MIN_W = 0.75                     # mêmes minima que les boîtes de dot
+NODE_MIN_H = 0.5
+NODE_SEP = 0.25
+DUMMY_SEP = 0.15
+RANK_SEP = 0.75
+LOOP_H = 0.45
+PARALLEL_SEP = 0.18
+SWEEPS = 12
+
+_ID_RE = re.compile(r'^(?:[A-Za-z_\x80-\uffff][\w\x80-\uffff]*|-?(?:\.\d+|\d+(?:\.\d*)?))$')
+
+
+def _quote(s) -> str:
+    """Nom tel que dot l'écrirait en sortie plain (guillemets si nécessaire)."""
+    s = str(s).replace('\n', '\\n')
+    if _ID_RE.match(s):
+        return s
+    return '"' + s.replace('"', '\\"') + '"'
+
+
+def _num(v: float) -> str:
+    txt = f"{v:.4f}".rstrip('0').rstrip('.')
+    return "0" if txt in ("", "-0") else txt
+
+
+def _text_size(text):
+    lines = str(text or "").split('\n')
+    return max(len(l) for l in lines) * CHAR_W, len(lines) * LINE_H
+
+
+# ---------------------------------------------------------------------------
+# Étapes de l'algorithme
+# ---------------------------------------------------------------------------
+
+def _back_edges(order, succ):
+    """Arcs retour d'un DFS itératif : les inverser rend le graphe acyclique."""
+    state = {}          # 1 = sur la pile, 2 = terminé
+    back = set()
+    for root in order:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(succ[root]))]
+        while stack:
+            u, it = stack[-1]
+            for v in it:
+                s = state.get(v)
+                if s is None:
+                    state[v] = 1
+                    stack.append((v, iter(succ[v])))
+                    break
+                if s == 1:
+                    back.add((u, v))
+            else:
+                state[u] = 2
+                stack.pop()
+    return back
+
+
+def _longest_path_ranks(order, succ, pred):
+    indeg = {n: len(pred[n]) for n in order}
+    queue = [n for n in order if indeg[n] == 0]
+    rank = {n: 0 for n in order}
+    i = 0
+    while i < len(queue):
+        u = queue[i]; i += 1
+        for v in succ[u]:
+            rank[v] = max(rank[v], rank[u] + 1)
+            indeg[v] -= 1
+            if indeg[v] == 0:
+                queue.append(v)
+    return rank
+
+
+def _inversions(seq):
+    """Nombre d'inversions (arbre de Fenwick) = croisements entre deux couches."""
+    if not seq:
+        return 0
+    size = max(seq) + 1
+    tree = [0] * (size + 1)
+    inv = 0
+    for i, v in enumerate(seq):
+        j, le = v + 1, 0
+        while j > 0:
+            le += tree[j]; j -= j & -j
+        inv += i - le
+        j = v + 1
+        while j <= size:
+            tree[j] += 1; j += j & -j
+    return inv
+
+
+def _crossings(layers, down):
+    total = 0
+    for upper, lower in zip(layers, layers[1:]):
+        pos = {n: k for k, n in enumerate(lower)}
+        seq = []
+        for n in upper:
+            seq.extend(sorted(pos[m] for m in down[n]))
+        total += _inversions(seq)
+    return total
+
+
+def _sweep(layers, neigh, downward):
+    idx = range(1, len(layers)) if downward else range(len(layers) - 2, -1, -1)
+    for i in idx:
+        ref = layers[i - 1] if downward else layers[i + 1]
+        pos = {n: k for k, n in enumerate(ref)}
+
+        def key(item):
+            k, n = item
+            ps = [pos[m] for m in neigh[n] if m in pos]
+            return (sum(ps) / len(ps) if ps else k, k)
+
+        layers[i] = [n for _, n in sorted(enumerate(layers[i]), key=key)]
+
+
+def _reduce_crossings(layers, up, down):
+    best = [list(l) for l in layers]
+    best_c = _crossings(layers, down)
+    for it in range(SWEEPS):
+        if best_c == 0:
+            break
+        downward = (it % 2 == 0)
+        _sweep(layers, up if downward else down, downward)
+        c = _crossings(layers, down)
+        if c < best_c:
+            best, best_c = [list(l) for l in layers], c
+    return best
+
+
+def _pack(order, desired, gaps):
+    """
+    Positions au plus près de `desired` avec pos[k+1] - pos[k] >= gaps[k]
+    (régression isotone par fusion de blocs adjacents).
+    """
+    offs = [0.0]
+    for g in gaps:
+        offs.append(offs[-1] + g)
+    blocks = []     # [somme, effectif]
+    for k, n in enumerate(order):
+        blocks.append([desired[n] - offs[k], 1])
+        while len(blocks) > 1 and blocks[-2][0] / blocks[-2][1] > blocks[-1][0] / blocks[-1][1]:
+            s, c = blocks.pop()
+            blocks[-1][0] += s; blocks[-1][1] += c
+    z = []
+    for s, c in blocks:
+        z.extend([s / c] * c)
+    return {n: z[k] + offs[k] for k, n in enumerate(order)}
+
+
+def _median(vals):
+    vals = sorted(vals)
+    m = len(vals) // 2
+    return vals[m] if len(vals) % 2 else (vals[m - 1] + vals[m]) / 2.0
+
+
+def _assign_y(layers, up, down, extent, is_dummy):
+    def gaps(layer):
+        out = []
+        for a, b in zip(layer, layer[1:]):
+            sep = DUMMY_SEP if (is_dummy(a) or is_dummy(b)) else NODE_SEP
+            out.append((extent[a] + extent[b]) / 2.0 + sep)
+        return out
+
+    y = {}
+    for layer in layers:
+        y.update(_pack(layer, {n: 0.0 for n in layer}, gaps(layer)))
+
+    passes = [(up, range(1, len(layers))), (down, range(len(layers) - 2, -1, -1))] * 3
+    for neigh, idx in passes:
+        for i in idx:
+            layer = layers[i]
+            desired = {n: (_median([y[m] for m in neigh[n]]) if neigh[n] else y[n]) for n in layer}
+            y.update(_pack(layer, desired, gaps(layer)))
+    # Passe finale : médiane des deux côtés
+    for layer in layers:
+        desired = {}
+        for n in layer:
+            ns = list(up[n]) + list(down[n])
+            desired[n] = _median([y[m] for m in ns]) if ns else y[n]
+        y.update(_pack(layer, desired, gaps(layer)))
+    return y
+
+
+# ---------------------------------------------------------------------------
+# Lecture / écriture du format plain
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+
+
+def _tokens(line):
+    out = []
+    for m in _TOKEN_RE.finditer(line):
+        if m.group(1) is not None:
+            out.append(m.group(1).replace('\\"', '"'))
+        else:
+            out.append(m.group(2))
+    return out
+
+
+def parse_plain(plain_text: str):
+    """
+    Lit une sortie `-Tplain` (dot ou moteur intégré).
+    Retourne (nodes, edges) :
+      nodes = {id: (x, y, w, h)} en pouces, repère plain (y vers le haut) ;
+      edges = [(tail, head, points, label, label_pos)] dans l'ordre du texte,
+      points = [(x, y), ...] (Bézier cubiques : 3k+1 points), label_pos ou None.
+    """
+    nodes, edges = {}, []
+    for raw in (plain_text or "").splitlines():
+        parts = _tokens(raw.strip())
+        if not parts:
+            continue
+        kind = parts[0]
+        try:
+            if kind == "node" and len(parts) >= 6:
+                nodes[parts[1]] = tuple(map(float, parts[2:6]))
+            elif kind == "edge" and len(parts) >= 4:
+                n = int(parts[3])
+                vals = list(map(float, parts[4:4 + 2 * n]))
+                pts = list(zip(vals[0::2], vals[1::2]))
+                rest = parts[4 + 2 * n:]
+                label, label_pos = None, None
+                if len(rest) >= 5:
+                    label, label_pos = rest[0], (float(rest[1]), float(rest[2]))
+                edges.append((parts[1], parts[2], pts, label, label_pos))
+        except ValueError:
+            continue
+    return nodes, edges
+
+
+def _plain_text(ids, labels, size, pos, geoms) -> str:
+    """pos = {id: (x, y)} (centres, repère plain) ; geoms = [(t, h, points, label, label_pos)]."""
+    if ids:
+        min_x = min(pos[n][0] - size[n][0] / 2.0 for n in ids)
+        max_x = max(pos[n][0] + size[n][0] / 2.0 for n in ids)
+        min_y = min(pos[n][1] - size[n][1] / 2.0 for n in ids)
+        max_y = max(pos[n][1] + size[n][1] / 2.0 for n in ids)
+    else:
+        min_x = max_x = min_y = max_y = 0.0
+    out = [f"graph 1 {_num(max_x - min_x)} {_num(max_y - min_y)}"]
+    for n in ids:
+        w, h = size[n]
+        out.append(f"node {_quote(n)} {_num(pos[n][0])} {_num(pos[n][1])} {_num(w)} {_num(h)} "
+                   f"{_quote(labels[n])} solid box black lightgrey")
+    for t, h, pts, lbl, lbl_pos in geoms:
+        coords = " ".join(f"{_num(a)} {_num(b)}" for a, b in pts)
+        label_part = f" {_quote(lbl)} {_num(lbl_pos[0])} {_num(lbl_pos[1])}" if lbl else ""
+        out.append(f"edge {_quote(t)} {_quote(h)} {len(pts)} {coords}{label_part} solid black")
+    out.append("stop")
+    return "\n".join(out) + "\n"
+
+
+def _loop_points(cx, cy, w, h, k):
+    """Boucle (relation réflexive) au-dessus de la boîte, k = rang de la boucle."""
+    lift = LOOP_H + k * PARALLEL_SEP
+    top = cy + h / 2.0
+    pts = [(cx + w / 4.0, top), (cx + w / 4.0 + 0.3, top + lift),
+           (cx - w / 4.0 - 0.3, top + lift), (cx - w / 4.0, top)]
+    return pts, (cx, top + lift)
+
+
+def _smooth(way):
+    """Polyligne → suite de Bézier cubiques horizontales (3k+1 points) + milieu."""
+    pts = [way[0]]
+    for (ax, ay), (bx, by) in zip(way, way[1:]):
+        mx = (ax + bx) / 2.0
+        pts += [(mx, ay), (mx, by), (bx, by)]
+    mid = len(way) // 2
+    if len(way) % 2:
+        lbl_pos = way[mid]
+    else:
+        lbl_pos = ((way[mid - 1][0] + way[mid][0]) / 2.0, (way[mid - 1][1] + way[mid][1]) / 2.0)
+    return pts, lbl_pos
+
+
+def _prepare(nodes, edges):
+    ids = []
+    labels = {}
+    for nid, label in nodes:
+        if nid not in labels:
+            ids.append(nid)
+        labels[nid] = label if label is not None else nid
+    edges = [(t, h, lbl) for t, h, lbl in edges if t in labels and h in labels]
+    loops = defaultdict(int)
+    for t, h, _ in edges:
+        if t == h:
+            loops[t] += 1
+    size = {}
+    for nid in ids:
+        tw, th = _text_size(labels[nid])
+        size[nid] = (max(NODE_MIN_W, tw + 0.3), max(NODE_MIN_H, th + 0.2))
+    return ids, labels, edges, size, loops
+
+
+# ---------------------------------------------------------------------------
+# Points d'entrée
+# ---------------------------------------------------------------------------
+
+def layered_layout(nodes, edges) -> str:
+    """
+    nodes : [(id, label)] ; edges : [(tail, head, label)] (label peut être vide,
+    boucles et arêtes multiples acceptées). Retourne un texte au format -Tplain.
+    """
+    ids, labels, edges, size, loops = _prepare(nodes, edges)
+
+    # 1) Graphe simple sans boucles, puis inversion des arcs retour
+    succ = {n: [] for n in ids}
+    pred = {n: [] for n in ids}
+    for t, h, _ in edges:
+        if t != h and h not in succ[t]:
+            succ[t].append(h); pred[h].append(t)
+    start = [n for n in ids if not pred[n]] + [n for n in ids if pred[n]]
+    back = _back_edges(start, succ)
+
+    dag = set()
+    for t in ids:
+        for h in succ[t]:
+            dag.add((h, t) if (t, h) in back else (t, h))
+    dsucc = {n: [] for n in ids}
+    dpred = {n: [] for n in ids}
+    order = {n: i for i, n in enumerate(ids)}
+    for t, h in sorted(dag, key=lambda e: (order[e[0]], order[e[1]])):
+        dsucc[t].append(h); dpred[h].append(t)
+
+    # 2) Rangs + chaînes de nœuds fictifs
+    rank = _longest_path_ranks(ids, dsucc, dpred)
+    up = defaultdict(list)
+    down = defaultdict(list)
+    chains = {}
+    dummies = set()
+    for t, h in dag:
+        chain = [t]
+        for r in range(rank[t] + 1, rank[h]):
+            d = ('\0', t, h, r)
+            dummies.add(d); rank[d] = r
+            chain.append(d)
+        chain.append(h)
+        chains[(t, h)] = chain
+        for a, b in zip(chain, chain[1:]):
+            down[a].append(b); up[b].append(a)
+
+    n_layers = (max(rank.values()) + 1) if rank else 0
+    layers = [[] for _ in range(n_layers)]
+    for n in ids:
+        layers[rank[n]].append(n)
+    for d in sorted(dummies, key=lambda d: (order[d[1]], order[d[2]], d[3])):
+        layers[rank[d]].append(d)
+
+    # 3) Croisements
+    layers = _reduce_crossings(layers, up, down)
+
+    # 4) Coordonnées : les rangs sur x (LR), l'ordre dans la couche sur y (vers le bas)
+    def is_dummy(n):
+        return n in dummies
+
+    extent = {}
+    for layer in layers:
+        for n in layer:
+            if is_dummy(n):
+                extent[n] = 0.0
+            else:
+                extent[n] = size[n][1] + 2 * LOOP_H * min(loops[n], 1) + PARALLEL_SEP * max(loops[n] - 1, 0)
+    y = _assign_y(layers, up, down, extent, is_dummy)
+
+    label_w = max([_text_size(lbl)[0] for _, _, lbl in edges if lbl] or [0.0])
+    gap = max(RANK_SEP, label_w + 0.3)
+    x = {}
+    cursor = 0.0
+    for layer in layers:
+        lw = max([size[n][0] for n in layer if not is_dummy(n)] or [0.0])
+        for n in layer:
+            x[n] = cursor + lw / 2.0
+        cursor += lw + gap
+
+    # Normalisation : boîte englobante en (0, 0), y vers le haut
+    if ids:
+        min_x = min(x[n] - size[n][0] / 2.0 for n in ids)
+        max_y = max(y[n] + extent[n] / 2.0 for n in ids)
+    else:
+        min_x = max_y = 0.0
+    pos = {n: (x[n] - min_x, max_y - y[n]) for n in list(x)}
+
+    # Arêtes : polyligne passant par les nœuds fictifs, lissée en Bézier cubiques
+    parallel = defaultdict(int)
+    for t, h, _ in edges:
+        parallel[(t, h) if (t, h) in chains else (h, t)] += 1
+    seen = defaultdict(int)
+    geoms = []
+    for t, h, lbl in edges:
+        key = (t, h) if (t, h) in chains else (h, t)
+        k = seen[key]; seen[key] += 1
+        if t == h:
+            pts, lbl_pos = _loop_points(pos[t][0], pos[t][1], size[t][0], size[t][1], k)
+        else:
+            shift = (k - (parallel[key] - 1) / 2.0) * PARALLEL_SEP
+            chain = chains[key]
+            a, b = chain[0], chain[-1]
+            way = [(pos[a][0] + size[a][0] / 2.0, pos[a][1] - shift)]
+            way += [(pos[d][0], pos[d][1] - shift) for d in chain[1:-1]]
+            way.append((pos[b][0] - size[b][0] / 2.0, pos[b][1] - shift))
+            if key != (t, h):
+                way.reverse()
+            pts, lbl_pos = _smooth(way)
+        geoms.append((t, h, pts, lbl, lbl_pos))
+    return _plain_text(ids, labels, size, pos, geoms)
+
+
+def incremental_layout(nodes, edges, fixed) -> str:
+    """
+    Variante incrémentale de layered_layout : les nœuds présents dans `fixed`
+    ({id: (x, y)}, centres en pouces, repère plain) gardent leur position et
+    seuls les autres sont placés, à côté de leurs voisins déjà posés. Le coût
+    dépend donc du nombre de nœuds ajoutés, pas de la taille du diagramme.
+    """
+    ids, labels, edges, size, loops = _prepare(nodes, edges)
+    pos = {n: tuple(fixed[n]) for n in ids if n in fixed}
+    if not pos:
+        return layered_layout(nodes, edges)
+
+    cell = 1.0
+    grid = defaultdict(list)     # index spatial grossier des boîtes posées
+
+    def rect(n, c):
+        w, h = size[n]
+        h += 2 * LOOP_H * min(loops[n], 1)
+        return (c[0] - w / 2.0 - NODE_SEP / 2.0, c[1] - h / 2.0 - NODE_SEP / 2.0,
+                c[0] + w / 2.0 + NODE_SEP / 2.0, c[1] + h / 2.0 + NODE_SEP / 2.0)
+
+    def cells(r):
+        for i in range(int(r[0] // cell), int(r[2] // cell) + 1):
+            for j in range(int(r[1] // cell), int(r[3] // cell) + 1):
+                yield (i, j)
+
+    def free(r):
+        for c in cells(r):
+            for o in grid[c]:
+                if r[0] < o[2] and o[0] < r[2] and r[1] < o[3] and o[1] < r[3]:
+                    return False
+        return True
+
+    def put(n, c):
+        pos[n] = c
+        r = rect(n, c)
+        for k in cells(r):
+            grid[k].append(r)
+
+    for n in list(pos):
+        put(n, pos[n])
+
+    succ = defaultdict(list)
+    pred = defaultdict(list)
+    for t, h, _ in edges:
+        if t != h:
+            succ[t].append(h); pred[h].append(t)
+
+    right = max(pos[n][0] + size[n][0] / 2.0 for n in pos)
+    top = max(pos[n][1] + size[n][1] / 2.0 for n in pos)
+    fresh = [right + RANK_SEP, top]     # colonne des nœuds sans voisin posé
+
+    def place(n):
+        w, h = size[n]
+        parents = [p for p in pred[n] if p in pos]
+        children = [c for c in succ[n] if c in pos]
+        if parents and not children:
+            x = max(pos[p][0] + size[p][0] / 2.0 for p in parents) + RANK_SEP + w / 2.0
+        elif children and not parents:
+            x = min(pos[c][0] - size[c][0] / 2.0 for c in children) - RANK_SEP - w / 2.0
+        elif parents:
+            x = sum(pos[m][0] for m in parents + children) / len(parents + children)
+        else:
+            x, y0 = fresh[0] + w / 2.0, fresh[1] - h / 2.0
+            fresh[1] -= h + NODE_SEP
+        if parents or children:
+            y0 = sum(pos[m][1] for m in parents + children) / len(parents + children)
+        step = h + NODE_SEP
+        for k in range(0, 4 * len(ids) + 2):
+            dy = (k + 1) // 2 * step * (1 if k % 2 else -1)
+            if free(rect(n, (x, y0 + dy))):
+                put(n, (x, y0 + dy))
+                return
+        put(n, (x, y0))
+
+    pending = [n for n in ids if n not in pos]
+    queue = [n for n in pending if any(m in pos for m in succ[n] + pred[n])]
+    queued = set(queue)
+    i = 0
+    for start in pending:
+        if start not in queued:
+            queue.append(start); queued.add(start)
+        while i < len(queue):
+            n = queue[i]; i += 1
+            place(n)
+            for m in succ[n] + pred[n]:
+                if m not in pos and m not in queued:
+                    queue.append(m); queued.add(m)
+
+    # Arêtes : courbes directes entre les bords des boîtes
+    parallel = defaultdict(int)
+    for t, h, _ in edges:
+        parallel[tuple(sorted((t, h)))] += 1
+    seen = defaultdict(int)
+    geoms = []
+    for t, h, lbl in edges:
+        key = tuple(sorted((t, h)))
+        k = seen[key]; seen[key] += 1
+        if t == h:
+            pts, lbl_pos = _loop_points(pos[t][0], pos[t][1], size[t][0], size[t][1], k)
+        else:
+            shift = (k - (parallel[key] - 1) / 2.0) * PARALLEL_SEP
+            side = 1.0 if pos[h][0] >= pos[t][0] else -1.0
+            way = [(pos[t][0] + side * size[t][0] / 2.0, pos[t][1] - shift),
+                   (pos[h][0] - side * size[h][0] / 2.0, pos[h][1] - shift)]
+            pts, lbl_pos = _smooth(way)
+        geoms.append((t, h, pts, lbl, lbl_pos))
+    return _plain_text(ids, labels, size, pos, geoms)
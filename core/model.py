@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+core/model.py
+Modèle des relations du projet, sans QGIS : couches, relations, voisinage
+(AdjacencyIndex), groupes, recherche par nom (NameIndex) et heuristique des
+tables de liaison. Les objets QGIS sont lus par relation_utils (capture).
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Set, Optional
+
+# ---------------------------------------------------------------------
+# Modèle / Snapshot
+# ---------------------------------------------------------------------
+
+@dataclass
+class RelationEdge:
+    id: str
+    parent_layer_id: str
+    child_layer_id: str
+    pairs: List[Tuple[str, str]]  # (parent_field, child_field)
+
+@dataclass
+class LayerNode:
+    id: str
+    name: str
+    is_link_table: bool = False
+    editable_extra_fields: Set[str] = field(default_factory=set)
+    group: str = ''    # chemin du groupe dans l'arbre des couches ('' = racine)
+    source: str = ''   # base / schéma ou fichier de données
+
+@dataclass
+class ClusterNode(LayerNode):
+    """Groupe replié : une seule boîte pour plusieurs couches."""
+    members: List[str] = field(default_factory=list)
+
+@dataclass
+class RelationsSnapshot:
+    layers: Dict[str, LayerNode]
+    edges: List[RelationEdge]
+    _name_index: Optional['NameIndex'] = field(default=None, init=False, repr=False, compare=False)
+    _adjacency: Optional['AdjacencyIndex'] = field(default=None, init=False, repr=False, compare=False)
+
+    def name_index(self) -> 'NameIndex':
+        """Index des noms de couches, construit une seule fois par capture."""
+        if self._name_index is None:
+            self._name_index = NameIndex(self.layers)
+        return self._name_index
+
+    def adjacency(self) -> 'AdjacencyIndex':
+        """Index parents/enfants des couches, construit une seule fois par capture."""
+        if self._adjacency is None:
+            self._adjacency = AdjacencyIndex(self.edges)
+        return self._adjacency
+
+    def neighbourhood(self, focus_ids=None, depth: int = 1, direction: str = 'both'):
+        """
+        (ids des couches gardées, arêtes gardées) : le focus et ses voisins
+        jusqu'à `depth` relations. Sans focus : tout le snapshot.
+        """
+        focus_ids = set(focus_ids or [])
+        if not focus_ids:
+            return set(self.layers.keys()), list(self.edges)
+        keep_nodes, edge_idx = self.adjacency().bfs(focus_ids, depth, direction)
+        return keep_nodes, [self.edges[i] for i in sorted(edge_idx)]
+
+    def clusters(self, mode: str) -> Dict[str, List[str]]:
+        """
+        {clé du groupe: [ids]} pour 'group', 'source' ou 'community' (groupes
+        d'au moins 2 couches). Clé = groupe ou source, ou id de la couche pivot
+        de la communauté ; nom affiché : cluster_labels().
+        """
+        if mode == 'group':
+            keys = {nid: n.group for nid, n in self.layers.items()}
+        elif mode == 'source':
+            keys = {nid: n.source for nid, n in self.layers.items()}
+        elif mode == 'community':
+            keys = detect_communities(self.layers, self.edges)
+        else:
+            return {}
+        out: Dict[str, List[str]] = {}
+        for nid in sorted(self.layers, key=lambda i: str(self.layers[i].name).lower()):
+            if keys.get(nid):
+                out.setdefault(keys[nid], []).append(nid)
+        return {k: ids for k, ids in out.items() if len(ids) >= 2}
+
+    def cluster_labels(self, mode: str, groups=None) -> Dict[str, str]:
+        """{clé du groupe: nom affiché} ; `groups` = résultat de clusters(mode) s'il est déjà calculé."""
+        groups = self.clusters(mode) if groups is None else groups
+        if mode == 'community':
+            return community_labels(self.layers, groups)
+        return {key: key for key in groups}
+
+    def collapsed_view(self, mode: str, collapsed_keys) -> Tuple['RelationsSnapshot', Dict[str, str]]:
+        """
+        Vue où chaque groupe replié devient une seule boîte (ClusterNode) ;
+        les relations vers ses couches sont regroupées, celles internes au
+        groupe disparaissent. Retourne (vue, {id couche: id de sa boîte de groupe}).
+        """
+        member_of: Dict[str, str] = {}
+        layers: Dict[str, LayerNode] = {}
+        groups = self.clusters(mode)
+        labels = self.cluster_labels(mode, groups)
+        for key, ids in groups.items():
+            if key not in collapsed_keys:
+                continue
+            cid = cluster_node_id(mode, key)
+            layers[cid] = ClusterNode(id=cid, name=f"{labels[key]} ({len(ids)} tables)", members=list(ids))
+            for nid in ids:
+                member_of[nid] = cid
+        if not member_of:
+            return self, {}
+        for nid, n in self.layers.items():
+            if nid not in member_of:
+                layers[nid] = n
+
+        edges: List[RelationEdge] = []
+        merged: Dict[Tuple[str, str], RelationEdge] = {}
+        for e in self.edges:
+            p = member_of.get(e.parent_layer_id, e.parent_layer_id)
+            c = member_of.get(e.child_layer_id, e.child_layer_id)
+            if p == c and (p in layers and isinstance(layers[p], ClusterNode)):
+                continue
+            if p == e.parent_layer_id and c == e.child_layer_id:
+                edges.append(e)
+                continue
+            agg = merged.get((p, c))
+            if agg is None:
+                agg = merged[(p, c)] = RelationEdge(e.id, p, c, [])
+                edges.append(agg)
+            else:
+                agg.id += '+' + e.id
+            agg.pairs.extend(pc for pc in e.pairs if pc not in agg.pairs)
+        return type(self)(layers=layers, edges=edges), member_of
+
+    def to_dict(self) -> dict:
+        """Forme sérialisable (JSON) : couches et relations, sans les index."""
+        return {
+            'layers': [
+                {'id': n.id, 'name': n.name, 'is_link_table': bool(n.is_link_table),
+                 'group': n.group, 'source': n.source}
+                for n in sorted(self.layers.values(), key=lambda n: str(n.name).lower())
+            ],
+            'relations': [
+                {'id': e.id, 'parent': e.parent_layer_id, 'child': e.child_layer_id,
+                 'pairs': [list(p) for p in e.pairs]}
+                for e in self.edges
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RelationsSnapshot':
+        """Inverse de to_dict() (fichiers JSON de l'export en ligne de commande)."""
+        layers = {}
+        for d in data.get('layers', []):
+            layers[d['id']] = LayerNode(id=d['id'], name=d.get('name', d['id']),
+                                        is_link_table=bool(d.get('is_link_table')),
+                                        group=d.get('group', ''), source=d.get('source', ''))
+        edges = [RelationEdge(d['id'], d['parent'], d['child'], [tuple(p) for p in d.get('pairs', [])])
+                 for d in data.get('relations', [])]
+        return cls(layers=layers, edges=edges)
+
+
+# ---------------------------------------------------------------------
+# Voisinage (focus à N relations)
+# ---------------------------------------------------------------------
+
+# Sens du voisinage : vers les parents (couches référencées), vers les enfants, ou les deux
+FOCUS_DIRECTIONS = ('both', 'parents', 'children')
+
+class AdjacencyIndex:
+    """
+    Pour chaque couche, les indices (dans snapshot.edges) des relations
+    dont elle est l'enfant (→ parents) ou le parent (→ enfants).
+    """
+    def __init__(self, edges: List[RelationEdge]):
+        self.up: Dict[str, List[int]] = {}
+        self.down: Dict[str, List[int]] = {}
+        self._ends = []
+        for i, e in enumerate(edges):
+            self.down.setdefault(e.parent_layer_id, []).append(i)
+            self.up.setdefault(e.child_layer_id, []).append(i)
+            self._ends.append((e.parent_layer_id, e.child_layer_id))
+
+    def bfs(self, start_ids, depth: int = 1, direction: str = 'both'):
+        """(couches atteintes, indices des relations parcourues) en au plus `depth` sauts."""
+        follow_up = direction in ('both', 'parents')
+        follow_down = direction in ('both', 'children')
+        seen = set(start_ids)
+        edge_idx = set()
+        frontier = list(seen)
+        for _ in range(max(0, int(depth))):
+            nxt = []
+            for nid in frontier:
+                steps = []
+                if follow_up:
+                    steps += [(i, 0) for i in self.up.get(nid, ())]
+                if follow_down:
+                    steps += [(i, 1) for i in self.down.get(nid, ())]
+                for i, end in steps:
+                    edge_idx.add(i)
+                    other = self._ends[i][end]
+                    if other not in seen:
+                        seen.add(other)
+                        nxt.append(other)
+            if not nxt:
+                break
+            frontier = nxt
+        return seen, edge_idx
+
+# ---------------------------------------------------------------------
+# Groupes (repliables dans le diagramme)
+# ---------------------------------------------------------------------
+
+CLUSTER_MODES = ('none', 'group', 'source', 'community')
+
+def cluster_node_id(mode: str, key: str) -> str:
+    return f"cluster:{mode}:{key}"
+
+def detect_communities(layers: Dict[str, LayerNode], edges: List[RelationEdge],
+                       max_rounds: int = 30) -> Dict[str, str]:
+    """
+    Propagation d'étiquettes (relations vues sans sens) : chaque couche prend
+    l'étiquette la plus fréquente chez ses voisines, jusqu'à stabilité.
+    Graine fixe : mêmes communautés d'une analyse à l'autre.
+    Retourne {id couche: id de la couche la plus reliée de sa communauté (pivot)}.
+    """
+    nbrs: Dict[str, List[str]] = {nid: [] for nid in layers}
+    for e in edges:
+        p, c = e.parent_layer_id, e.child_layer_id
+        if p != c and p in nbrs and c in nbrs:
+            nbrs[p].append(c)
+            nbrs[c].append(p)
+    order = sorted(nbrs)
+    label = {nid: nid for nid in order}
+    rng = random.Random(0)
+    for _ in range(max_rounds):
+        rng.shuffle(order)
+        changed = False
+        for nid in order:
+            if not nbrs[nid]:
+                continue
+            count: Dict[str, int] = {}
+            for m in nbrs[nid]:
+                count[label[m]] = count.get(label[m], 0) + 1
+            top = max(count.values())
+            if count.get(label[nid], 0) == top:
+                continue
+            label[nid] = rng.choice(sorted(lab for lab, k in count.items() if k == top))
+            changed = True
+        if not changed:
+            break
+
+    members: Dict[str, List[str]] = {}
+    for nid, lab in label.items():
+        members.setdefault(lab, []).append(nid)
+    hubs = {}
+    for lab, ids in members.items():
+        hubs[lab] = min(ids, key=lambda i: (-len(nbrs[i]), str(layers[i].name).lower(), i))
+    return {nid: hubs[lab] for nid, lab in label.items()}
+
+def community_labels(layers: Dict[str, LayerNode], hub_ids) -> Dict[str, str]:
+    """
+    {id pivot: « ≈ nom du pivot »} ; deux pivots de même nom (couches homonymes)
+    sont numérotés : « ≈ nom », « ≈ nom #2 »…
+    """
+    name = lambda hid: str(layers[hid].name) if hid in layers else str(hid)
+    out, seen = {}, {}
+    for hid in sorted(hub_ids, key=lambda h: (name(h).lower(), h)):
+        n = seen[name(hid)] = seen.get(name(hid), 0) + 1
+        out[hid] = f"≈ {name(hid)}" + (f" #{n}" if n > 1 else '')
+    return out
+
+# ---------------------------------------------------------------------
+# Recherche par nom (instantanée, sans Graphviz)
+# ---------------------------------------------------------------------
+
+def _subsequence_gaps(query: str, name: str) -> Optional[int]:
+    """Nombre de caractères sautés si `query` est une sous-séquence de `name`, sinon None."""
+    pos, gaps, start = 0, 0, None
+    for ch in query:
+        i = name.find(ch, pos)
+        if i < 0:
+            return None
+        if start is not None:
+            gaps += i - pos
+        else:
+            start = i
+        pos = i + 1
+    return gaps
+
+class NameIndex:
+    """
+    Noms de couches en minuscules, triés une fois pour toutes.
+    search() classe : nom exact, préfixe, sous-chaîne (au plus tôt), puis,
+    seulement si rien ne contient la saisie, correspondance approchée
+    (lettres dans l'ordre, le moins de trous possible).
+    """
+    def __init__(self, layers: Dict[str, LayerNode]):
+        self._names = sorted((str(n.name).lower(), nid) for nid, n in layers.items())
+
+    def search(self, query: str) -> List[str]:
+        q = (query or '').strip().lower()
+        if not q:
+            return []
+        hits = []
+        for name, nid in self._names:
+            pos = name.find(q)
+            if pos >= 0:
+                rank = 0 if name == q else (1 if pos == 0 else 2)
+                hits.append((rank, pos, len(name), name, nid))
+        if not hits:
+            for name, nid in self._names:
+                gaps = _subsequence_gaps(q, name)
+                if gaps is not None:
+                    hits.append((3, gaps, len(name), name, nid))
+        hits.sort()
+        return [h[-1] for h in hits]
+
+
+# ---------------------------------------------------------------------
+# Heuristique tables de liaison (Note A)
+# ---------------------------------------------------------------------
+
+def mark_link_tables(layers: Dict[str, LayerNode], edges: List[RelationEdge],
+                     pk_fields: Dict[str, Set[str]]):
+    """
+    Heuristique améliorée :
+    - Une table est considérée comme "table de liaison" si elle a >= 2 relations ENTRANTES
+      (même si elles pointent vers le même parent → cas réflexif via L)
+    - ET si l'ensemble des PK de la table est inclus dans l'ensemble des champs FK impliqués.
+    pk_fields : {id couche: noms des champs de clé primaire} (couches enfants seulement).
+    """
+    count: Dict[str, int] = {}
+    fk_fields: Dict[str, Set[str]] = {}
+    for e in edges:
+        count[e.child_layer_id] = count.get(e.child_layer_id, 0) + 1
+        fk_fields.setdefault(e.child_layer_id, set()).update(fk for _, fk in e.pairs)
+
+    for child_id, n in count.items():
+        if n < 2:
+            continue
+        pks = pk_fields.get(child_id)
+        node = layers.get(child_id)
+        if pks and node and pks.issubset(fk_fields[child_id]):
+            node.is_link_table = True
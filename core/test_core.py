@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+core/test_core.py
+Tests du cœur sans QGIS (pytest, Python ordinaire) : s'ils tournent, le
+paquet core s'importe et fonctionne hors de QGIS.
+
+    python -m pytest core
+"""
+import base64
+import os
+import re
+import subprocess
+import sys
+import zlib
+from io import StringIO
+from urllib.parse import unquote
+
+from .model import RelationsSnapshot
+from .layout import parse_plain, layered_layout, incremental_layout
+from .dot import _order_formats, _split_outputs
+from .drawio import write_drawio
+
+
+def _snapshot(layers, relations):
+    """layers : [(id, nom, groupe)] ; relations : [(id, parent, enfant, [(pk, fk)])]."""
+    return RelationsSnapshot.from_dict({
+        'layers': [{'id': i, 'name': n, 'group': g} for i, n, g in layers],
+        'relations': [{'id': r, 'parent': p, 'child': c, 'pairs': pairs} for r, p, c, pairs in relations],
+    })
+
+
+# a → b → c → d, et a → e
+CHAIN = _snapshot(
+    [('a', 'A', ''), ('b', 'B', ''), ('c', 'C', ''), ('d', 'D', ''), ('e', 'E', '')],
+    [('ab', 'a', 'b', [('id', 'a_id')]), ('bc', 'b', 'c', [('id', 'b_id')]),
+     ('cd', 'c', 'd', [('id', 'c_id')]), ('ae', 'a', 'e', [('id', 'a_id')])],
+)
+
+
+def test_core_imports_without_qgis():
+    # Processus neuf : les autres tests ne peuvent pas masquer un import de QGIS
+    plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (f"import sys, {__package__}; "
+            "sys.exit(any(m.split('.')[0] in ('qgis', 'PyQt5', 'PyQt6') for m in sys.modules))")
+    assert subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(plugin_dir)).returncode == 0
+
+
+def test_layered_layout_round_trip():
+    nodes = [('a', 'A'), ('b', 'Table "B"'), ('c', 'C c')]
+    edges = [('a', 'b', 'id → a_id'), ('b', 'c', ''), ('c', 'a', ''), ('a', 'a', 'boucle')]
+    placed, routes = parse_plain(layered_layout(nodes, edges))
+    assert set(placed) == {'a', 'b', 'c'}
+    assert all(w > 0 and h > 0 for _, _, w, h in placed.values())
+    assert [(t, h) for t, h, *_ in routes] == [(t, h) for t, h, _ in edges]
+    assert all(len(pts) >= 4 and (len(pts) - 1) % 3 == 0 for _, _, pts, _, _ in routes)
+    assert routes[0][3] == 'id → a_id' and routes[0][4] is not None
+    # rankdir=LR : le parent est à gauche de son enfant
+    assert placed['a'][0] < placed['b'][0]
+
+
+def test_incremental_layout_keeps_fixed_nodes():
+    nodes = [('a', 'A'), ('b', 'B')]
+    edges = [('a', 'b', '')]
+    placed, _ = parse_plain(layered_layout(nodes, edges))
+    fixed = {nid: (x, y) for nid, (x, y, _, _) in placed.items()}
+
+    more, _ = parse_plain(incremental_layout(nodes + [('c', 'C')], edges + [('b', 'c', '')], fixed))
+    for nid, (x, y) in fixed.items():
+        assert more[nid][:2] == (x, y)
+    assert 'c' in more
+    cx, cy, cw, ch = more['c']
+    for nid, (x, y, w, h) in placed.items():
+        overlap_x = abs(cx - x) < (cw + w) / 2
+        overlap_y = abs(cy - y) < (ch + h) / 2
+        assert not (overlap_x and overlap_y)
+
+
+def test_neighbourhood_depth_and_direction():
+    nodes, edges = CHAIN.neighbourhood(None)
+    assert nodes == {'a', 'b', 'c', 'd', 'e'} and len(edges) == 4
+
+    nodes, edges = CHAIN.neighbourhood({'b'}, depth=1)
+    assert nodes == {'a', 'b', 'c'}
+    assert {e.id for e in edges} == {'ab', 'bc'}
+
+    assert CHAIN.neighbourhood({'b'}, depth=2)[0] == {'a', 'b', 'c', 'd', 'e'}
+    assert CHAIN.neighbourhood({'b'}, depth=2, direction='children')[0] == {'b', 'c', 'd'}
+    assert CHAIN.neighbourhood({'c'}, depth=5, direction='parents')[0] == {'a', 'b', 'c'}
+
+
+def test_collapsed_view_aggregates_edges():
+    snap = _snapshot(
+        [('p', 'P', ''), ('x', 'X', 'g'), ('y', 'Y', 'g'), ('q', 'Q', '')],
+        [('px', 'p', 'x', [('id', 'p_id')]), ('py', 'p', 'y', [('id', 'p_id')]),
+         ('xy', 'x', 'y', [('id', 'x_id')]), ('yq', 'y', 'q', [('id', 'y_id')])],
+    )
+    assert snap.clusters('group') == {'g': ['x', 'y']}
+    view, member_of = snap.collapsed_view('group', {'g'})
+    cid = member_of['x']
+    assert member_of == {'x': cid, 'y': cid}
+    assert set(view.layers) == {'p', 'q', cid}
+    assert view.layers[cid].members == ['x', 'y']
+    # p → x et p → y fusionnées, x → y interne disparaît, y → q rattachée à la boîte
+    ends = sorted((e.parent_layer_id, e.child_layer_id) for e in view.edges)
+    assert ends == sorted([('p', cid), (cid, 'q')])
+    merged = next(e for e in view.edges if e.parent_layer_id == 'p')
+    assert merged.id == 'px+py' and merged.pairs == [('id', 'p_id')]
+    # Rien de replié : le snapshot lui-même
+    assert snap.collapsed_view('group', set()) == (snap, {})
+
+
+def test_split_outputs():
+    formats = _order_formats(['png', 'svg', 'plain'])
+    assert formats == ['svg', 'plain', 'png']
+    svg = b'<?xml version="1.0"?>\n<svg>\n</svg>\n'
+    plain = b'graph 1 2 3\nnode a 1 1 1 1 a solid box black lightgrey\nstop\n'
+    png = b'\x89PNG\r\n\x1a\nstop\n</svg>\n'
+    out = _split_outputs(svg + plain + png, formats)
+    assert out == {'svg': svg, 'plain': plain, 'png': png}
+
+
+def _diagrams(text):
+    return re.findall(r'<diagram[^>]*>(.*?)</diagram>', text, re.S)
+
+
+def test_write_drawio_compressed_round_trip():
+    plain, packed = StringIO(), StringIO()
+    write_drawio(plain, CHAIN)
+    write_drawio(packed, CHAIN, compressed=True)
+    raw, = _diagrams(plain.getvalue())
+    data, = _diagrams(packed.getvalue())
+    xml = unquote(zlib.decompress(base64.b64decode(data), -15).decode('ascii'))
+    squash = lambda t: re.sub(r'>\s+<', '><', t.strip())
+    assert squash(xml) == squash(raw)
+    assert xml.startswith('<mxGraphModel') and 'B' in xml
@@ -1,29 +1,46 @@
 # -*- coding: utf-8 -*-
 from qgis.PyQt import QtCore, QtGui, QtWidgets
-from qgis.PyQt.QtCore import Qt, QPointF, QRectF, pyqtSignal
+from qgis.PyQt.QtCore import Qt, QPointF, QRectF, QVariantAnimation, QEasingCurve, pyqtSignal
 from qgis.PyQt.QtGui import QPainter, QPen, QBrush, QPainterPath, QPolygonF, QColor, QFont, QFontMetrics
-from qgis.PyQt.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPathItem, QGraphicsObject, QMenu
+from qgis.PyQt.QtWidgets import (
+    QGraphicsView, QGraphicsScene, QGraphicsPathItem, QGraphicsObject, QGraphicsSimpleTextItem, QMenu
+)
 from qgis.core import QgsProject
 from collections import Counter, defaultdict
 
+from .core.layout import parse_plain
+from .minimap import MiniMap
+
 PX_PER_INCH = 96.0
 RADIUS = 10.0
 OFFSET = 18.0
+ANIM_MS = 250
+# Niveaux de détail (échelle écran / scène) : sous LOD_TEXT plus de texte,
+# sous LOD_DETAIL boîtes rectangles pleines et arêtes sans flèche ni lissage.
+LOD_TEXT = 0.45
+LOD_DETAIL = 0.25
+ANIM_MAX_NODES = 200   # au-delà, les boîtes sautent directement à leur place
+DIM_OPACITY = 0.18     # boîtes/arêtes hors recherche
 
 PEN_NODE = QPen(QColor("#5f6b7a"), 1.2)
 PEN_NODE_SEL = QPen(QColor("#2e7d32"), 2.0)
 BRUSH_NODE = QBrush(QColor("#ffffff"))
 BRUSH_NODE_LINK = QBrush(QColor("#FFEFD9"))
+BRUSH_NODE_CLUSTER = QBrush(QColor("#E3F2FD"))   # groupe replié (clic = déplier)
 
 PEN_EDGE = QPen(QColor("#607d8b"), 1.2)
 PEN_EDGE_HL = QPen(QColor("#1565c0"), 1.8)
 
+# Chemin de jointure (Maj+clic sur deux tables)
+PEN_NODE_PATH = QPen(QColor("#ef6c00"), 2.6)
+PEN_EDGE_PATH = QPen(QColor("#ef6c00"), 3.0)
+
 def _layer_name(layer_id: str) -> str:
     lyr = QgsProject.instance().mapLayer(layer_id)
     return lyr.name() if lyr else layer_id
 
 class NodeItem(QGraphicsObject):
-    def __init__(self, node_id: str, label: str, w_px: float, h_px: float, is_link=False, parent=None):
+    def __init__(self, node_id: str, label: str, w_px: float, h_px: float, is_link=False, parent=None, is_cluster=False):
         super().__init__(parent)
         self.node_id = node_id
         self.label = label or node_id
@@ -31,22 +48,51 @@ class NodeItem(QGraphicsObject):
         self.w = max(float(w_px), float(fm.horizontalAdvance(self.label) + 16), 80.0)
         self.h = max(float(h_px), float(fm.height() + 12), 36.0)
         self.is_link = is_link
+        self.is_cluster = is_cluster
+        self.on_path = False
         self.setFlags(self.ItemIsMovable | self.ItemIsSelectable | self.ItemSendsGeometryChanges)
         self.setCacheMode(self.DeviceCoordinateCache)
         self.edges = []
+        self.user_moved = False   # déplacée à la main : la mise en page ne la bouge plus
 
     def addEdge(self, e): self.edges.append(e)
+    def removeEdge(self, e): self.edges = [x for x in self.edges if x is not e]
+    def update_box(self, label, w_px, h_px, is_link=False, is_cluster=False):
+        """Réutilisation de la boîte lors d'un diff de scène."""
+        label = label or self.node_id
+        fm = QFontMetrics(QFont())
+        w = max(float(w_px), float(fm.horizontalAdvance(label) + 16), 80.0)
+        h = max(float(h_px), float(fm.height() + 12), 36.0)
+        if (label, w, h, is_link, is_cluster) == (self.label, self.w, self.h, self.is_link, self.is_cluster):
+            return
+        self.prepareGeometryChange()
+        self.label, self.w, self.h, self.is_link, self.is_cluster = label, w, h, is_link, is_cluster
+        self.update()
+        for e in self.edges: e.updatePath()
     def boundingRect(self): return QRectF(-self.w/2, -self.h/2, self.w, self.h)
     def shape(self): p=QPainterPath(); p.addRoundedRect(self.boundingRect(),RADIUS,RADIUS); return p
     def paint(self, p:QPainter, option, widget=None):
+        lod = option.levelOfDetailFromTransform(p.worldTransform())
+        p.setPen(PEN_NODE_PATH if self.on_path else PEN_NODE_SEL if self.isSelected() else PEN_NODE)
+        p.setBrush(BRUSH_NODE_CLUSTER if self.is_cluster else BRUSH_NODE_LINK if self.is_link else BRUSH_NODE)
+        if lod < LOD_DETAIL:
+            p.setRenderHint(QPainter.Antialiasing, False)
+            p.drawRect(self.boundingRect())
+            return
         p.setRenderHint(QPainter.Antialiasing, True)
-        p.setPen(PEN_NODE_SEL if self.isSelected() else PEN_NODE)
-        p.setBrush(BRUSH_NODE_LINK if self.is_link else BRUSH_NODE)
         p.drawRoundedRect(self.boundingRect(), RADIUS, RADIUS)
+        if self.is_cluster:   # double bord : plusieurs tables derrière la boîte
+            p.setBrush(Qt.NoBrush)
+            p.drawRoundedRect(self.boundingRect().adjusted(3,3,-3,-3), RADIUS-3, RADIUS-3)
+        if lod < LOD_TEXT:
+            return
         rect = self.boundingRect().adjusted(8,6,-8,-6); p.setPen(Qt.black)
         p.drawText(rect, Qt.AlignCenter|Qt.TextWordWrap, self.label)
     def itemChange(self, change, value):
         if change == self.ItemPositionHasChanged:
+            sc = self.scene()
+            if sc is not None and sc.mouseGrabberItem() is not None:
+                self.user_moved = True
             for e in self.edges: e.updatePath()
         return super().itemChange(change, value)
     def anchorPointTowards(self, other_center: QPointF) -> QPointF:
@@ -60,14 +106,23 @@ class NodeItem(QGraphicsObject):
         return QPointF(c.x()+cos*t, c.y()+sin*t)
 
 class EdgeItem(QGraphicsPathItem):
-    def __init__(self, src:NodeItem, dst:NodeItem, pairs=None, highlight=False, offset=0.0, parent=None):
+    def __init__(self, src:NodeItem, dst:NodeItem, pairs=None, highlight=False, offset=0.0, parent=None,
+                 spline=None, label=None, label_pos=None):
         super().__init__(parent)
+        self._arrowHead = QPolygonF()
         self.src=src; self.dst=dst
+        # Géométrie routée par la mise en page (dot ou moteur intégré), valable tant que
+        # les boîtes sont là où la mise en page les a placées
+        self._spline = []; self._spline_at = None
+        self.label = None; self.label_pos = None; self._label_item = None
+        self.set_spline(spline, label, label_pos)
         # pairs peut être : [(pk, fk)], [(parent, child, pk, fk)], etc. → on sera tolérant
         self.pairs = list(pairs or [])
         self.setZValue(-1)
-        self.setPen(PEN_EDGE_HL if highlight else PEN_EDGE)
+        self.highlight = highlight; self.on_path = False
+        self._apply_pen()
         self.setFlag(self.ItemIsSelectable, False)
+        self.setCacheMode(self.DeviceCoordinateCache)
         self.setAcceptHoverEvents(True)
         self.setAcceptedMouseButtons(Qt.LeftButton | Qt.RightButton)
         self.offset = offset
@@ -75,6 +130,47 @@ class EdgeItem(QGraphicsPathItem):
         self.src.addEdge(self); self.dst.addEdge(self)
         self._refresh_tooltip()
 
+    def update_edge(self, pairs=None, highlight=False, offset=0.0):
+        """Réutilisation de l'arête lors d'un diff de scène."""
+        self.pairs = list(pairs or [])
+        self.highlight = highlight
+        self._apply_pen()
+        if offset != self.offset:
+            self.offset = offset
+            self.updatePath()
+        self._refresh_tooltip()
+
+    def _apply_pen(self):
+        self.setPen(PEN_EDGE_PATH if self.on_path else PEN_EDGE_HL if self.highlight else PEN_EDGE)
+
+    def set_on_path(self, flag):
+        if flag != self.on_path:
+            self.on_path = flag
+            self._apply_pen()
+
+    def set_spline(self, spline=None, label=None, label_pos=None, src_at=None, dst_at=None):
+        """
+        spline : points de contrôle en pixels de scène (3k+1) ; src_at / dst_at :
+        positions des boîtes pour lesquelles ce tracé a été routé (par défaut,
+        leurs positions actuelles).
+        """
+        self._spline = list(spline or [])
+        self._spline_at = (QPointF(src_at if src_at is not None else self.src.pos()),
+                           QPointF(dst_at if dst_at is not None else self.dst.pos()))
+        self.label = label.replace('\\n', '\n') if label else None
+        self.label_pos = label_pos
+        if self._label_item is not None:
+            if self._label_item.scene() is not None:
+                self._label_item.scene().removeItem(self._label_item)
+            self._label_item = None
+
+    def _spline_valid(self) -> bool:
+        return (len(self._spline) >= 4 and self._spline_at is not None
+                and self.src.pos() == self._spline_at[0] and self.dst.pos() == self._spline_at[1])
+
+    def detach(self):
+        self.src.removeEdge(self); self.dst.removeEdge(self)
+
     def _iter_pk_fk(self):
         """Yield (pk, fk) de manière robuste, quel que soit le format de self.pairs."""
         for entry in self.pairs:
@@ -115,6 +211,19 @@ class EdgeItem(QGraphicsPathItem):
         return QPolygonF([tip,left,right])
 
     def updatePath(self):
+        # Tracé routé par la mise en page tant que les boîtes n'ont pas bougé
+        if self._spline_valid():
+            pts = self._spline
+            path = QPainterPath(pts[0])
+            for i in range(1, len(pts) - 2, 3):
+                path.cubicTo(pts[i], pts[i+1], pts[i+2])
+            # dot s'arrête à la base de la flèche : on prolonge jusqu'au bord de la boîte
+            tip = self.dst.anchorPointTowards(pts[-1])
+            gap = QtCore.QLineF(pts[-1], tip).length()
+            if self.src is not self.dst and 1.0 < gap < 40.0:
+                path.lineTo(tip)
+            self._arrowHead=self._arrow(path); self.setPath(path); return
+
         # self-loop ?
         if self.src is self.dst:
             c = self.src.scenePos(); w=self.src.w; h=self.src.h
@@ -123,7 +232,7 @@ class EdgeItem(QGraphicsPathItem):
             cp2   = QPointF(c.x()-w/2-40, c.y()-h/2-40)
             end   = QPointF(c.x()-w/2, c.y())      # milieu gauche
             path = QPainterPath(start); path.cubicTo(cp1, cp2, end)
-            self.setPath(path); self._arrowHead=self._arrow(path); return
+            self._arrowHead=self._arrow(path); self.setPath(path); return
 
         a = self.src.anchorPointTowards(self.dst.scenePos())
         b = self.dst.anchorPointTowards(self.src.scenePos())
@@ -138,11 +247,37 @@ class EdgeItem(QGraphicsPathItem):
             c2 = QPointF(b.x() - self.offset, midy)
 
         path = QPainterPath(a); path.cubicTo(c1, c2, b)
-        self.setPath(path); self._arrowHead=self._arrow(path)
+        # flèche calculée avant setPath : boundingRect() l'inclut
+        self._arrowHead=self._arrow(path); self.setPath(path)
+
+    def boundingRect(self):
+        return super().boundingRect().united(self._arrowHead.boundingRect()).adjusted(-1,-1,1,1)
+
+    # Étiquette de la relation (position calculée par la mise en page), au survol
+    def hoverEnterEvent(self, ev):
+        if self.label and self.label_pos is not None:
+            if self._label_item is None:
+                self._label_item = QGraphicsSimpleTextItem(self.label, self)
+                br = self._label_item.boundingRect()
+                self._label_item.setPos(self.label_pos - br.center())
+                self._label_item.setBrush(QBrush(self.pen().color()))
+            self._label_item.setVisible(True)
+        super().hoverEnterEvent(ev)
+
+    def hoverLeaveEvent(self, ev):
+        if self._label_item is not None:
+            self._label_item.setVisible(False)
+        super().hoverLeaveEvent(ev)
 
     def paint(self, p:QPainter, option, widget=None):
+        lod = option.levelOfDetailFromTransform(p.worldTransform())
+        p.setPen(self.pen()); p.setBrush(Qt.NoBrush)
+        if lod < LOD_DETAIL:
+            p.setRenderHint(QPainter.Antialiasing, False)
+            p.drawPath(self.path())
+            return
         p.setRenderHint(QPainter.Antialiasing, True)
-        p.setPen(self.pen()); p.setBrush(Qt.NoBrush); p.drawPath(self.path())
+        p.drawPath(self.path())
         p.setBrush(self.pen().color()); p.drawPolygon(self._arrowHead)
 
     def contextMenuEvent(self, ev:QtWidgets.QGraphicsSceneContextMenuEvent):
@@ -163,18 +298,136 @@ class EdgeItem(QGraphicsPathItem):
 class DiagramCanvas(QGraphicsView):
     nodeClicked = pyqtSignal(str)
     nodeDoubleClicked = pyqtSignal(str)
+    nodesMoved = pyqtSignal()   # fin d'un déplacement de boîte(s) à la souris
+    pathRequested = pyqtSignal(str, str)   # Maj+clic sur deux boîtes : chemin de l'une à l'autre
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setScene(QGraphicsScene(self))
         self.setBackgroundBrush(QBrush(QColor("#ffffff")))
         self.setRenderHints(self.renderHints()|QPainter.Antialiasing|QPainter.TextAntialiasing)
-        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        # Repeint seulement les zones modifiées ; chaque paint() fixe lui-même son état
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setOptimizationFlags(QGraphicsView.DontSavePainterState)
+        self.setCacheMode(QGraphicsView.CacheBackground)
         self.setDragMode(QGraphicsView.NoDrag)
-        self.nodes={}; self.edges=[]
-
-    def clearAll(self): self.scene().clear(); self.nodes.clear(); self.edges.clear()
-    def wheelEvent(self, e): self.scale(1.15,1.15) if e.angleDelta().y()>0 else self.scale(1/1.15,1/1.15)
+        self.nodes={}; self.edges={}   # edges : {(tail, head, occurrence): EdgeItem}
+        self._anim = None; self._moves = []
+        self._press_pos = None
+        self._search_ids = None   # None = pas de recherche en cours
+        self.minimap = MiniMap(self)   # vue d'ensemble (image en cache de la scène)
+        self._path_pick = None         # première boîte choisie (Maj+clic)
+
+    def clearAll(self):
+        self._finish_animation()
+        self.scene().clear(); self.nodes.clear(); self.edges.clear()
+
+    def forget_manual_moves(self):
+        for node in self.nodes.values(): node.user_moved = False
+
+    # ----- recherche instantanée (aucune mise en page)
+    def set_search(self, match_ids=None):
+        """Estompe les boîtes qui ne correspondent pas ; None rétablit tout."""
+        self._search_ids = set(match_ids) if match_ids is not None else None
+        self._apply_search()
+
+    def _apply_search(self):
+        ids = self._search_ids
+        for nid, node in self.nodes.items():
+            node.setOpacity(1.0 if ids is None or nid in ids else DIM_OPACITY)
+        for (tail, head, _), e in self.edges.items():
+            lit = ids is None or (tail in ids and head in ids)
+            e.setOpacity(1.0 if lit else DIM_OPACITY)
+
+    # ----- chemin de jointure
+    def show_path(self, node_ids=(), links=()):
+        """
+        Met en évidence un chemin : node_ids = boîtes, links = [(tail, head, pairs)].
+        Sans argument : efface la mise en évidence.
+        """
+        node_ids = set(node_ids)
+        for nid, node in self.nodes.items():
+            if node.on_path != (nid in node_ids):
+                node.on_path = nid in node_ids; node.update()
+        lit = set()
+        for tail, head, pairs in links:
+            cands = [k for k in self.edges if k[0] == tail and k[1] == head]
+            exact = [k for k in cands if set(map(tuple, self.edges[k].pairs)) == set(map(tuple, pairs))]
+            lit.update(exact or cands)
+        for k, e in self.edges.items():
+            e.set_on_path(k in lit)
+
+    def reveal(self, node_id):
+        """Fait défiler la vue jusqu'à la boîte, sans changer le zoom."""
+        node = self.nodes.get(node_id)
+        if node is not None:
+            self.ensureVisible(node, 40, 40)
+
+    # ----- positions des boîtes
+    def _final_pos(self):
+        """{layer_id: QPointF} centre des boîtes, fin d'animation comprise."""
+        pos = {nid: node.pos() for nid, node in self.nodes.items()}
+        for node, _, end in self._moves: pos[node.node_id] = end
+        return pos
+
+    def layout_positions(self, moved_only=False):
+        """
+        {layer_id: (x, y)} centres en pouces, repère -Tplain (y vers le haut) :
+        directement réutilisables comme positions fixes par le moteur de rendu.
+        """
+        out = {}
+        for nid, pt in self._final_pos().items():
+            if moved_only and not self.nodes[nid].user_moved: continue
+            out[nid] = (pt.x()/PX_PER_INCH, -pt.y()/PX_PER_INCH)
+        return out
+
+    def node_positions(self, margin=40):
+        """
+        {layer_id: (x, y)} coin haut-gauche des boîtes en px, telles qu'affichées
+        (déplacements manuels compris), décalées pour commencer à `margin`.
+        """
+        pos = self._final_pos()
+        if not pos: return {}
+        tl = {nid: (pt.x()-self.nodes[nid].w/2.0, pt.y()-self.nodes[nid].h/2.0) for nid, pt in pos.items()}
+        x0 = min(x for x, _ in tl.values()); y0 = min(y for _, y in tl.values())
+        return {nid: (x-x0+margin, y-y0+margin) for nid, (x, y) in tl.items()}
+
+    # ----- animation des déplacements (une seule animation pour toutes les boîtes)
+    def _finish_animation(self):
+        if self._anim is not None:
+            self._anim.stop(); self._anim = None
+            for node, _, end in self._moves: node.setPos(end)
+        self._moves = []
+
+    def _animate_moves(self, moves):
+        if len(moves) > ANIM_MAX_NODES:
+            for node, _, end in moves: node.setPos(end)
+            return
+        self._moves = moves
+        anim = QVariantAnimation(self)
+        anim.setStartValue(0.0); anim.setEndValue(1.0)
+        anim.setDuration(ANIM_MS); anim.setEasingCurve(QEasingCurve.InOutQuad)
+        anim.valueChanged.connect(self._on_anim_step)
+        anim.finished.connect(self._finish_animation)
+        self._anim = anim
+        anim.start()
+
+    def _on_anim_step(self, t):
+        for node, start, end in self._moves:
+            node.setPos(start + (end - start) * float(t))
+
+    def wheelEvent(self, e):
+        self.scale(1.15,1.15) if e.angleDelta().y()>0 else self.scale(1/1.15,1/1.15)
+        self.minimap.update_visibility(); self.minimap.update()
+
+    def keyPressEvent(self, e):
+        if e.key()==Qt.Key_Escape:
+            self._path_pick = None; self.show_path()
+        super().keyPressEvent(e)
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.minimap.place(); self.minimap.update_visibility()
 
     def _node_under_pos(self, pos):
         pt=self.mapToScene(pos); item=self.scene().itemAt(pt, self.transform())
@@ -183,11 +436,29 @@ class DiagramCanvas(QGraphicsView):
 
     def mousePressEvent(self, e):
         node=self._node_under_pos(e.pos())
+        if node and e.button()==Qt.LeftButton and e.modifiers() & Qt.ShiftModifier:
+            # Maj+clic : choix des extrémités d'un chemin (pas de sélection ni de glisser)
+            first, self._path_pick = self._path_pick, node.node_id
+            if first and first != node.node_id:
+                self._path_pick = None
+                self.pathRequested.emit(first, node.node_id)
+            else:
+                self.show_path([node.node_id])
+            e.accept()
+            return
         self.setDragMode(QGraphicsView.NoDrag if node else QGraphicsView.ScrollHandDrag)
+        self._press_pos = (node, node.pos()) if node else None
         super().mousePressEvent(e)
 
     def mouseReleaseEvent(self, e):
         super().mouseReleaseEvent(e); self.setDragMode(QGraphicsView.NoDrag)
+        pressed, self._press_pos = self._press_pos, None
+        if not pressed or pressed[0].scene() is not self.scene():
+            return
+        if pressed[0].pos() != pressed[1]:
+            self.nodesMoved.emit()
+        elif e.button()==Qt.LeftButton:
+            self.nodeClicked.emit(pressed[0].node_id)
 
     def mouseDoubleClickEvent(self, e):
         if e.button()==Qt.LeftButton:
@@ -195,25 +466,26 @@ class DiagramCanvas(QGraphicsView):
             if node: self.nodeDoubleClicked.emit(node.node_id)
         super().mouseDoubleClickEvent(e)
 
-    def set_graph(self, plain_text:str, selected_ids=None, link_ids=None, edge_pairs_map=None):
+    def set_graph(self, plain_text:str, selected_ids=None, link_ids=None, edge_pairs_map=None, fit=False,
+                  names=None, cluster_ids=None):
+        """
+        Met à jour la scène depuis une sortie -Tplain en ne touchant qu'à ce qui
+        a changé : boîtes/arêtes disparues retirées, nouvelles ajoutées, existantes
+        réutilisées et déplacées (animation). Le zoom et le défilement sont
+        conservés, sauf au premier affichage ou avec fit=True.
+        names : {id: libellé} pour les boîtes qui ne sont pas des couches (groupes).
+        """
         selected_ids = selected_ids or set(); link_ids=link_ids or set(); edge_pairs_map=edge_pairs_map or {}
-        self.clearAll()
-
-        nodes_raw, edges_raw = {}, []
-        for raw in plain_text.splitlines():
-            if not raw.strip(): continue
-            parts=raw.strip().split(); kind=parts[0]
-            if kind=="node" and len(parts)>=6:
-                nid=parts[1]; x,y,w,h=map(float, parts[2:6])
-                nodes_raw[nid]=(x*PX_PER_INCH, -y*PX_PER_INCH, w*PX_PER_INCH, h*PX_PER_INCH)
-            elif kind=="edge" and len(parts)>=3:
-                edges_raw.append((parts[1], parts[2]))
+        names = names or {}; cluster_ids = cluster_ids or set()
+        self._finish_animation()
+        first = not self.nodes
 
-        for nid,(x,y,w,h) in nodes_raw.items():
-            node=NodeItem(nid, _layer_name(nid), w, h, is_link=(nid in link_ids))
-            node.setPos(x,y)
-            if nid in selected_ids: node.setSelected(True)
-            self.scene().addItem(node); self.nodes[nid]=node
+        nodes_raw, edges_parsed = parse_plain(plain_text)
+        edges_parsed = [e for e in edges_parsed if e[0] in nodes_raw and e[1] in nodes_raw]
+        edges_raw = [(t, h) for t, h, *_ in edges_parsed]
+
+        def to_px(pt):
+            return QPointF(pt[0]*PX_PER_INCH, -pt[1]*PX_PER_INCH)
 
         edge_set = set(edges_raw)
         bidir = set()
@@ -224,17 +496,41 @@ class DiagramCanvas(QGraphicsView):
         # NEW : gestion multi-arêtes (mêmes tail/head plusieurs fois)
         counts = Counter(edges_raw)
         seen = defaultdict(int)
-
-        for tail, head in edges_raw:
-            src = self.nodes.get(tail)
-            dst = self.nodes.get(head)
-            if not src or not dst:
-                continue
-
+        wanted = {}
+        for tail, head, pts, label, label_pos in edges_parsed:
             key = (tail, head)
             occ = seen[key]
             seen[key] += 1
-            n = counts[key]
+            geom = ([to_px(p) for p in pts], label, to_px(label_pos) if label_pos else None)
+            wanted[(tail, head, occ)] = (counts[key], geom)
+
+        # --- Retraits (arêtes d'abord : elles référencent les boîtes)
+        for k in [k for k in self.edges if k not in wanted]:
+            e = self.edges.pop(k); e.detach(); self.scene().removeItem(e)
+        for nid in [n for n in self.nodes if n not in nodes_raw]:
+            self.scene().removeItem(self.nodes.pop(nid))
+
+        # --- Boîtes : ajout ou mise à jour
+        moves = []
+        targets = {}
+        for nid,(x,y,w,h) in nodes_raw.items():
+            target = targets[nid] = to_px((x, y))
+            node = self.nodes.get(nid)
+            if node is None:
+                node=NodeItem(nid, names.get(nid) or _layer_name(nid), w*PX_PER_INCH, h*PX_PER_INCH,
+                              is_link=(nid in link_ids), is_cluster=(nid in cluster_ids))
+                node.setPos(target)
+                self.scene().addItem(node); self.nodes[nid]=node
+            else:
+                node.update_box(names.get(nid) or _layer_name(nid), w*PX_PER_INCH, h*PX_PER_INCH,
+                                is_link=(nid in link_ids), is_cluster=(nid in cluster_ids))
+                if not node.user_moved and node.pos() != target:
+                    moves.append((node, node.pos(), target))
+            node.setSelected(nid in selected_ids)
+
+        # --- Arêtes : ajout ou mise à jour
+        for (tail, head, occ), (n, (spline, label, label_pos)) in wanted.items():
+            key = (tail, head)
 
             # Base : séparation des bidirectionnelles
             off = 0.0
@@ -261,18 +557,46 @@ class DiagramCanvas(QGraphicsView):
                 else:
                     pairs = []
 
-            e = EdgeItem(
-                src, dst,
-                pairs=pairs,
-                highlight=(tail in selected_ids or head in selected_ids),
-                offset=off
-            )
-            self.scene().addItem(e)
-            self.edges.append(e)
+            highlight = (tail in selected_ids or head in selected_ids)
+            e = self.edges.get((tail, head, occ))
+            if e is not None:
+                e.update_edge(pairs=pairs, highlight=highlight, offset=off)
+            else:
+                e = EdgeItem(
+                    self.nodes[tail], self.nodes[head],
+                    pairs=pairs,
+                    highlight=highlight,
+                    offset=off
+                )
+                self.scene().addItem(e)
+            # Tracé de la mise en page, valable pour les positions cibles des boîtes
+            e.set_spline(spline, label, label_pos, src_at=targets[tail], dst_at=targets[head])
+            e.updatePath()
+            self.edges[(tail, head, occ)] = e
+
+        self._tune_index()
+        self._apply_search()
+        if moves:
+            self._animate_moves(moves)
+        if first or fit:
+            self._fit_scene()
+        else:
+            self._grow_scene_rect(moves)
 
-        self._fit_scene()
+    def _tune_index(self):
+        """Profondeur du BSP proportionnelle au nombre d'éléments (≈ 8 éléments par feuille)."""
+        n = len(self.nodes) + len(self.edges)
+        self.scene().setBspTreeDepth(max(3, min(14, (n // 8).bit_length())))
+
+    def _grow_scene_rect(self, moves=()):
+        if not self.nodes: return
+        rect=self.scene().itemsBoundingRect()
+        for node, _, end in moves:
+            rect = rect.united(node.boundingRect().translated(end))
+        self.scene().setSceneRect(rect.adjusted(-60,-60,60,60))
 
     def _fit_scene(self):
         if not self.nodes: return
         rect=self.scene().itemsBoundingRect().adjusted(-60,-60,60,60)
-        self.scene().setSceneRect(rect); self.fitInView(rect, Qt.KeepAspectRatio)
\ No newline at end of file
+        self.scene().setSceneRect(rect); self.fitInView(rect, Qt.KeepAspectRatio)
+        self.minimap.update_visibility()
\ No newline at end of file
@@ -1,17 +1,35 @@
 # -*- coding: utf-8 -*-
-from qgis.PyQt.QtCore import Qt, QUrl
+from qgis.PyQt.QtCore import Qt, QUrl, QTimer
 from qgis.PyQt.QtGui import QDesktopServices
 from qgis.PyQt.QtWidgets import (
     QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QFileDialog, QSplitter, QLineEdit, QFormLayout, QMessageBox
+    QFileDialog, QSplitter, QLineEdit, QFormLayout, QMessageBox, QComboBox, QCheckBox, QSpinBox,
+    QDialog, QDialogButtonBox, QTextEdit, QApplication, QListWidget, QListWidgetItem
 )
-import os, tempfile
-from qgis.core import QgsProject, QgsSettings
+import os, tempfile, json
+from urllib.parse import quote
+from qgis.core import QgsProject, QgsSettings, QgsVectorLayer, QgsApplication, QgsProviderRegistry
 
-from .relation_utils import RelationsSnapshot
-from .graphviz_renderer import GraphvizRenderer
+from .relation_utils import RelationsSnapshot, ClusterNode
+from .graphviz_renderer import GraphvizRenderer, AsyncGraphvizRenderer
+from .core.layout import parse_plain
 from .diagram_canvas import DiagramCanvas
 from .selected_panel import SelectionBoard
+from .graph_analytics import JoinPathIndex, join_sql, path_label, summary_lines
+from .report_writer import HtmlReportTask, write_html_report, write_compact_report
+from .links_exporter import link_relations, LinksExportTask
+from .atlas_exporter import ATLAS_FORMATS, MAX_WORKERS, table_jobs, AtlasTask
+from .profiling import timer
+from .perf_pane import PerformancePane
+
+# Propriétés LinQ enregistrées dans le projet (.qgz)
+PROJECT_SCOPE = 'linq'
+KEY_POSITIONS = 'layout/positions'
+KEY_MOVED = 'layout/moved'
+SEARCH_IDLE_MS = 700   # pause de frappe avant de recalculer le focus
+FOCUS_MAX_DEPTH = 9
+REPORT_FILTER_TREE = 'HTML – arbre complet (*.html *.htm)'
+REPORT_FILTER_COMPACT = 'HTML – interactif compact (*.html *.htm)'
 
 
 class RelationsExplorerDock(QDockWidget):
@@ -33,23 +51,73 @@ class RelationsExplorerDock(QDockWidget):
 
         self.btn_refresh = QPushButton('Analyser les relations')
         self.btn_export = QPushButton('Exporter diagramme (SVG)…')
+        self.btn_atlas = QPushButton('Atlas…')
+        self.btn_atlas.setToolTip('Un diagramme par table (avec son voisinage) : SVG, PNG et/ou draw.io')
+        self.btn_atlas.clicked.connect(self.export_atlas)
         self.btn_export_drawio = QPushButton('Exporter Draw.io…')
         self.btn_export_drawio.clicked.connect(self.export_drawio)
         self.btn_export_html = QPushButton('Rapport HTML…')
         self.btn_export_html.clicked.connect(self.export_html_report)        
+        self.btn_export_links = QPushButton('Exporter les liens…')
+        self.btn_export_links.setToolTip('Une ligne par lien parent → enfant (CSV ou GeoPackage)')
+        self.btn_export_links.clicked.connect(self.export_links)
+        self.btn_analytics = QPushButton('Analyse du graphe…')
+        self.btn_analytics.setToolTip('Boucles, relations réflexives, tables les plus reliées, ordre d’enregistrement')
+        self.btn_analytics.clicked.connect(self.show_graph_analytics)
 
         self.search = QLineEdit()
         self.search.setPlaceholderText('Rechercher une table…')
 
+        self.chk_keep_layout = QCheckBox('Conserver les positions')
+        self.chk_keep_layout.setToolTip("Les tables déjà placées gardent leur position ; "
+                                        "seules les nouvelles tables sont placées")
+        self.chk_keep_layout.setChecked(
+            QgsSettings().value('relations_explorer/incremental_layout', True, type=bool))
+        self.btn_relayout = QPushButton('Réorganiser')
+        self.btn_relayout.setToolTip('Recalculer toute la mise en page')
+
+        # Voisinage du focus : profondeur (nombre de relations) et sens
+        self.spin_depth = QSpinBox()
+        self.spin_depth.setRange(1, FOCUS_MAX_DEPTH)
+        self.spin_depth.setPrefix('Voisinage : ')
+        self.spin_depth.setToolTip('Nombre de relations parcourues autour des tables en focus')
+        self.spin_depth.setValue(QgsSettings().value('relations_explorer/focus_depth', 1, type=int))
+        self.direction_combo = QComboBox()
+        self.direction_combo.addItem('Parents et enfants', 'both')
+        self.direction_combo.addItem('Parents seulement', 'parents')
+        self.direction_combo.addItem('Enfants seulement', 'children')
+        idx = self.direction_combo.findData(QgsSettings().value('relations_explorer/focus_direction', 'both'))
+        self.direction_combo.setCurrentIndex(max(idx, 0))
+
+        # Regroupement repliable (clic sur un groupe = le déplier)
+        self.cluster_combo = QComboBox()
+        self.cluster_combo.addItem('Sans regroupement', 'none')
+        self.cluster_combo.addItem('Regrouper : groupes de couches', 'group')
+        self.cluster_combo.addItem('Regrouper : sources de données', 'source')
+        self.cluster_combo.addItem('Regrouper : communautés', 'community')
+        self.cluster_combo.setToolTip('Un groupe replié est une seule boîte ; clic dessus pour le déplier')
+        idx = self.cluster_combo.findData(QgsSettings().value('relations_explorer/cluster_by', 'none'))
+        self.cluster_combo.setCurrentIndex(max(idx, 0))
+        self.btn_collapse_all = QPushButton('Tout replier')
+
         # Ligne 1 : [Analyser] ..... [Recherche] [Exporter SVG]
         header_top.addWidget(self.btn_refresh)
         header_top.addStretch(1)
         header_top.addWidget(self.search)
         header_top.addWidget(self.btn_export)
-
-        # Ligne 2 : ..... [Rapport HTML…] [Exporter Draw.io…] (aligné à droite)
+        header_top.addWidget(self.btn_atlas)
+
+        # Ligne 2 : [Conserver les positions] [Réorganiser] [Voisinage] [Sens] ..... [Rapport HTML…] [Exporter Draw.io…]
+        header_bottom.addWidget(self.chk_keep_layout)
+        header_bottom.addWidget(self.btn_relayout)
+        header_bottom.addWidget(self.spin_depth)
+        header_bottom.addWidget(self.direction_combo)
+        header_bottom.addWidget(self.cluster_combo)
+        header_bottom.addWidget(self.btn_collapse_all)
         header_bottom.addStretch(1)
+        header_bottom.addWidget(self.btn_analytics)
         header_bottom.addWidget(self.btn_export_html)
+        header_bottom.addWidget(self.btn_export_links)
         header_bottom.addWidget(self.btn_export_drawio)
         header_bottom.setContentsMargins(0, 0, 0, 6)
 
@@ -76,6 +144,13 @@ class RelationsExplorerDock(QDockWidget):
         self.btn_save_dot = QPushButton('Chemin dot : Enregistrer')
         form.addRow('Chemin vers dot (optionnel) :', self.dot_path_edit)
         form.addRow('', self.btn_save_dot)
+        self.engine_combo = QComboBox()
+        self.engine_combo.addItem('Automatique (intégrée pour les petites vues)', 'auto')
+        self.engine_combo.addItem('Graphviz (dot)', 'dot')
+        self.engine_combo.addItem('Intégrée (sans Graphviz)', 'native')
+        idx = self.engine_combo.findData(QgsSettings().value('relations_explorer/layout_engine', 'auto'))
+        self.engine_combo.setCurrentIndex(max(idx, 0))
+        form.addRow('Mise en page :', self.engine_combo)
 
         self.diagram_layout.addWidget(self.diagram_widget)
         self.diagram_layout.addWidget(self.dot_hint)
@@ -87,17 +162,49 @@ class RelationsExplorerDock(QDockWidget):
         self.splitter.setStretchFactor(0, 2)
         self.splitter.setStretchFactor(1, 3)
 
+        # Volet repliable : durées des opérations LinQ (profiling)
+        self.perf_pane = PerformancePane(main)
+        root.addWidget(self.perf_pane)
+
         # --- État
         self.snapshot = None
         self.gv = GraphvizRenderer()
+        self.gv_async = AsyncGraphvizRenderer(self.gv, self)  # ne livre que le rendu le plus récent
         self.canvas = None
+        self._positions = {}   # {layer_id: (x, y)} en pouces (repère plain), boîtes de la vue affichée
+        self._moved = {}       # idem, boîtes déplacées à la main (gardées d'une vue à l'autre)
+        self._fit_next = False
+        self._positions_project = None   # projet dont proviennent les positions
+        self._expanded = set()           # groupes dépliés (les autres sont repliés)
+        self._view_cache = None          # (clé, vue, {couche: boîte de groupe})
+        self._render_view = None         # vue du rendu en cours
+        self._render_focus = frozenset() # focus du rendu en cours
+        self._last_plain = None          # (vue, focus, texte -Tplain) du dernier rendu affiché
+        self._join_index = None          # chemins de jointure (BFS mémorisés) du snapshot courant
+        self._report_task = None         # rapport HTML en cours d'écriture (QgsTask)
+        self._links_task = None          # export des liens en cours (QgsTask)
+        self._atlas_task = None          # atlas en cours (QgsTask)
+        self._search_timer = QTimer(self)   # mise en page du focus après une pause de frappe
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_IDLE_MS)
 
         # --- Signaux
         self.btn_refresh.clicked.connect(self.refresh_all)
         self.btn_export.clicked.connect(self.export_diagram)
         self.btn_save_dot.clicked.connect(self.save_dot_path)
+        self.engine_combo.currentIndexChanged.connect(self.save_layout_engine)
+        self.chk_keep_layout.toggled.connect(self._on_keep_layout_toggled)
+        self.btn_relayout.clicked.connect(self.relayout)
+        self.spin_depth.valueChanged.connect(self.save_focus_scope)
+        self.direction_combo.currentIndexChanged.connect(self.save_focus_scope)
+        self.cluster_combo.currentIndexChanged.connect(self.save_cluster_mode)
+        self.btn_collapse_all.clicked.connect(self.collapse_all)
         self.board.selectionChanged.connect(self.refresh_diagram_only)
-        self.search.textChanged.connect(self.refresh_diagram_only)
+        self.search.textChanged.connect(self._on_search_edited)
+        self.search.returnPressed.connect(self._on_search_committed)
+        self._search_timer.timeout.connect(self.refresh_diagram_only)
+        self.gv_async.rendered.connect(self._on_plain_rendered)
+        self.gv_async.failed.connect(self._on_render_failed)
 
     # ------------------------------------------------------------------ utils
     def _clear_diag_layout_and_put(self, widget):
@@ -118,23 +225,127 @@ class RelationsExplorerDock(QDockWidget):
             pass
         self.refresh_diagram_only()
 
+    def save_layout_engine(self, *args):
+        QgsSettings().setValue('relations_explorer/layout_engine', self.engine_combo.currentData())
+        self.gv.reload()
+        self.refresh_diagram_only()
+
+    def save_focus_scope(self, *args):
+        settings = QgsSettings()
+        settings.setValue('relations_explorer/focus_depth', self.spin_depth.value())
+        settings.setValue('relations_explorer/focus_direction', self.direction_combo.currentData())
+        self.gv.reload()
+        self.refresh_diagram_only()
+
+    def save_cluster_mode(self, *args):
+        QgsSettings().setValue('relations_explorer/cluster_by', self.cluster_combo.currentData())
+        self._expanded.clear()
+        self.refresh_diagram_only()
+
+    def collapse_all(self):
+        self._expanded.clear()
+        self.refresh_diagram_only()
+
+    def _on_keep_layout_toggled(self, checked):
+        QgsSettings().setValue('relations_explorer/incremental_layout', bool(checked))
+
+    def _layout_positions(self):
+        """
+        Positions à conserver (mode incrémental), sinon None : seules les boîtes
+        de la vue précédente et celles déplacées à la main sont épinglées.
+        """
+        if not self.chk_keep_layout.isChecked():
+            return None
+        return {**self._positions, **self._moved}
+
+    def relayout(self):
+        """Oublie les positions connues et recalcule toute la mise en page."""
+        self._positions.clear()
+        self._moved.clear()
+        if self.canvas:
+            self.canvas.forget_manual_moves()
+        self._fit_next = True
+        self.refresh_diagram_only()
+
+    # ------------------------------------------- positions stockées au projet
+    def _load_saved_positions(self, key=KEY_POSITIONS) -> dict:
+        raw, ok = QgsProject.instance().readEntry(PROJECT_SCOPE, key, '')
+        if not ok or not raw:
+            return {}
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return {}
+        out = {}
+        for nid, xy in (data.items() if isinstance(data, dict) else []):
+            try:
+                out[nid] = (float(xy[0]), float(xy[1]))
+            except (TypeError, ValueError, IndexError):
+                continue
+        return out
+
+    def _save_positions(self, user_change=False):
+        """
+        Enregistre les positions dans les propriétés du projet. Une simple mise
+        en page ne marque pas le projet comme modifié ; un déplacement manuel oui.
+        """
+        if not self.snapshot:
+            return
+        prj = QgsProject.instance()
+        known = set(self.snapshot.layers) | set(self._render_view.layers if self._render_view else ())
+        was_dirty = prj.isDirty()
+        for key, positions in ((KEY_POSITIONS, self._positions), (KEY_MOVED, self._moved)):
+            data = {nid: [round(x, 3), round(y, 3)]
+                    for nid, (x, y) in positions.items() if nid in known}
+            raw = json.dumps(data, sort_keys=True)
+            if raw != prj.readEntry(PROJECT_SCOPE, key, '')[0]:
+                prj.writeEntry(PROJECT_SCOPE, key, raw)
+        if not user_change and not was_dirty:
+            prj.setDirty(False)
+
+    def _restore_project_positions(self):
+        """Au changement de projet : reprend les positions enregistrées dans celui-ci."""
+        prj = QgsProject.instance()
+        key = prj.fileName()
+        if key == self._positions_project:
+            return
+        self._positions_project = key
+        self._positions = self._load_saved_positions()
+        self._moved = self._load_saved_positions(KEY_MOVED)
+        if self.canvas:
+            self.canvas.clearAll()
+        self._fit_next = True
+
+    def _on_nodes_moved(self):
+        self._moved.update(self.canvas.layout_positions(moved_only=True))
+        self._save_positions(user_change=True)
+
     # ---------------------------------------------------------------- capture
     def refresh_all(self):
-        self.snapshot = RelationsSnapshot.capture(QgsProject.instance())
+        self._restore_project_positions()
+        with timer('capture'):
+            self.snapshot = RelationsSnapshot.capture(QgsProject.instance())
         self.board.set_snapshot(self.snapshot)
         self.refresh_diagram_only()
 
     # Mapping (parent_id, child_id) -> [ [ (PK_parent, FK_enfant), ... ], [ ... ], ... ]
     # (une liste par relation / arête)
-    def _edge_pairs_map(self):
+    def _edge_pairs_map(self, snapshot=None):
         mp = {}
-        if not self.snapshot:
+        snapshot = snapshot or self.snapshot
+        if not snapshot:
             return mp
-        for e in self.snapshot.edges:
+        for e in snapshot.edges:
             key = (e.parent_layer_id, e.child_layer_id)
             mp.setdefault(key, []).append(list(e.pairs))
         return mp
 
+    def _search_matches(self) -> list:
+        """IDs des couches qui correspondent à la recherche, les meilleures d'abord."""
+        if not self.snapshot:
+            return []
+        return self.snapshot.name_index().search(self.search.text())
+
     def _current_focus_ids(self) -> set:
         """
         Retourne l'ensemble des IDs de couches qui servent de *focus* pour le diagramme.
@@ -145,17 +356,8 @@ class RelationsExplorerDock(QDockWidget):
         if not self.snapshot:
             return set()
 
-        query = self.search.text().strip().lower()
-        if query:
-            focus_ids = set()
-            for nid, node in self.snapshot.layers.items():
-                try:
-                    name = node.name.lower()
-                except AttributeError:
-                    name = str(node.name).lower()
-                if query in name:
-                    focus_ids.add(nid)
-            return focus_ids
+        if self.search.text().strip():
+            return set(self._search_matches())
 
         # Pas de recherche : on prend ce qui est réellement visible côté board
         return set(self.board.selected_layer_ids() or [])
@@ -165,73 +367,215 @@ class RelationsExplorerDock(QDockWidget):
         Retourne les IDs de couches qui matchent la recherche (champ du haut),
         sans tenir compte des tables présentes dans la board.
         """
-        if not self.snapshot:
-            return set()
-
-        query = self.search.text().strip().lower()
-        if not query:
-            return set()
+        return set(self._search_matches())
 
-        ids = set()
-        for nid, node in self.snapshot.layers.items():
-            try:
-                name = node.name.lower()
-            except AttributeError:
-                name = str(node.name).lower()
-            if query in name:
-                ids.add(nid)
-        return ids
-
-    def _snapshot_to_plain(self):
-        if not self.snapshot:
-            return ""
-        highlight = self.board.selected_layer_ids()
-        focus = self._current_focus_ids()
-        return self.gv.render_plain(
-            self.snapshot,
-            highlight_ids=highlight,
-            focus_ids=focus if focus else None
-        )
+    # ------------------------------------------------------- groupes repliés
+    def _diagram_view(self):
+        """
+        (snapshot affiché, {id couche: id de la boîte de groupe}) : le snapshot
+        avec chaque groupe replié remplacé par une seule boîte.
+        """
+        mode = self.cluster_combo.currentData()
+        if not self.snapshot or mode == 'none':
+            return self.snapshot, {}
+        key = (id(self.snapshot), mode, frozenset(self._expanded))
+        if self._view_cache is None or self._view_cache[0] != key:
+            collapsed = set(self.snapshot.clusters(mode)) - self._expanded
+            view, member_of = self.snapshot.collapsed_view(mode, collapsed)
+            self._view_cache = (key, view, member_of)
+        return self._view_cache[1], self._view_cache[2]
+
+    @staticmethod
+    def _view_ids(ids, member_of):
+        """Ids de couches → ids affichés (une couche d'un groupe replié = sa boîte)."""
+        if ids is None:
+            return None
+        return {member_of.get(i, i) for i in ids}
+
+    def _on_node_clicked(self, node_id: str):
+        view = self._render_view
+        node = view.layers.get(node_id) if view else None
+        if isinstance(node, ClusterNode):
+            self._expanded.add(node_id.split(':', 2)[2])
+            self.refresh_diagram_only()
+
+    # ------------------------------------------------------ recherche instantanée
+    def _on_search_edited(self, text):
+        """
+        Chaque frappe : on estompe seulement les boîtes déjà affichées qui ne
+        correspondent pas. La mise en page du focus attend Entrée ou une pause.
+        """
+        if self.canvas is not None and self.snapshot:
+            matches = self._search_matches() if text.strip() else None
+            if matches:
+                member_of = self._diagram_view()[1]
+                matches = list(dict.fromkeys(member_of.get(i, i) for i in matches))
+            self.canvas.set_search(matches)
+            if matches:
+                self.canvas.reveal(matches[0])
+        self._search_timer.start()
+
+    def _on_search_committed(self):
+        self._search_timer.stop()
+        self.refresh_diagram_only()
 
     # ---------------------------------------------------------- diagram refresh
     def refresh_diagram_only(self, *args):
+        """Lance un rendu asynchrone ; un rendu encore en cours est annulé."""
         if not self.snapshot:
             return
+        self._search_timer.stop()
 
         # Utilise exactement le même focus que celui qui sera utilisé pour l'export
-        plain = self._snapshot_to_plain()
+        view, member_of = self._diagram_view()
+        highlight = self._view_ids(self.board.selected_layer_ids(), member_of)
+        focus = self._view_ids(self._current_focus_ids(), member_of)
+        self._render_view = view
+        self._render_focus = frozenset(focus or ())
+        self.gv_async.render(
+            view,
+            'plain',
+            highlight_ids=highlight,
+            focus_ids=focus if focus else None,
+            positions=self._layout_positions()
+        )
+
+    def _on_render_failed(self, ticket, message):
+        txt = "Impossible de générer le diagramme. Vérifie Graphviz (binaire 'dot').\n"
+        if message:
+            txt += "\nDétails Graphviz :\n" + message
+        self.diagram_widget.setText(txt)
+        self._clear_diag_layout_and_put(self.diagram_widget)
 
+    def _on_plain_rendered(self, ticket, fmt, plain):
+        view = self._render_view
+        if not self.snapshot or view is None:
+            return
         if not plain:
-            txt = "Impossible de générer le diagramme. Vérifie Graphviz (binaire 'dot').\n"
-            if getattr(self.gv, 'last_error', ''):
-                txt += "\nDétails Graphviz :\n" + self.gv.last_error
-            self.diagram_widget.setText(txt)
-            self._clear_diag_layout_and_put(self.diagram_widget)
+            self._on_render_failed(ticket, self.gv.last_error)
             return
 
-        # Recréation du canvas
-        if self.canvas:
-            self.canvas.setParent(None)
-            self.canvas = None
-        self.canvas = DiagramCanvas()
-        # Double-clic = ajouter colonne (pas de simple clic)
-        self.canvas.nodeDoubleClicked.connect(self._on_node_double_clicked)
-
-        selected_ids = set(self.board.selected_layer_ids())
-        link_ids = {nid for nid, n in self.snapshot.layers.items() if getattr(n, 'is_link_table', False)}
-        edge_pairs = self._edge_pairs_map()
-
-        self.canvas.set_graph(
-            plain,
-            selected_ids=selected_ids,
-            link_ids=link_ids,
-            edge_pairs_map=edge_pairs
-        )
-
-        self._clear_diag_layout_and_put(self.canvas)
+        # Positions de cette vue seulement : la suivante n'épingle que ses boîtes
+        # encore visibles (les autres, groupes repliés / dépliés compris, sont replacées)
+        self._last_plain = (view, self._render_focus, plain)
+        nodes, _ = parse_plain(plain)
+        self._positions = {nid: (x, y) for nid, (x, y, w, h) in nodes.items()}
+
+        # Canvas unique : set_graph ne modifie que ce qui a changé (zoom conservé)
+        if self.canvas is None:
+            self.canvas = DiagramCanvas()
+            # Double-clic = ajouter colonne (pas de simple clic)
+            self.canvas.nodeDoubleClicked.connect(self._on_node_double_clicked)
+            self.canvas.nodesMoved.connect(self._on_nodes_moved)
+            self.canvas.nodeClicked.connect(self._on_node_clicked)
+            self.canvas.pathRequested.connect(self._on_path_requested)
+
+        selected_ids = self._view_ids(self.board.selected_layer_ids(), self._diagram_view()[1])
+        link_ids = {nid for nid, n in view.layers.items() if getattr(n, 'is_link_table', False)}
+        clusters = {nid: n.name for nid, n in view.layers.items() if isinstance(n, ClusterNode)}
+        edge_pairs = self._edge_pairs_map(view)
+
+        with timer('diagramme', f"{len(view.layers)} table(s)"):
+            self.canvas.set_graph(
+                plain,
+                selected_ids=selected_ids,
+                link_ids=link_ids,
+                edge_pairs_map=edge_pairs,
+                fit=self._fit_next,
+                names=clusters,
+                cluster_ids=set(clusters)
+            )
+        self._fit_next = False
+        # Les boîtes déplacées à la main gardent leur place (et sont épinglées au prochain rendu)
+        self._moved.update(self.canvas.layout_positions(moved_only=True))
+        self._save_positions()
+
+        if self.canvas.parentWidget() is not self.diagram_container:
+            self._clear_diag_layout_and_put(self.canvas)
+
+    # ------------------------------------------------------ chemin de jointure
+    def _on_path_requested(self, src_id: str, dst_id: str):
+        prj = QgsProject.instance()
+        if prj.mapLayer(src_id) is None or prj.mapLayer(dst_id) is None:
+            self.iface.messageBar().pushInfo("LinQ", "Déplie d'abord le groupe pour choisir une table.")
+            self.canvas.show_path()
+            return
+        if self._join_index is None or self._join_index.snapshot is not self.snapshot:
+            self._join_index = JoinPathIndex(self.snapshot)
+        paths = self._join_index.paths(src_id, dst_id)
+        if not paths:
+            self.canvas.show_path()
+            self.iface.messageBar().pushWarning("LinQ", "Aucun chemin de relations entre ces deux tables.")
+            return
+        self._show_path(paths[0])
+        JoinPathDialog(self, paths).exec_()
+
+    def _show_path(self, path):
+        """Met le chemin en évidence dans le diagramme (boîtes de groupe comprises)."""
+        member_of = self._diagram_view()[1]
+        vid = lambda nid: member_of.get(nid, nid)
+        nodes = {vid(path[0].src)} | {vid(step.dst) for step in path}
+        links = [(vid(st.edge.parent_layer_id), vid(st.edge.child_layer_id), st.edge.pairs) for st in path]
+        self.canvas.show_path(nodes, links)
+
+    def add_virtual_layer(self, path):
+        """Couche virtuelle QGIS : jointure des tables le long du chemin."""
+        refs = {}
+        for nid in [path[0].src] + [step.dst for step in path]:
+            refs.setdefault(nid, f"t_{len(refs)}")
+        # Dans une couche virtuelle, la géométrie d'une couche référencée s'appelle « geometry »
+        sql = join_sql(self.snapshot, path, table_name=refs.get, columns=self._field_names,
+                       geometry=lambda nid: 'geometry' if self._is_spatial(nid) else None)
+        uri = '?' + '&'.join(f"layer_ref={quote(nid)}:{ref}" for nid, ref in refs.items())
+        uri += '&query=' + quote(sql)
+        name = ' – '.join((self.snapshot.layers[path[0].src].name, self.snapshot.layers[path[-1].dst].name))
+        lyr = QgsVectorLayer(uri, f"Jointure {name}", 'virtual')
+        if not lyr.isValid():
+            QMessageBox.warning(self, 'Couche virtuelle', 'Impossible de créer la couche virtuelle.')
+            return
+        QgsProject.instance().addMapLayer(lyr)
+        self.iface.messageBar().pushSuccess("LinQ", f"Couche virtuelle ajoutée : {lyr.name()}")
+
+    @staticmethod
+    def _field_names(layer_id):
+        lyr = QgsProject.instance().mapLayer(layer_id)
+        return [f.name() for f in lyr.fields()] if isinstance(lyr, QgsVectorLayer) else []
+
+    @staticmethod
+    def _is_spatial(layer_id):
+        lyr = QgsProject.instance().mapLayer(layer_id)
+        return isinstance(lyr, QgsVectorLayer) and lyr.isSpatial()
+
+    def join_sql_for(self, path):
+        """SQL du chemin sur les tables sources (colonne géométrique lue dans l'URI, si connue)."""
+        def geometry(nid):
+            lyr = QgsProject.instance().mapLayer(nid)
+            if not self._is_spatial(nid):
+                return None
+            uri = QgsProviderRegistry.instance().decodeUri(lyr.providerType(), lyr.source())
+            return uri.get('geometryColumn') or None
+        return join_sql(self.snapshot, path, columns=self._field_names, geometry=geometry)
+
+    # ------------------------------------------------------ analyse du graphe
+    def show_graph_analytics(self):
+        if not self.snapshot:
+            QMessageBox.information(self, 'Analyse', 'Lance d’abord l’analyse des relations.')
+            return
+        d = QDialog(self)
+        d.setWindowTitle('Analyse du graphe des relations')
+        d.resize(560, 480)
+        lay = QVBoxLayout(d)
+        txt = QTextEdit(); txt.setReadOnly(True)
+        txt.setPlainText('\n'.join(summary_lines(self.snapshot)))
+        btns = QDialogButtonBox(QDialogButtonBox.Close)
+        btns.rejected.connect(d.reject)
+        lay.addWidget(txt, 1); lay.addWidget(btns)
+        d.exec_()
 
     # -------------------------------------- action depuis double-clic diagramme
     def _on_node_double_clicked(self, layer_id: str):
+        if QgsProject.instance().mapLayer(layer_id) is None:
+            return   # boîte de groupe : le clic simple la déplie
         try:
             self.board.add_layer_by_id(layer_id)
             lyr = QgsProject.instance().mapLayer(layer_id)
@@ -295,16 +639,19 @@ class RelationsExplorerDock(QDockWidget):
         if not fn:
             return
 
-        svg = self.gv.render_svg(
-            self.snapshot,
-            highlight_ids=highlight,
-            focus_ids=focus_for_export if focus_for_export else None
-        )
-        if not svg:
-            return
+        view, member_of = self._diagram_view()
+        with timer('export SVG'):
+            svg = self.gv.render_svg(
+                view,
+                highlight_ids=self._view_ids(highlight, member_of),
+                focus_ids=self._view_ids(focus_for_export, member_of) if focus_for_export else None,
+                positions=self._layout_positions()
+            )
+            if not svg:
+                return
 
-        with open(fn, 'wb') as f:
-            f.write(svg)
+            with open(fn, 'wb') as f:
+                f.write(svg)
 
     # ------------------------------------------------------------- export draw
     def export_drawio(self):
@@ -342,6 +689,12 @@ class RelationsExplorerDock(QDockWidget):
             # Pas de filtre de recherche : comportement "historique"
             focus_for_export = set(highlight) if highlight else None
 
+        # Options : découpage en pages et compression
+        opts = self._drawio_options(bool(highlight or focus_for_export))
+        if opts is None:
+            return
+        pages_mode, compressed = opts
+
         fn, _ = QFileDialog.getSaveFileName(
             self,
             'Exporter au format draw.io',
@@ -351,101 +704,316 @@ class RelationsExplorerDock(QDockWidget):
         if not fn:
             return
 
-        # Essaye de récupérer les positions depuis la scène (facultatif)
-        node_pos = None
         try:
-            if hasattr(self, 'canvas') and hasattr(self.canvas, 'node_positions'):
-                node_pos = self.canvas.node_positions()  # dict {layer_id: (x,y)} si dispo
-        except Exception:
-            node_pos = None
-
-        try:
-            from .drawio_exporter import build_drawio
+            from .core.drawio import write_drawio, cluster_pages, focus_pages
         except Exception as ex:
             QMessageBox.warning(self, 'Export', f'Export draw.io indisponible : {ex}')
             return
 
         try:
-            xml = build_drawio(
-                self.snapshot,
-                node_positions=node_pos,
-                focus_ids=focus_for_export if focus_for_export else None
-            )
-            with open(fn, 'wb') as f:
-                f.write(xml)
+            view, member_of = self._diagram_view()
+            focus = self._view_ids(focus_for_export, member_of) if focus_for_export else None
+            # Positions et tracés de la mise en page du diagramme
+            node_pos, routes = self._drawio_layout(view, focus)
+            if pages_mode == 'single':
+                pages = None
+            else:
+                # Plusieurs pages : toutes les tables dépliées, une page par groupe / par table de focus
+                view = self.snapshot
+                focus = None
+                if pages_mode == 'clusters':
+                    pages = cluster_pages(view, self.cluster_combo.currentData())
+                else:
+                    pages = focus_pages(view, focus_for_export or highlight,
+                                        self.gv.focus_depth, self.gv.focus_direction)
+            with timer('export draw.io'), open(fn, 'w', encoding='utf-8') as f:
+                write_drawio(
+                    f, view,
+                    node_positions=node_pos,
+                    focus_ids=focus,
+                    focus_depth=self.gv.focus_depth,
+                    focus_direction=self.gv.focus_direction,
+                    compressed=compressed,
+                    pages=pages,
+                    routes=routes
+                )
             QMessageBox.information(self, 'Export', 'Fichier .drawio exporté avec succès.')
         except Exception as ex:
             QMessageBox.warning(self, 'Export', f'Échec export draw.io : {ex}')
 
+    def _drawio_layout(self, view, focus):
+        """
+        (positions, tracés) draw.io : mise en page -Tplain du dernier rendu si elle
+        porte sur la même vue et le même focus, sinon recalculée (même moteur que
+        le diagramme, positions connues conservées). Avec le dernier rendu, les
+        boîtes déplacées à la main gardent leur position affichée.
+        """
+        from .core.drawio import layout_from_plain
+        focus_key = frozenset(focus or ())
+        cached = self._last_plain
+        centres = None
+        if cached is not None and cached[0] is view and cached[1] == focus_key:
+            plain = cached[2]
+            if self.canvas is not None:
+                centres = self.canvas.layout_positions()
+        else:
+            plain = self.gv.render_plain(view, focus_ids=focus or None, positions=self._layout_positions())
+        if not plain:
+            # Repli : positions telles qu'affichées, sans tracé
+            return (self.canvas.node_positions() if self.canvas is not None else None), None
+        return layout_from_plain(plain, view, centres=centres)
+
+    def _drawio_options(self, has_focus):
+        """('single' | 'clusters' | 'focus', compressé) ou None si annulé."""
+        s = QgsSettings()
+        d = QDialog(self)
+        d.setWindowTitle('Export draw.io')
+        form = QFormLayout(d)
+        pages = QComboBox()
+        pages.addItem('Une seule page', 'single')
+        if self.cluster_combo.currentData() != 'none':
+            pages.addItem(f'Une page par groupe ({self.cluster_combo.currentText()})', 'clusters')
+        if has_focus:
+            pages.addItem('Une page par table du panneau LinQ (avec son voisinage)', 'focus')
+        pages.setCurrentIndex(max(0, pages.findData(s.value('relations_explorer/drawio_pages', 'single'))))
+        compress = QCheckBox('Compresser (fichier plus petit, format natif de draw.io)')
+        compress.setChecked(s.value('relations_explorer/drawio_compressed', False, type=bool))
+        btns = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        btns.accepted.connect(d.accept); btns.rejected.connect(d.reject)
+        form.addRow('Pages :', pages)
+        form.addRow(compress)
+        form.addRow(btns)
+        if d.exec_() != QDialog.Accepted:
+            return None
+        s.setValue('relations_explorer/drawio_pages', pages.currentData())
+        s.setValue('relations_explorer/drawio_compressed', compress.isChecked())
+        return pages.currentData(), compress.isChecked()
+
+    # ----------------------------------------------------------- atlas
+    def export_atlas(self):
+        if not self.snapshot:
+            QMessageBox.information(self, 'Atlas', 'Lance d’abord l’analyse des relations.')
+            return
+        if self._atlas_task is not None:
+            QMessageBox.information(self, 'Atlas', "Un atlas est déjà en cours.")
+            return
+        s = QgsSettings()
+        board_ids = self.board.selected_layer_ids() or []
+        search_ids = self._search_focus_ids() or []
+
+        d = QDialog(self)
+        d.setWindowTitle('Atlas de diagrammes')
+        form = QFormLayout(d)
+        scope = QComboBox()
+        if board_ids:
+            scope.addItem(f'Tables du panneau LinQ ({len(board_ids)})', 'board')
+        if search_ids:
+            scope.addItem(f'Tables trouvées par la recherche ({len(search_ids)})', 'search')
+        scope.addItem(f'Toutes les tables ({len(self.snapshot.layers)})', 'all')
+        form.addRow('Un diagramme par :', scope)
+        saved = (s.value('relations_explorer/atlas_formats', 'svg') or 'svg').split(',')
+        checks = {}
+        labels = {'svg': 'SVG', 'png': 'PNG', 'drawio': 'draw.io'}
+        for fmt in ATLAS_FORMATS:
+            checks[fmt] = QCheckBox(labels[fmt])
+            checks[fmt].setChecked(fmt in saved)
+            form.addRow('' if fmt != ATLAS_FORMATS[0] else 'Formats :', checks[fmt])
+        workers = QSpinBox()
+        workers.setRange(1, max(1, os.cpu_count() or 1))
+        workers.setValue(min(workers.maximum(), s.value('relations_explorer/atlas_workers', MAX_WORKERS, type=int)))
+        form.addRow('Rendus en parallèle :', workers)
+        form.addRow(QLabel(f'Voisinage : {self.gv.focus_depth} relation(s), comme dans le diagramme.'))
+        btns = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        btns.accepted.connect(d.accept); btns.rejected.connect(d.reject)
+        form.addRow(btns)
+        if d.exec_() != QDialog.Accepted:
+            return
+        formats = [f for f in ATLAS_FORMATS if checks[f].isChecked()]
+        if not formats:
+            return
+        if not self.gv.available() and formats != ['drawio']:
+            QMessageBox.warning(self, 'Atlas', "Graphviz (dot) est introuvable : seul le format draw.io est possible.")
+            return
+        s.setValue('relations_explorer/atlas_formats', ','.join(formats))
+        s.setValue('relations_explorer/atlas_workers', workers.value())
+
+        out_dir = QFileDialog.getExistingDirectory(self, 'Dossier de l’atlas')
+        if not out_dir:
+            return
+        ids = {'board': board_ids, 'search': search_ids}.get(scope.currentData())
+        jobs = table_jobs(self.snapshot, ids)
+        task = AtlasTask(self.gv, self.snapshot, jobs, out_dir, formats, workers.value())
+        task.taskCompleted.connect(lambda: self._on_atlas_done(task, True))
+        task.taskTerminated.connect(lambda: self._on_atlas_done(task, False))
+        self._atlas_task = task
+        QgsApplication.taskManager().addTask(task)
+        self.iface.messageBar().pushInfo("LinQ", f"Atlas en cours : {len(jobs)} diagramme(s)…")
+
+    def _on_atlas_done(self, task, ok):
+        self._atlas_task = None
+        if not ok:
+            msg = task.error or "Atlas annulé."
+            self.iface.messageBar().pushWarning("LinQ", f"Atlas non terminé : {msg}")
+            return
+        if task.errors:
+            details = "\n".join(f"{name} : {err}" for name, err in task.errors[:20])
+            QMessageBox.warning(self, 'Atlas', f"{len(task.errors)} diagramme(s) en échec :\n{details}")
+        self.iface.messageBar().pushSuccess("LinQ", f"Atlas : {task.written} fichier(s) dans {task.out_dir}")
+
     # ----------------------------------------------------------- export HTML
     def export_html_report(self):
-        if not self.snapshot or not self.board:
+        if not self.snapshot or not self.board or not self.board.columns:
             QMessageBox.information(
                 self,
                 'Rapport HTML',
                 "Aucun contenu à exporter.\nAjoute au moins une colonne dans LinQ."
             )
             return
-
-        # Demande au SelectionBoard de construire le HTML des colonnes
-        try:
-            body = self.board.build_html_report()
-        except Exception as ex:
-            QMessageBox.warning(self, 'Rapport HTML', f"Erreur lors de la génération : {ex}")
+        if self._report_task is not None:
+            QMessageBox.information(self, 'Rapport HTML', "Un rapport est déjà en cours d'écriture.")
             return
 
-        if not body or not body.strip():
-            QMessageBox.information(
-                self,
-                'Rapport HTML',
-                "Aucune colonne/entité visible à exporter."
-            )
+        # Portée : ce qui est affiché (limite Max, filtre) ou toutes les entités
+        box = QMessageBox(self)
+        box.setWindowTitle('Rapport HTML')
+        box.setText("Quelles entités inclure dans le rapport ?")
+        box.setInformativeText("« Toutes les entités » ignore la limite Max et le filtre des colonnes ;\n"
+                               "le rapport est écrit en arrière-plan.")
+        btn_visible = box.addButton('Entités affichées', QMessageBox.AcceptRole)
+        btn_all = box.addButton('Toutes les entités', QMessageBox.AcceptRole)
+        box.addButton(QMessageBox.Cancel)
+        box.exec_()
+        if box.clickedButton() not in (btn_visible, btn_all):
             return
 
-        html = """<!DOCTYPE html>
-<html>
-<head>
-  <meta charset="utf-8">
-  <title>Rapport LinQ</title>
-  <style>
-    body { font-family: sans-serif; margin: 1.5em; }
-    h1, h2 { font-family: sans-serif; }
-    h1 { margin-bottom: 0.5em; }
-    h2 { margin-top: 1.5em; border-bottom: 1px solid #ccc; padding-bottom: 0.2em; }
-    details { margin-left: 1.2em; }
-    details > summary { cursor: pointer; font-weight: 500; }
-    ul { list-style-type: disc; margin-left: 1.5em; }
-    li { margin: 2px 0; }
-    code { background: #f5f5f5; padding: 1px 3px; border-radius: 3px; }
-    .meta { color: #555; font-size: 0.9em; }
-  </style>
-</head>
-<body>
-<h1>Rapport LinQ – Relations et entités visibles</h1>
-""" + body + """
-</body>
-</html>
-"""
-
-        # Choix du fichier
-        fn, _ = QFileDialog.getSaveFileName(
+        # Choix du fichier et du format (arbre complet ou interactif compact)
+        fn, chosen = QFileDialog.getSaveFileName(
             self,
             'Enregistrer le rapport HTML',
             'rapport_linq.html',
-            'HTML (*.html *.htm)'
+            f'{REPORT_FILTER_TREE};;{REPORT_FILTER_COMPACT}'
         )
         if not fn:
             return
+        writer = write_compact_report if chosen == REPORT_FILTER_COMPACT else write_html_report
 
         try:
-            with open(fn, 'w', encoding='utf-8') as f:
-                f.write(html)
+            columns = self.board.report_columns(all_features=box.clickedButton() is btn_all)
         except Exception as ex:
-            QMessageBox.warning(self, 'Rapport HTML', f"Impossible d'écrire le fichier : {ex}")
+            QMessageBox.warning(self, 'Rapport HTML', f"Erreur lors de la génération : {ex}")
             return
 
+        task = HtmlReportTask(fn, columns, writer)
+        task.taskCompleted.connect(lambda: self._on_report_done(task, True))
+        task.taskTerminated.connect(lambda: self._on_report_done(task, False))
+        self._report_task = task   # garde une référence tant que la tâche tourne
+        QgsApplication.taskManager().addTask(task)
+        self.iface.messageBar().pushInfo("LinQ", "Rapport HTML en cours d'écriture (voir la barre des tâches)…")
+
+    def _on_report_done(self, task, ok):
+        self._report_task = None
+        if not ok:
+            msg = task.error or "Rapport annulé."
+            self.iface.messageBar().pushWarning("LinQ", f"Rapport HTML non terminé : {msg}")
+            return
+        self.iface.messageBar().pushSuccess("LinQ", f"Rapport HTML écrit ({task.rows} ligne(s)) : {task.path}")
         # Ouvrir dans le navigateur
         try:
-            QDesktopServices.openUrl(QUrl.fromLocalFile(fn))
+            QDesktopServices.openUrl(QUrl.fromLocalFile(task.path))
         except Exception:
-            pass
\ No newline at end of file
+            pass
+
+    # ------------------------------------------------ export des liens (CSV / GPKG)
+    def export_links(self):
+        if not self.snapshot or not self.snapshot.edges:
+            QMessageBox.information(self, 'Exporter les liens', 'Lance d’abord l’analyse des relations.')
+            return
+        if self._links_task is not None:
+            QMessageBox.information(self, 'Exporter les liens', "Un export est déjà en cours.")
+            return
+
+        # Choix des relations (toutes cochées par défaut)
+        name = lambda nid: self.snapshot.layers[nid].name if nid in self.snapshot.layers else nid
+        d = QDialog(self)
+        d.setWindowTitle('Exporter les liens')
+        d.resize(480, 420)
+        lay = QVBoxLayout(d)
+        lay.addWidget(QLabel('Relations à exporter :'))
+        lst = QListWidget()
+        for e in sorted(self.snapshot.edges, key=lambda e: (name(e.parent_layer_id).lower(), name(e.child_layer_id).lower())):
+            pairs = ', '.join(f'{p} → {c}' for p, c in e.pairs)
+            it = QListWidgetItem(f'{name(e.parent_layer_id)} → {name(e.child_layer_id)}  ({pairs})')
+            it.setData(Qt.UserRole, e.id)
+            it.setFlags(it.flags() | Qt.ItemIsUserCheckable)
+            it.setCheckState(Qt.Checked)
+            lst.addItem(it)
+        btns = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        btns.accepted.connect(d.accept); btns.rejected.connect(d.reject)
+        lay.addWidget(lst, 1); lay.addWidget(btns)
+        if d.exec_() != QDialog.Accepted:
+            return
+        edge_ids = {lst.item(i).data(Qt.UserRole) for i in range(lst.count())
+                    if lst.item(i).checkState() == Qt.Checked}
+        if not edge_ids:
+            return
+
+        fn, chosen = QFileDialog.getSaveFileName(
+            self, 'Exporter les liens', 'liens_linq.csv', 'CSV (*.csv);;GeoPackage (*.gpkg)')
+        if not fn:
+            return
+        fmt = 'gpkg' if fn.lower().endswith('.gpkg') or chosen.startswith('GeoPackage') else 'csv'
+        if fmt == 'gpkg' and not fn.lower().endswith('.gpkg'):
+            fn += '.gpkg'
+
+        try:
+            relations = link_relations(self.snapshot, edge_ids)
+        except Exception as ex:
+            QMessageBox.warning(self, 'Exporter les liens', f"Erreur lors de la préparation : {ex}")
+            return
+        task = LinksExportTask(fn, relations, fmt)
+        task.taskCompleted.connect(lambda: self._on_links_done(task, True))
+        task.taskTerminated.connect(lambda: self._on_links_done(task, False))
+        self._links_task = task
+        QgsApplication.taskManager().addTask(task)
+        self.iface.messageBar().pushInfo("LinQ", "Export des liens en cours (voir la barre des tâches)…")
+
+    def _on_links_done(self, task, ok):
+        self._links_task = None
+        if not ok:
+            msg = task.error or "Export annulé."
+            self.iface.messageBar().pushWarning("LinQ", f"Export des liens non terminé : {msg}")
+            return
+        self.iface.messageBar().pushSuccess("LinQ", f"{task.rows} lien(s) exporté(s) : {task.path}")
+
+class JoinPathDialog(QDialog):
+    """Plus courts chemins entre deux tables : choix du chemin, SQL, couche virtuelle."""
+    def __init__(self, dock, paths):
+        super().__init__(dock)
+        self.dock = dock
+        self.paths = paths
+        self.setWindowTitle('Chemin de jointure')
+        self.resize(620, 360)
+        lay = QVBoxLayout(self)
+        n = len(paths[0])
+        lay.addWidget(QLabel(f"{len(paths)} plus court(s) chemin(s), {n} relation(s) :"))
+        self.combo = QComboBox()
+        for path in paths:
+            self.combo.addItem(path_label(dock.snapshot, path))
+        self.txt = QTextEdit(); self.txt.setReadOnly(True)
+        btns = QDialogButtonBox(QDialogButtonBox.Close)
+        btn_copy = btns.addButton('Copier le SQL', QDialogButtonBox.ActionRole)
+        btn_virtual = btns.addButton('Créer une couche virtuelle', QDialogButtonBox.ActionRole)
+        btns.rejected.connect(self.reject)
+        btn_copy.clicked.connect(lambda: QApplication.clipboard().setText(self.txt.toPlainText()))
+        btn_virtual.clicked.connect(lambda: dock.add_virtual_layer(self.current()))
+        self.combo.currentIndexChanged.connect(self._on_path_changed)
+        lay.addWidget(self.combo); lay.addWidget(self.txt, 1); lay.addWidget(btns)
+        self._on_path_changed(0)
+
+    def current(self):
+        return self.paths[max(0, self.combo.currentIndex())]
+
+    def _on_path_changed(self, _):
+        path = self.current()
+        self.txt.setPlainText(self.dock.join_sql_for(path))
+        self.dock._show_path(path)
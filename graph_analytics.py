@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+graph_analytics.py
+Analyses du graphe des relations (RelationsSnapshot), sans dépendance QGIS :
+- chemins de jointure les plus courts entre deux tables (relations suivies
+  dans les deux sens, tables de liaison comprises) et SQL correspondant ;
+- composantes fortement connexes, relations réflexives et chaînes cycliques,
+  degrés entrant/sortant, ordre d'enregistrement sûr (parents avant enfants,
+  tables de liaison en dernier).
+"""
+__all__ = [
+    "JoinStep", "JoinPathIndex", "join_sql", "path_label",
+    "strongly_connected_components", "reflexive_edges", "cyclic_components",
+    "fan_in_out", "commit_order", "summary_lines",
+]
+
+import heapq
+from collections import namedtuple
+
+# Un pas de chemin : relation parcourue, de `src` vers `dst` ;
+# forward=True si l'on va du parent vers l'enfant.
+JoinStep = namedtuple('JoinStep', 'edge src dst forward')
+
+MAX_PATHS = 10
+
+
+def _qi(name: str) -> str:
+    """Identifiant SQL entre guillemets doubles."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class JoinPathIndex:
+    """
+    Graphe non orienté des relations, construit une fois par snapshot.
+    Les parcours en largeur sont mémorisés par table de départ : après la
+    première question depuis une table, toutes les suivantes sont immédiates.
+    """
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._nbrs = {nid: [] for nid in snapshot.layers}
+        for e in snapshot.edges:
+            p, c = e.parent_layer_id, e.child_layer_id
+            if p == c or p not in self._nbrs or c not in self._nbrs:
+                continue
+            self._nbrs[p].append(JoinStep(e, p, c, True))
+            self._nbrs[c].append(JoinStep(e, c, p, False))
+        self._bfs_cache = {}
+
+    def _bfs(self, src):
+        """{table: (distance, [pas qui y mènent par un plus court chemin])}"""
+        tree = self._bfs_cache.get(src)
+        if tree is not None:
+            return tree
+        tree = {src: (0, [])}
+        frontier = [src]
+        while frontier:
+            nxt = []
+            for nid in frontier:
+                d = tree[nid][0] + 1
+                for step in self._nbrs.get(nid, ()):
+                    seen = tree.get(step.dst)
+                    if seen is None:
+                        tree[step.dst] = (d, [step])
+                        nxt.append(step.dst)
+                    elif seen[0] == d:
+                        seen[1].append(step)
+            frontier = nxt
+        self._bfs_cache[src] = tree
+        return tree
+
+    def distance(self, src, dst):
+        """Nombre de relations du plus court chemin, ou None si les tables ne sont pas reliées."""
+        hit = self._bfs(src).get(dst)
+        return hit[0] if hit else None
+
+    def paths(self, src, dst, max_paths=MAX_PATHS):
+        """
+        Plus courts chemins de src à dst (au plus max_paths), chacun sous forme
+        de liste de JoinStep ; à longueur égale, ceux qui passent par le moins de
+        tables de liaison d'abord. [] si aucun chemin.
+        """
+        tree = self._bfs(src)
+        if dst not in tree or src == dst:
+            return []
+        links = {nid for nid, n in self.snapshot.layers.items() if getattr(n, 'is_link_table', False)}
+        # Parcours « meilleur d'abord » de dst vers src : coût = tables de liaison
+        # traversées (jamais décroissant), donc les chemins sortent déjà triés et
+        # on peut s'arrêter à max_paths sans en perdre un meilleur.
+        out = []
+        seq = 0
+        heap = [(0, seq, dst, [])]
+        while heap and len(out) < max_paths:
+            cost, _, nid, tail = heapq.heappop(heap)
+            if nid == src:
+                out.append(list(reversed(tail)))
+                continue
+            for step in tree[nid][1]:
+                seq += 1
+                extra = 1 if step.dst != dst and step.dst in links else 0
+                heapq.heappush(heap, (cost + extra, seq, step.src, tail + [step]))
+        return out
+
+
+def path_label(snapshot, path) -> str:
+    """'A → B ← C' : sens des flèches = parent vers enfant."""
+    if not path:
+        return ''
+    name = lambda nid: snapshot.layers[nid].name if nid in snapshot.layers else nid
+    parts = [name(path[0].src)]
+    for step in path:
+        parts.append(('→ ' if step.forward else '← ') + name(step.dst))
+    return ' '.join(parts)
+
+
+def join_sql(snapshot, path, table_name=None, columns=None, geometry=None) -> str:
+    """
+    Requête SELECT joignant les tables le long du chemin (alias t0, t1, …).
+    table_name(layer_id) donne le nom de table à utiliser (par défaut : nom de couche).
+    Colonnes : t0.*, puis celles des autres tables renommées tN_champ
+    (columns(layer_id) = noms des champs attributaires), pour qu'aucun nom
+    (fid, id…) ne soit en double. Une seule géométrie : celle de t0, sinon la
+    première de geometry(layer_id) (nom de la colonne géométrique ou None).
+    """
+    if not path:
+        return ''
+    table_name = table_name or (lambda nid: snapshot.layers[nid].name)
+    nodes = [path[0].src] + [step.dst for step in path]
+    select = ['t0.*']
+    has_geom = bool(geometry and geometry(nodes[0]))
+    for i, nid in enumerate(nodes[1:], start=1):
+        for col in (columns(nid) if columns else ()):
+            select.append(f't{i}.{_qi(col)} AS {_qi(f"t{i}_{col}")}')
+        geom = geometry(nid) if geometry and not has_geom else None
+        if geom:
+            select.append(f't{i}.{_qi(geom)} AS {_qi(geom)}')
+            has_geom = True
+    lines = ['SELECT ' + ',\n       '.join(select), f'FROM {_qi(table_name(nodes[0]))} AS t0']
+    for i, step in enumerate(path, start=1):
+        prev, cur = f't{i-1}', f't{i}'
+        parent, child = (prev, cur) if step.forward else (cur, prev)
+        conds = [f'{parent}.{_qi(pk)} = {child}.{_qi(fk)}' for pk, fk in step.edge.pairs]
+        on = ' AND '.join(conds) if conds else '1 = 1'
+        lines.append(f'JOIN {_qi(table_name(step.dst))} AS {cur} ON {on}')
+    return '\n'.join(lines)
+
+
+# ---------------------------------------------------------------------
+# Cycles, degrés, ordre d'enregistrement
+# ---------------------------------------------------------------------
+
+def _children_map(snapshot):
+    """{parent: [enfants]} (relations réflexives exclues, doublons retirés)."""
+    out = {nid: [] for nid in snapshot.layers}
+    for e in snapshot.edges:
+        p, c = e.parent_layer_id, e.child_layer_id
+        if p != c and p in out and c in out and c not in out[p]:
+            out[p].append(c)
+    return out
+
+
+def strongly_connected_components(snapshot):
+    """
+    Composantes fortement connexes (Tarjan, version itérative), dans l'ordre
+    topologique inverse : une composante vient avant celles qu'elle référence
+    (enfants d'abord).
+    """
+    children = _children_map(snapshot)
+    index, low, on_stack = {}, {}, set()
+    stack, out = [], []
+    counter = 0
+    for root in sorted(children):
+        if root in index:
+            continue
+        work = [(root, iter(children[root]))]
+        index[root] = low[root] = counter; counter += 1
+        stack.append(root); on_stack.add(root)
+        while work:
+            nid, it = work[-1]
+            child = next(it, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = low[child] = counter; counter += 1
+                    stack.append(child); on_stack.add(child)
+                    work.append((child, iter(children[child])))
+                elif child in on_stack:
+                    low[nid] = min(low[nid], index[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[nid])
+            if low[nid] == index[nid]:
+                comp = []
+                while True:
+                    top = stack.pop(); on_stack.discard(top)
+                    comp.append(top)
+                    if top == nid:
+                        break
+                out.append(comp)
+    return out
+
+
+def reflexive_edges(snapshot):
+    """Relations d'une table vers elle-même (parent = enfant)."""
+    return [e for e in snapshot.edges if e.parent_layer_id == e.child_layer_id]
+
+
+def cyclic_components(snapshot):
+    """Groupes de tables reliées en boucle (au moins 2 tables), chacun trié par nom."""
+    name = lambda nid: str(snapshot.layers[nid].name).lower()
+    comps = [sorted(c, key=name) for c in strongly_connected_components(snapshot) if len(c) > 1]
+    return sorted(comps, key=lambda c: name(c[0]))
+
+
+def fan_in_out(snapshot):
+    """{couche: (nb de relations où elle est enfant, nb de relations où elle est parent)}"""
+    fan = {nid: [0, 0] for nid in snapshot.layers}
+    for e in snapshot.edges:
+        if e.child_layer_id in fan:
+            fan[e.child_layer_id][0] += 1
+        if e.parent_layer_id in fan:
+            fan[e.parent_layer_id][1] += 1
+    return {nid: tuple(v) for nid, v in fan.items()}
+
+
+def commit_order(snapshot, layer_ids=None):
+    """
+    Ordre d'enregistrement des couches : parents avant enfants, tables de liaison
+    le plus tard possible. Les tables d'une même boucle restent groupées (par nom).
+    Avec layer_ids, l'ordre global est restreint à ces couches (les dépendances
+    passant par d'autres tables sont respectées).
+    """
+    layers = snapshot.layers
+    comps = strongly_connected_components(snapshot)
+    comp_of = {nid: i for i, comp in enumerate(comps) for nid in comp}
+    name = lambda nid: str(layers[nid].name).lower()
+
+    succ = {i: set() for i in range(len(comps))}
+    indeg = {i: 0 for i in range(len(comps))}
+    for p, kids in _children_map(snapshot).items():
+        for c in kids:
+            a, b = comp_of[p], comp_of[c]
+            if a != b and b not in succ[a]:
+                succ[a].add(b); indeg[b] += 1
+
+    def key(i):
+        comp = comps[i]
+        is_link = all(getattr(layers[nid], 'is_link_table', False) for nid in comp)
+        return (is_link, min(name(nid) for nid in comp), i)
+
+    heap = [key(i) for i, d in indeg.items() if d == 0]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        i = heapq.heappop(heap)[-1]
+        order.extend(sorted(comps[i], key=name))
+        for j in succ[i]:
+            indeg[j] -= 1
+            if indeg[j] == 0:
+                heapq.heappush(heap, key(j))
+    if layer_ids is not None:
+        wanted = set(layer_ids)
+        order = [nid for nid in order if nid in wanted]
+    return order
+
+
+def summary_lines(snapshot, top=10):
+    """Résumé lisible des analyses (pour une boîte de dialogue ou un rapport)."""
+    name = lambda nid: snapshot.layers[nid].name if nid in snapshot.layers else nid
+    lines = [f"{len(snapshot.layers)} couche(s), {len(snapshot.edges)} relation(s)."]
+
+    refl = reflexive_edges(snapshot)
+    lines.append('')
+    lines.append(f"Relations réflexives : {len(refl)}")
+    lines += [f"  • {name(e.parent_layer_id)} ({', '.join(f'{p} → {c}' for p, c in e.pairs)})" for e in refl]
+
+    cycles = cyclic_components(snapshot)
+    lines.append('')
+    lines.append(f"Chaînes cycliques : {len(cycles)}")
+    lines += ['  • ' + ' ⇄ '.join(name(nid) for nid in comp) for comp in cycles]
+
+    fan = fan_in_out(snapshot)
+    lines.append('')
+    lines.append("Tables les plus référencées (relations où elles sont parent) :")
+    for nid in sorted(fan, key=lambda n: (-fan[n][1], str(name(n)).lower()))[:top]:
+        if fan[nid][1]:
+            lines.append(f"  • {name(nid)} : {fan[nid][1]}")
+    lines.append("Tables qui référencent le plus (relations où elles sont enfant) :")
+    for nid in sorted(fan, key=lambda n: (-fan[n][0], str(name(n)).lower()))[:top]:
+        if fan[nid][0]:
+            lines.append(f"  • {name(nid)} : {fan[nid][0]}")
+
+    lines.append('')
+    lines.append("Ordre d'enregistrement sûr (parents avant enfants, tables de liaison en dernier) :")
+    involved = {e.parent_layer_id for e in snapshot.edges} | {e.child_layer_id for e in snapshot.edges}
+    lines += [f"  {i}. {name(nid)}" for i, nid in enumerate(commit_order(snapshot, involved), start=1)]
+    return lines
@@ -1,103 +1,121 @@
-import subprocess, shutil, tempfile, sys
+import shutil, time
+from qgis.PyQt.QtCore import QObject, QProcess, pyqtSignal
 from qgis.core import QgsSettings
 
-def _esc(s: str) -> str:
-    if s is None:
-        return ""
-    return str(s).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
-
-def _run_no_console(args):
-    # Évite la fenêtre console éphémère sous Windows
-    if sys.platform.startswith('win'):
-        si = subprocess.STARTUPINFO()
-        si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        try:
-            flags = subprocess.CREATE_NO_WINDOW
-        except AttributeError:
-            flags = 0
-        return subprocess.run(args, capture_output=True, startupinfo=si, creationflags=flags)
-    else:
-        return subprocess.run(args, capture_output=True)
-
-class GraphvizRenderer:
+# DOT et rendu sans QGIS (core/dot.py) ; seuls les réglages et QProcess restent ici
+from .core.dot import (
+    DotRenderer, LAYOUT_ENGINES, NATIVE_AUTO_MAX_NODES, RENDER_CACHE_SIZE
+)
+from .relation_utils import FOCUS_DIRECTIONS
+from .profiling import PROFILER, timer
+
+
+class GraphvizRenderer(DotRenderer):
+    """DotRenderer réglé par les paramètres de l'extension (QgsSettings)."""
     def __init__(self):
+        super().__init__()
         self.reload()
-        self.last_error = ""
 
     def reload(self):
-        set_path = QgsSettings().value('relations_explorer/dot_path', '').strip()
+        settings = QgsSettings()
+        set_path = settings.value('relations_explorer/dot_path', '').strip()
         self.dot_path = set_path or shutil.which('dot')
+        engine = settings.value('relations_explorer/layout_engine', 'auto')
+        self.engine = engine if engine in LAYOUT_ENGINES else 'auto'
+        # Voisinage du focus : nombre de relations et sens
+        self.focus_depth = max(1, settings.value('relations_explorer/focus_depth', 1, type=int))
+        direction = settings.value('relations_explorer/focus_direction', 'both')
+        self.focus_direction = direction if direction in FOCUS_DIRECTIONS else 'both'
+
+    def render_outputs(self, snapshot, formats, highlight_ids=None, focus_ids=None, positions=None):
+        with timer('rendu dot', ', '.join(formats)):
+            return super().render_outputs(snapshot, formats, highlight_ids, focus_ids, positions)
+
+    def render_plain_native(self, snapshot, highlight_ids=None, focus_ids=None, positions=None) -> str:
+        with timer('rendu intégré'):
+            return super().render_plain_native(snapshot, highlight_ids, focus_ids, positions)
+
+
+class AsyncGraphvizRenderer(QObject):
+    """
+    Rendu Graphviz non bloquant : `dot` est lancé via QProcess, le DOT est
+    envoyé sur stdin et le résultat est livré par signal.
+
+    Chaque appel à `render()` renvoie un ticket ; une nouvelle demande tue le
+    processus précédent, si bien que seul le rendu le plus récent est livré.
+    """
+    rendered = pyqtSignal(int, str, object)   # (ticket, format, sortie : str pour plain, bytes sinon)
+    failed = pyqtSignal(int, str)             # (ticket, message d'erreur)
+
+    def __init__(self, renderer: GraphvizRenderer, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self._ticket = 0
+        self._proc = None
+        self._started = 0.0   # début du rendu en cours (profiling)
+
+    def is_running(self) -> bool:
+        return self._proc is not None
+
+    def cancel(self):
+        """Abandonne le rendu en cours (son résultat ne sera jamais livré)."""
+        self._ticket += 1
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            proc.kill()
+
+    def render(self, snapshot, fmt='plain', highlight_ids=None, focus_ids=None, positions=None) -> int:
+        self.cancel()
+        ticket = self._ticket
+        if fmt == 'plain':
+            keep_nodes, _ = self.renderer._focus_subgraph(snapshot, focus_ids)
+            if self.renderer.layout_mode(keep_nodes, positions) in ('native', 'incremental'):
+                # Moteur intégré : synchrone, et coût limité aux nœuds ajoutés en incrémental
+                plain = self.renderer.render_plain_native(snapshot, highlight_ids, focus_ids, positions)
+                self.rendered.emit(ticket, fmt, plain)
+                return ticket
+        if not self.renderer.available():
+            self.renderer.last_error = "Graphviz (dot) introuvable."
+            self.failed.emit(ticket, self.renderer.last_error)
+            return ticket
+
+        self._started = time.perf_counter()
+        dot = self.renderer._build_dot(snapshot, highlight_ids, focus_ids, positions)
+        proc = QProcess(self)
+        proc.finished.connect(lambda code, status, p=proc, t=ticket, f=fmt: self._on_finished(p, t, f, code, status))
+        proc.errorOccurred.connect(lambda err, p=proc, t=ticket: self._on_error(p, t, err))
+        self._proc = proc
+        proc.start(self.renderer.dot_path,
+                   self.renderer._engine_args(snapshot, focus_ids, positions) + ['-T' + fmt])
+        # QProcess met l'écriture en tampon jusqu'au démarrage effectif
+        proc.write(dot.encode('utf-8'))
+        proc.closeWriteChannel()
+        return ticket
+
+    def _release(self, proc):
+        if self._proc is proc:
+            self._proc = None
+        proc.deleteLater()
+
+    def _on_finished(self, proc, ticket, fmt, code, status):
+        self._release(proc)
+        if ticket != self._ticket:
+            return  # rendu périmé (annulé ou remplacé)
+        out = bytes(proc.readAllStandardOutput())
+        err = bytes(proc.readAllStandardError()).decode('utf-8', errors='ignore').strip()
+        self.renderer.last_error = err
+        if status != QProcess.NormalExit or code != 0:
+            self.failed.emit(ticket, err or f"dot a échoué (code {code}).")
+            return
+        PROFILER.record('rendu dot', time.perf_counter() - self._started, fmt)
+        data = out.decode('utf-8', errors='ignore') if fmt.startswith('plain') else out
+        self.rendered.emit(ticket, fmt, data)
 
-    def available(self) -> bool:
-        return self.dot_path is not None
-
-    def _build_dot(self, snapshot, highlight_ids=None, focus_ids=None):
-        highlight_ids = set(highlight_ids or [])
-        focus_ids = set(focus_ids or [])
-
-        all_nodes = snapshot.layers
-        all_edges = snapshot.edges
-
-        if focus_ids:
-            keep_nodes = set(focus_ids)
-            keep_edges = []
-            for e in all_edges:
-                if e.parent_layer_id in focus_ids or e.child_layer_id in focus_ids:
-                    keep_edges.append(e)
-                    keep_nodes.add(e.parent_layer_id)
-                    keep_nodes.add(e.child_layer_id)
-        else:
-            keep_nodes = set(all_nodes.keys())
-            keep_edges = all_edges
-
-        def node_stmt(n):
-            base = f'"{_esc(n.id)}" [label="{_esc(n.name)}", shape=box'
-            if getattr(n, 'is_link_table', False):
-                base += ', style=filled, fillcolor="#FFE0B2"'
-            if n.id in highlight_ids:
-                base += ', penwidth=2'
-            base += ']'
-            return base
-
-        lines = [
-            'digraph relations {',
-            '  rankdir=LR;',
-            '  graph [splines=true, overlap=false];',
-            '  node [fontname="Helvetica", fontsize=10];',
-            '  edge [fontname="Helvetica", fontsize=9];'
-        ]
-        for nid, n in snapshot.layers.items():
-            if nid in keep_nodes:
-                lines.append('  ' + node_stmt(n))
-        for e in keep_edges:
-            label = '\\n'.join([f'{_esc(p)} → {_esc(c)}' for p, c in e.pairs])
-            style = f' [label="{label}"]' if label else ''
-            lines.append(f'  "{_esc(e.parent_layer_id)}" -> "{_esc(e.child_layer_id)}"{style};')
-        lines.append('}')
-        return '\n'.join(lines)
-
-    def render_svg(self, snapshot, highlight_ids=None, focus_ids=None) -> bytes:
-        if not self.available():
-            return None
-        dot = self._build_dot(snapshot, highlight_ids, focus_ids)
-        with tempfile.NamedTemporaryFile('w', suffix='.dot', delete=False, encoding='utf-8') as f:
-            f.write(dot)
-            dot_fn = f.name
-        proc = _run_no_console([self.dot_path, '-Tsvg', dot_fn])
-        self.last_error = proc.stderr.decode('utf-8', errors='ignore').strip()
-        if proc.returncode != 0:
-            return None
-        return proc.stdout
-
-    def render_plain(self, snapshot, highlight_ids=None, focus_ids=None) -> str:
-        if not self.available():
-            return ""
-        dot = self._build_dot(snapshot, highlight_ids, focus_ids)
-        with tempfile.NamedTemporaryFile('w', suffix='.dot', delete=False, encoding='utf-8') as f:
-            f.write(dot)
-            dot_fn = f.name
-        proc = _run_no_console([self.dot_path, '-Tplain', dot_fn])
-        self.last_error = proc.stderr.decode('utf-8', errors='ignore').strip()
-        if proc.returncode != 0:
-            return ""
-        return proc.stdout.decode('utf-8', errors='ignore')
\ No newline at end of file
+    def _on_error(self, proc, ticket, error):
+        if error != QProcess.FailedToStart:
+            return  # les plantages passent aussi par finished()
+        self._release(proc)
+        if ticket != self._ticket:
+            return
+        self.renderer.last_error = proc.errorString()
+        self.failed.emit(ticket, self.renderer.last_error)
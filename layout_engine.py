@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+layout_engine.py
+Moteur de mise en page intégré : déplacé dans core/layout.py (sans QGIS),
+réexporté ici pour les imports existants.
+"""
+from .core.layout import parse_plain, layered_layout, incremental_layout
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+links_exporter.py
+Export à plat des liens parent–enfant des relations (CSV ou table GeoPackage) :
+une ligne (relation, parent, clé, libellé, enfant, clé, libellé) par enfant relié.
+
+Chaque relation est une seule jointure par hachage : la couche parente est lue
+une fois pour indexer ses clés, puis la couche enfant défile une fois et chaque
+ligne part dans le fichier par lots. Rien n'est gardé en mémoire hormis l'index
+des parents, quel que soit le nombre de liens.
+"""
+__all__ = ["LINK_FIELDS", "LinkSide", "LinkRelation", "link_relations", "iter_links", "LinksExportTask"]
+
+import csv
+import os
+from qgis.core import (
+    QgsProject, QgsVectorLayer, QgsVectorLayerFeatureSource, QgsFeatureRequest,
+    QgsExpressionContext, QgsExpressionContextUtils, QgsTask, QgsFeature, QgsFields,
+    QgsField, QgsVectorFileWriter, QgsWkbTypes, QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext
+)
+from qgis.PyQt.QtCore import QVariant
+from .report_writer import Labeler, BATCH_SIZE, WRITE_BUFFER, _is_null
+from .profiling import timer
+
+LINK_FIELDS = ['relation', 'parent_layer', 'parent_key', 'parent_label',
+               'child_layer', 'child_key', 'child_label']
+GPKG_TABLE = 'linq_links'
+KEY_SEP = '|'   # clés composées
+
+
+class LinkSide:
+    """Une couche de la relation, copiée dans le thread principal (lisible depuis une tâche)."""
+    def __init__(self, layer: QgsVectorLayer):
+        self.name = layer.name()
+        self.source = QgsVectorLayerFeatureSource(layer)
+        self.fields = layer.fields()
+        expr = (layer.displayExpression() or '').strip()
+        self.label_spec = ('expr', expr) if expr else ('first', None)
+        self.context = QgsExpressionContext()
+        self.context.appendScopes(QgsExpressionContextUtils.globalProjectLayerScopes(layer))
+        self.key_idx = list(layer.primaryKeyAttributes())   # [] → identifiant d'entité
+        self.count = max(0, int(layer.featureCount()))
+
+
+class LinkRelation:
+    def __init__(self, name, parent: LinkSide, child: LinkSide, pairs):
+        self.name = name
+        self.parent = parent
+        self.child = child
+        self.pairs = list(pairs)    # [(champ parent, champ enfant), ...]
+
+
+def link_relations(snapshot, edge_ids=None, project: QgsProject = None):
+    """Relations du snapshot à exporter (toutes, ou celles de edge_ids), prêtes pour la tâche."""
+    project = project or QgsProject.instance()
+    relmgr = project.relationManager()
+    out = []
+    for e in snapshot.edges:
+        if edge_ids is not None and e.id not in edge_ids:
+            continue
+        parent = project.mapLayer(e.parent_layer_id)
+        child = project.mapLayer(e.child_layer_id)
+        if not isinstance(parent, QgsVectorLayer) or not isinstance(child, QgsVectorLayer) or not e.pairs:
+            continue
+        rel = relmgr.relation(e.id)
+        name = rel.name() if rel.isValid() and rel.name() else e.id
+        out.append(LinkRelation(name, LinkSide(parent), LinkSide(child), e.pairs))
+    return out
+
+
+def _key_text(values) -> str:
+    return KEY_SEP.join('' if _is_null(v) else str(v) for v in values)
+
+
+def _request(label: Labeler) -> QgsFeatureRequest:
+    req = QgsFeatureRequest()
+    if not label.needs_geometry():
+        req.setFlags(QgsFeatureRequest.NoGeometry)
+    return req
+
+
+def iter_links(rel: LinkRelation, canceled=None):
+    """
+    Lignes de la relation, par lots de BATCH_SIZE (ordre de la couche enfant).
+    Les enfants sans parent (FK vide ou orpheline) ne sont pas exportés.
+    """
+    canceled = canceled or (lambda: False)
+    pk_idx = [rel.parent.fields.indexOf(pk) for pk, _ in rel.pairs]
+    fk_idx = [rel.child.fields.indexOf(fk) for _, fk in rel.pairs]
+    if min(pk_idx) < 0 or min(fk_idx) < 0:
+        return
+
+    # Construction : {clé parent: (clé texte, libellé)}
+    label = Labeler(rel.parent.label_spec, rel.parent.fields, rel.parent.context)
+    parents = {}
+    for f in rel.parent.source.getFeatures(_request(label)):
+        if canceled():
+            return
+        attrs = f.attributes()
+        key = tuple(attrs[i] for i in pk_idx)
+        if key not in parents and not any(_is_null(v) for v in key):
+            parents[key] = (_key_text(key), label(f) or str(f.id()))
+    label.counted(len(parents))
+
+    # Sonde : la couche enfant défile une fois
+    label = Labeler(rel.child.label_spec, rel.child.fields, rel.child.context)
+    key_idx = rel.child.key_idx
+    batch = []
+    for n, f in enumerate(rel.child.source.getFeatures(_request(label)), start=1):
+        if n % BATCH_SIZE == 0 and canceled():
+            return
+        attrs = f.attributes()
+        hit = parents.get(tuple(attrs[i] for i in fk_idx))
+        if hit is None:
+            continue
+        child_key = _key_text(attrs[i] for i in key_idx) if key_idx else str(f.id())
+        batch.append((rel.name, rel.parent.name, hit[0], hit[1],
+                      rel.child.name, child_key, label(f) or str(f.id())))
+        if len(batch) >= BATCH_SIZE:
+            label.counted(len(batch))
+            yield batch
+            batch = []
+    if batch:
+        label.counted(len(batch))
+        yield batch
+
+
+class _CsvSink:
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8', newline='', buffering=WRITE_BUFFER)
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(LINK_FIELDS)
+
+    def write(self, rows):
+        self._csv.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _GpkgSink:
+    """Table attributaire GeoPackage (sans géométrie), écrite par lots."""
+    def __init__(self, path):
+        self.fields = QgsFields()
+        for name in LINK_FIELDS:
+            self.fields.append(QgsField(name, QVariant.String))
+        opts = QgsVectorFileWriter.SaveVectorOptions()
+        opts.driverName = 'GPKG'
+        opts.layerName = GPKG_TABLE
+        opts.fileEncoding = 'UTF-8'
+        # GeoPackage existant : seule la table linq_links est remplacée, les autres restent
+        opts.actionOnExistingFile = (QgsVectorFileWriter.CreateOrOverwriteLayer if os.path.exists(path)
+                                     else QgsVectorFileWriter.CreateOrOverwriteFile)
+        self._writer = QgsVectorFileWriter.create(
+            path, self.fields, QgsWkbTypes.NoGeometry, QgsCoordinateReferenceSystem(),
+            QgsCoordinateTransformContext(), opts)
+        if self._writer.hasError() != QgsVectorFileWriter.NoError:
+            raise RuntimeError(self._writer.errorMessage())
+
+    def write(self, rows):
+        feats = []
+        for row in rows:
+            f = QgsFeature(self.fields)
+            f.setAttributes(list(row))
+            feats.append(f)
+        if not self._writer.addFeatures(feats):
+            raise RuntimeError(self._writer.errorMessage())
+
+    def close(self):
+        self._writer.flushBuffer()
+        del self._writer    # ferme le fichier
+
+
+class LinksExportTask(QgsTask):
+    """Export en arrière-plan ; fmt = 'csv' ou 'gpkg'."""
+    def __init__(self, path, relations, fmt='csv'):
+        super().__init__('Export des liens LinQ', QgsTask.CanCancel)
+        self.path = path
+        self.relations = relations
+        self.fmt = fmt
+        self.rows = 0
+        self.error = None
+
+    def run(self):
+        total = sum(max(1, r.child.count) for r in self.relations) or 1
+        done = 0
+        try:
+            with timer('export des liens', self.fmt):
+                sink = _GpkgSink(self.path) if self.fmt == 'gpkg' else _CsvSink(self.path)
+                try:
+                    for rel in self.relations:
+                        rel_rows = 0
+                        for batch in iter_links(rel, self.isCanceled):
+                            sink.write(batch)
+                            rel_rows += len(batch)
+                            self.rows += len(batch)
+                            self.setProgress(min(100.0, 100.0 * (done + min(rel_rows, rel.child.count)) / total))
+                        if self.isCanceled():
+                            return False
+                        done += max(1, rel.child.count)
+                        self.setProgress(min(100.0, 100.0 * done / total))
+                finally:
+                    sink.close()
+        except Exception as ex:
+            self.error = str(ex)
+            return False
+        return True
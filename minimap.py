@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+minimap.py
+Vue d'ensemble du diagramme, incrustée dans le coin du DiagramCanvas :
+- image basse résolution de la scène, recalculée seulement quand la scène
+  change (regroupé par un court délai), jamais pendant un zoom ou un défilement ;
+- rectangle de la zone visible, déplaçable à la souris (clic = saut direct).
+"""
+__all__ = ["MiniMap"]
+
+from qgis.PyQt.QtCore import Qt, QRectF, QPointF, QTimer
+from qgis.PyQt.QtGui import QPainter, QPixmap, QPen, QBrush, QColor
+from qgis.PyQt.QtWidgets import QWidget
+
+MAP_W, MAP_H = 220, 150
+MARGIN = 10            # écart au bord de la vue
+REFRESH_MS = 300       # regroupe les changements de scène (animations, glisser)
+
+PEN_FRAME = QPen(QColor("#90a4ae"), 1.0)
+PEN_VIEW = QPen(QColor("#1565c0"), 1.5)
+BRUSH_VIEW = QBrush(QColor(21, 101, 192, 40))
+
+
+class MiniMap(QWidget):
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        self.setFixedSize(MAP_W, MAP_H)
+        self.setCursor(Qt.OpenHandCursor)
+        self._pixmap = None
+        self._source = QRectF()    # zone de scène représentée par l'image
+        self._target = QRectF()    # où l'image est dessinée dans le widget
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+        view.scene().changed.connect(self._schedule)
+        view.scene().sceneRectChanged.connect(self._schedule)
+        view.horizontalScrollBar().valueChanged.connect(self.update)
+        view.verticalScrollBar().valueChanged.connect(self.update)
+        self.hide()
+
+    # ----- image de la scène (cache)
+    def _schedule(self, *args):
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def refresh(self):
+        """Recalcule l'image ; masquée si tout le diagramme tient déjà dans la vue."""
+        scene = self.view.scene()
+        src = scene.sceneRect()
+        if src.isEmpty() or not self.view.nodes:
+            self._pixmap = None
+            self.hide()
+            return
+        scale = min((MAP_W - 4) / src.width(), (MAP_H - 4) / src.height())
+        w, h = src.width() * scale, src.height() * scale
+        self._source = QRectF(src)
+        self._target = QRectF((MAP_W - w) / 2.0, (MAP_H - h) / 2.0, w, h)
+        pm = QPixmap(max(1, int(w)), max(1, int(h)))
+        pm.fill(Qt.white)
+        p = QPainter(pm)
+        # À cette échelle, boîtes et arêtes passent en rendu simplifié (LOD)
+        scene.render(p, QRectF(0, 0, pm.width(), pm.height()), src, Qt.KeepAspectRatio)
+        p.end()
+        self._pixmap = pm
+        self.update_visibility()
+        self.update()
+
+    def update_visibility(self):
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        self.setVisible(self._pixmap is not None and not visible.contains(self._source))
+
+    # ----- conversions widget <-> scène
+    def _to_map(self, pt: QPointF) -> QPointF:
+        sx = self._target.width() / self._source.width()
+        sy = self._target.height() / self._source.height()
+        return QPointF(self._target.left() + (pt.x() - self._source.left()) * sx,
+                       self._target.top() + (pt.y() - self._source.top()) * sy)
+
+    def _to_scene(self, pt: QPointF) -> QPointF:
+        sx = self._source.width() / self._target.width()
+        sy = self._source.height() / self._target.height()
+        return QPointF(self._source.left() + (pt.x() - self._target.left()) * sx,
+                       self._source.top() + (pt.y() - self._target.top()) * sy)
+
+    # ----- dessin : image en cache + rectangle de la vue
+    def paintEvent(self, ev):
+        if self._pixmap is None:
+            return
+        p = QPainter(self)
+        p.fillRect(self.rect(), Qt.white)
+        p.drawPixmap(self._target.topLeft(), self._pixmap)
+        p.setPen(PEN_FRAME); p.setBrush(Qt.NoBrush)
+        p.drawRect(QRectF(self.rect()).adjusted(0.5, 0.5, -0.5, -0.5))
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        rect = QRectF(self._to_map(visible.topLeft()), self._to_map(visible.bottomRight()))
+        p.setPen(PEN_VIEW); p.setBrush(BRUSH_VIEW)
+        p.drawRect(rect.intersected(QRectF(self.rect())))
+        p.end()
+
+    # ----- navigation
+    def _jump(self, pos):
+        if self._pixmap is not None:
+            self.view.centerOn(self._to_scene(QPointF(pos)))
+
+    def mousePressEvent(self, ev):
+        if ev.button() == Qt.LeftButton:
+            self.setCursor(Qt.ClosedHandCursor)
+            self._jump(ev.pos())
+        ev.accept()
+
+    def mouseMoveEvent(self, ev):
+        if ev.buttons() & Qt.LeftButton:
+            self._jump(ev.pos())
+        ev.accept()
+
+    def mouseReleaseEvent(self, ev):
+        self.setCursor(Qt.OpenHandCursor)
+        ev.accept()
+
+    def place(self):
+        """Coin bas-droit de la vue (à appeler quand la vue est redimensionnée)."""
+        vp = self.view.viewport().geometry()
+        self.move(vp.right() - MAP_W - MARGIN, vp.bottom() - MAP_H - MARGIN)
+        self.raise_()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+perf_pane.py
+Volet repliable « Performance » du dock : durées par opération et compteurs
+de profiling.PROFILER, rafraîchis tant que le volet est déplié.
+"""
+from qgis.PyQt.QtCore import QTimer
+from qgis.PyQt.QtWidgets import (
+    QVBoxLayout, QHBoxLayout, QTreeWidget, QTreeWidgetItem, QPushButton, QCheckBox, QApplication
+)
+from qgis.core import QgsSettings
+from qgis.gui import QgsCollapsibleGroupBox
+
+from .profiling import PROFILER
+
+REFRESH_MS = 1000
+KEY_LOG = 'relations_explorer/perf_log'
+KEY_COLLAPSED = 'relations_explorer/perf_pane_collapsed'
+HEADERS = ['Opération', 'Appels', 'Dernière (ms)', 'Moyenne (ms)', 'Max (ms)', 'Total (ms)']
+
+
+class PerformancePane(QgsCollapsibleGroupBox):
+    def __init__(self, parent=None):
+        super().__init__('Performance', parent)
+        PROFILER.log_enabled = QgsSettings().value(KEY_LOG, False, type=bool)
+
+        lay = QVBoxLayout(self)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(HEADERS)
+        self.tree.setRootIsDecorated(False)
+        self.tree.setMinimumHeight(120)
+        lay.addWidget(self.tree, 1)
+
+        bar = QHBoxLayout()
+        self.chk_log = QCheckBox('Journal QGIS')
+        self.chk_log.setToolTip("Écrire chaque mesure dans le journal des messages (onglet LinQ)")
+        self.chk_log.setChecked(PROFILER.log_enabled)
+        self.btn_copy = QPushButton('Copier')
+        self.btn_copy.setToolTip('Copier les mesures (pour un signalement)')
+        self.btn_reset = QPushButton('Réinitialiser')
+        bar.addWidget(self.chk_log)
+        bar.addStretch(1)
+        bar.addWidget(self.btn_copy)
+        bar.addWidget(self.btn_reset)
+        lay.addLayout(bar)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+
+        self.chk_log.toggled.connect(self._on_log_toggled)
+        self.btn_copy.clicked.connect(lambda: QApplication.clipboard().setText(PROFILER.report_text()))
+        self.btn_reset.clicked.connect(self._reset)
+        self.collapsedStateChanged.connect(self._on_collapsed)
+        self.setCollapsed(QgsSettings().value(KEY_COLLAPSED, True, type=bool))
+        self._on_collapsed(self.isCollapsed())
+
+    def _on_collapsed(self, collapsed):
+        QgsSettings().setValue(KEY_COLLAPSED, bool(collapsed))
+        if collapsed:
+            self._timer.stop()
+        else:
+            self.refresh()
+            self._timer.start()
+
+    def _on_log_toggled(self, checked):
+        PROFILER.log_enabled = bool(checked)
+        QgsSettings().setValue(KEY_LOG, bool(checked))
+
+    def _reset(self):
+        PROFILER.reset()
+        self.refresh()
+
+    def refresh(self):
+        rows = []
+        for name, s in PROFILER.operations():
+            rows.append([name, str(s.calls)] +
+                        [f"{v * 1000:.1f}" for v in (s.last, s.mean, s.max, s.total)])
+        for name, value in PROFILER.counters():
+            rows.append([name, str(value), '', '', '', ''])
+        self.tree.setUpdatesEnabled(False)
+        try:
+            self.tree.clear()
+            self.tree.addTopLevelItems([QTreeWidgetItem(r) for r in rows])
+        finally:
+            self.tree.setUpdatesEnabled(True)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+profiling.py
+Instrumentation légère des opérations de LinQ, pour savoir où passe le temps
+(Graphviz, expressions de libellé, lecture des couches, remise à zéro des
+modèles Qt) et joindre des chiffres aux signalements :
+
+    with timer('capture'):
+        snapshot = RelationsSnapshot.capture(project)
+
+    @timed('arbre : reconstruction')
+    def rebuild(self): ...
+
+    count(FEATURES_READ, len(features))
+
+Durées et compteurs sont cumulés dans PROFILER (utilisable depuis les tâches de
+fond) et affichés dans le volet « Performance » du dock ; avec log_enabled,
+chaque mesure part aussi dans le journal QGIS (onglet LinQ). Sans dépendance
+à Qt : le journal n'est importé qu'au besoin.
+"""
+__all__ = ["PROFILER", "Profiler", "OpStats", "timer", "timed", "count",
+           "FEATURES_READ", "EXPRESSIONS_EVALUATED"]
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+LOG_TAG = 'LinQ'
+FEATURES_READ = 'entités lues'
+EXPRESSIONS_EVALUATED = 'expressions évaluées'
+
+
+class OpStats:
+    """Cumul des durées (secondes) d'une opération."""
+    __slots__ = ('calls', 'total', 'last', 'max')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.calls += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+    def copy(self) -> 'OpStats':
+        out = OpStats()
+        out.calls, out.total, out.last, out.max = self.calls, self.total, self.last, self.max
+        return out
+
+
+class Profiler:
+    def __init__(self):
+        self._lock = threading.Lock()   # mesures possibles depuis plusieurs threads
+        self._ops = {}
+        self._counters = {}
+        self.log_enabled = False
+
+    @contextmanager
+    def timer(self, name, detail=''):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t, detail)
+
+    def timed(self, name):
+        """Décorateur : chaque appel de la fonction est chronométré sous `name`."""
+        def deco(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def record(self, name, seconds, detail=''):
+        with self._lock:
+            stats = self._ops.get(name)
+            if stats is None:
+                stats = self._ops[name] = OpStats()
+            stats.add(seconds)
+        if self.log_enabled:
+            _log(f"{name} : {seconds * 1000:.1f} ms" + (f" ({detail})" if detail else ''))
+
+    def count(self, name, n=1):
+        if n:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+            self._counters.clear()
+
+    def operations(self):
+        """[(nom, OpStats)] copiés, du plus coûteux (temps cumulé) au moins coûteux."""
+        with self._lock:
+            rows = [(name, s.copy()) for name, s in self._ops.items()]
+        return sorted(rows, key=lambda r: -r[1].total)
+
+    def counters(self):
+        with self._lock:
+            return sorted(self._counters.items())
+
+    def report_text(self) -> str:
+        """Résumé texte (à coller dans un signalement)."""
+        lines = [f"{'Opération':<28} {'appels':>7} {'dernière':>10} {'moyenne':>10} {'max':>10} {'total':>10}  (ms)"]
+        for name, s in self.operations():
+            lines.append(f"{name:<28} {s.calls:>7} {s.last * 1000:>10.1f} {s.mean * 1000:>10.1f} "
+                         f"{s.max * 1000:>10.1f} {s.total * 1000:>10.1f}")
+        for name, value in self.counters():
+            lines.append(f"{name:<28} {value:>7}")
+        return '\n'.join(lines)
+
+
+def _log(message):
+    try:
+        from qgis.core import QgsMessageLog, Qgis
+        QgsMessageLog.logMessage(message, LOG_TAG, Qgis.Info)
+    except Exception:
+        pass
+
+
+PROFILER = Profiler()
+timer = PROFILER.timer
+timed = PROFILER.timed
+count = PROFILER.count
@@ -1,41 +1,34 @@
 # -*- coding: utf-8 -*-
-from dataclasses import dataclass, field
+import os
 from typing import Dict, List, Tuple, Set, Optional
 from qgis.core import (
-    QgsProject, QgsRelation, QgsVectorLayer, QgsFeature, QgsFeatureRequest
+    QgsProject, QgsRelation, QgsVectorLayer, QgsFeature, QgsFeatureRequest, QgsDataSourceUri
 )
 
+# Modèle sans QGIS (core/model.py) : réexporté ici pour le reste de l'extension
+from .core.model import (
+    RelationEdge, LayerNode, ClusterNode, AdjacencyIndex, NameIndex, FOCUS_DIRECTIONS,
+    CLUSTER_MODES, cluster_node_id, detect_communities, community_labels, mark_link_tables
+)
+from .core.model import RelationsSnapshot as _CoreSnapshot
+
 # ---------------------------------------------------------------------
-# Modèle / Snapshot
+# Capture du projet QGIS
 # ---------------------------------------------------------------------
 
-@dataclass
-class RelationEdge:
-    id: str
-    parent_layer_id: str
-    child_layer_id: str
-    pairs: List[Tuple[str, str]]  # (parent_field, child_field)
-
-@dataclass
-class LayerNode:
-    id: str
-    name: str
-    is_link_table: bool = False
-    editable_extra_fields: Set[str] = field(default_factory=set)
-
-@dataclass
-class RelationsSnapshot:
-    layers: Dict[str, LayerNode]
-    edges: List[RelationEdge]
-
+class RelationsSnapshot(_CoreSnapshot):
+    """Snapshot du modèle (core.model), capturable depuis un QgsProject."""
     @staticmethod
     def capture(project: QgsProject) -> 'RelationsSnapshot':
         relmgr = project.relationManager()
         layers: Dict[str, LayerNode] = {}
         edges: List[RelationEdge] = []
 
+        root = project.layerTreeRoot()
         for lyr in project.mapLayers().values():
-            layers[lyr.id()] = LayerNode(id=lyr.id(), name=lyr.name())
+            layers[lyr.id()] = LayerNode(id=lyr.id(), name=lyr.name(),
+                                         group=_tree_group(root, lyr.id()),
+                                         source=_source_key(lyr))
 
         for rel in relmgr.relations().values():
             parent = rel.referencedLayer()
@@ -45,51 +38,63 @@ class RelationsSnapshot:
             pairs = _pairs_parent_child(rel)
             edges.append(RelationEdge(rel.id(), parent.id(), child.id(), pairs))
 
-        # Détection tables de liaison (heuristique renforcée)
-        detect_link_tables(project, layers, relmgr)
+        # Détection tables de liaison (heuristique renforcée), sur les paires déjà lues
+        mark_link_tables(layers, edges, _link_pk_fields(project, edges))
         return RelationsSnapshot(layers=layers, edges=edges)
 
+def _tree_group(root, layer_id: str) -> str:
+    """Chemin 'Groupe / Sous-groupe' de la couche dans l'arbre des couches."""
+    node = root.findLayer(layer_id) if root is not None else None
+    names = []
+    parent = node.parent() if node is not None else None
+    while parent is not None and parent.parent() is not None:
+        names.append(parent.name())
+        parent = parent.parent()
+    return ' / '.join(reversed(names))
+
+def _source_key(lyr) -> str:
+    """Base (et schéma) pour les sources SQL, sinon nom du fichier."""
+    try:
+        uri = QgsDataSourceUri(lyr.source())
+        if uri.database():
+            db = os.path.basename(uri.database())
+            return f"{db}.{uri.schema()}" if uri.schema() else db
+        path = lyr.source().split('|')[0]
+        if os.path.isfile(path):
+            return os.path.basename(path)
+    except Exception:
+        pass
+    return lyr.providerType() or ''
+
 # ---------------------------------------------------------------------
 # Heuristique tables de liaison (Note A)
 # ---------------------------------------------------------------------
 
+def _link_pk_fields(project: QgsProject, edges: List[RelationEdge]) -> Dict[str, Set[str]]:
+    """Champs de clé primaire des couches enfants d'au moins 2 relations."""
+    count: Dict[str, int] = {}
+    for e in edges:
+        count[e.child_layer_id] = count.get(e.child_layer_id, 0) + 1
+    out: Dict[str, Set[str]] = {}
+    for child_id, n in count.items():
+        layer = project.mapLayer(child_id) if n >= 2 else None
+        if not isinstance(layer, QgsVectorLayer):
+            continue
+        fields = layer.fields()
+        out[child_id] = {fields.at(i).name() for i in layer.dataProvider().pkAttributeIndexes()
+                         if 0 <= i < fields.count()}
+    return out
+
 def detect_link_tables(project: QgsProject, layers: Dict[str, LayerNode], relmgr):
-    """
-    Heuristique améliorée :
-    - Une table est considérée comme "table de liaison" si elle a >= 2 relations ENTRANTES
-      (même si elles pointent vers le même parent → cas réflexif via L)
-    - ET si l'ensemble des PK de la table est inclus dans l'ensemble des champs FK impliqués.
-    """
-    child_map: Dict[str, List[QgsRelation]] = {}
+    """Marque les tables de liaison de `layers` (voir core.model.mark_link_tables)."""
+    edges = []
     for rel in relmgr.relations().values():
         child = rel.referencingLayer()
         parent = rel.referencedLayer()
         if not child or not parent:
             continue
-        child_map.setdefault(child.id(), []).append(rel)
-
-    for child_id, rels in child_map.items():
-        if len(rels) < 2:
-            continue
-        child_layer = project.mapLayer(child_id)
-        if not isinstance(child_layer, QgsVectorLayer):
-            continue
-
-        pks = set(child_layer.dataProvider().pkAttributeIndexes())
-        if not pks:
-            continue
-
-        fk_idx: Set[int] = set()
-        for r in rels:
-            for pk, fk in _pairs_parent_child(r):
-                idx = child_layer.fields().indexOf(fk)
-                if idx >= 0:
-                    fk_idx.add(idx)
-
-        if pks.issubset(fk_idx):
-            node = layers.get(child_id)
-            if node:
-                node.is_link_table = True
+        edges.append(RelationEdge(rel.id(), parent.id(), child.id(), _pairs_parent_child(rel)))
+    mark_link_tables(layers, edges, _link_pk_fields(project, edges))
 
 # ---------------------------------------------------------------------
 # Utilitaires relations (robustes au sens des paires)
@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+"""
+report_writer.py
+Rapport HTML LinQ écrit au fil de l'eau, en tâche de fond (QgsTask) :
+- les entités parentes sont lues par lots et chaque section part directement
+  dans le fichier (le document n'est jamais entièrement en mémoire) ;
+- les enfants sont lus lot par lot : une requête par relation, filtrée sur
+  les clés du lot (FK IN (…)), au lieu d'une requête par parent ;
+- mode « toutes les entités » : sans la limite Max ni le filtre des colonnes ;
+- variante compacte (write_compact_report) : l'arbre est sérialisé une fois
+  en JSON (libellés dédupliqués, référencés par numéro) et un petit script
+  ne crée les noeuds qu'à l'ouverture, avec une recherche sur les libellés.
+
+Les couches sont lues via QgsVectorLayerFeatureSource, créées dans le thread
+principal (voir ColumnWidget.report_column) : la tâche ne touche pas aux couches.
+"""
+__all__ = [
+    "ReportColumn", "ReportRelation", "HtmlReportTask",
+    "write_html_report", "write_compact_report", "html_escape",
+]
+
+import json
+from qgis.core import (
+    QgsTask, QgsFeatureRequest, QgsExpression, QgsExpressionContext
+)
+from .profiling import timer, count, FEATURES_READ, EXPRESSIONS_EVALUATED
+
+BATCH_SIZE = 1000          # entités parentes lues / écrites par lot
+WRITE_BUFFER = 1 << 16
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Rapport LinQ</title>
+  <style>
+    body { font-family: sans-serif; margin: 1.5em; }
+    h1, h2 { font-family: sans-serif; }
+    h1 { margin-bottom: 0.5em; }
+    h2 { margin-top: 1.5em; border-bottom: 1px solid #ccc; padding-bottom: 0.2em; }
+    details { margin-left: 1.2em; }
+    details > summary { cursor: pointer; font-weight: 500; }
+    ul { list-style-type: disc; margin-left: 1.5em; }
+    li { margin: 2px 0; }
+    code { background: #f5f5f5; padding: 1px 3px; border-radius: 3px; }
+    .meta { color: #555; font-size: 0.9em; }
+  </style>
+</head>
+<body>
+<h1>Rapport LinQ – Relations et entités visibles</h1>
+"""
+HTML_FOOT = """
+</body>
+</html>
+"""
+
+
+def html_escape(s) -> str:
+    if s is None:
+        return ""
+    return str(s).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _is_null(v) -> bool:
+    return v is None or (hasattr(v, 'isNull') and v.isNull())
+
+
+class Labeler:
+    """
+    Libellé d'une entité selon la règle d'une colonne LinQ :
+    spec = ('expr', expression) | ('field', nom) | ('id', None) | ('first', None).
+    """
+    def __init__(self, spec, fields, context: QgsExpressionContext = None):
+        self.kind, value = spec
+        self.fields = fields
+        self.expr = None
+        self.field_idx = -1
+        if self.kind == 'expr':
+            self.expr = QgsExpression(value)
+            self.context = QgsExpressionContext(context) if context is not None else QgsExpressionContext()
+            if self.expr.hasParserError():
+                self.kind = 'first'
+            else:
+                self.expr.prepare(self.context)
+        elif self.kind == 'field':
+            self.field_idx = fields.indexOf(value)
+            if self.field_idx < 0:
+                self.kind = 'first'
+
+    def needs_geometry(self) -> bool:
+        return self.kind == 'expr' and self.expr.needsGeometry()
+
+    def counted(self, n):
+        """Compte n entités lues (et n expressions évaluées si la règle est une expression)."""
+        count(FEATURES_READ, n)
+        if self.kind == 'expr':
+            count(EXPRESSIONS_EVALUATED, n)
+
+    def __call__(self, feat) -> str:
+        if self.kind == 'id':
+            return str(feat.id())
+        if self.kind == 'expr':
+            self.context.setFeature(feat)
+            val = self.expr.evaluate(self.context)
+            if not self.expr.hasEvalError():
+                return "" if _is_null(val) else str(val)
+        elif self.kind == 'field':
+            v = feat.attributes()[self.field_idx]
+            return "" if _is_null(v) else str(v)
+        for v in feat.attributes():
+            if not _is_null(v):
+                return str(v)
+        return str(feat.id())
+
+
+class ReportRelation:
+    """Groupe « → couche enfant » d'une colonne (relation dont la colonne est le parent)."""
+    def __init__(self, child_name, source, fields, label_spec, context, pairs):
+        self.child_name = child_name
+        self.source = source            # QgsVectorLayerFeatureSource de la couche enfant
+        self.fields = fields
+        self.label_spec = label_spec
+        self.context = context
+        self.pairs = list(pairs)        # [(champ parent, champ enfant), ...]
+
+
+class ReportColumn:
+    """Une colonne LinQ à exporter (données copiées dans le thread principal)."""
+    def __init__(self, title, source, fields, label_spec, context, count, fids=None, relations=()):
+        self.title = title
+        self.source = source            # QgsVectorLayerFeatureSource de la couche
+        self.fields = fields
+        self.label_spec = label_spec
+        self.context = context
+        self.count = count              # nombre d'entités parentes attendues (progression)
+        self.fids = fids                # None = toutes les entités
+        self.relations = list(relations)
+
+
+def _key_filter(fields, keys) -> str:
+    """Filtre « FK IN (…) » (ou OU de ET pour une clé composée) sur les clés d'un lot."""
+    if len(fields) == 1:
+        values = ", ".join(QgsExpression.quotedValue(k[0]) for k in keys)
+        return f"{QgsExpression.quotedColumnRef(fields[0])} IN ({values})"
+    return " OR ".join(
+        "(" + " AND ".join(f"{QgsExpression.quotedColumnRef(f)} = {QgsExpression.quotedValue(v)}"
+                           for f, v in zip(fields, k)) + ")"
+        for k in keys
+    )
+
+
+def _children_of(rel: ReportRelation, fk_idx, label, keys, canceled):
+    """
+    Enfants des parents d'un lot : {valeurs FK: [libellés]}, en une requête
+    filtrée sur les clés du lot (mémoire bornée par la taille du lot).
+    """
+    if not keys:
+        return {}
+    req = QgsFeatureRequest().setFilterExpression(_key_filter([fk for _, fk in rel.pairs], keys))
+    if not label.needs_geometry():
+        req.setFlags(QgsFeatureRequest.NoGeometry)
+    index = {}
+    n = 0
+    for f in rel.source.getFeatures(req):
+        if canceled():
+            break
+        attrs = f.attributes()
+        key = tuple(attrs[i] for i in fk_idx)
+        if key in keys:
+            index.setdefault(key, []).append(label(f) or str(f.id()))
+            n += 1
+    label.counted(n)
+    return index
+
+
+def _parent_batches(col: ReportColumn, need_geometry):
+    """Entités parentes, par lots de BATCH_SIZE (dans l'ordre des fids si fournis)."""
+    def request():
+        req = QgsFeatureRequest()
+        if not need_geometry:
+            req.setFlags(QgsFeatureRequest.NoGeometry)
+        return req
+
+    if col.fids is None:
+        batch = []
+        for f in col.source.getFeatures(request()):
+            batch.append(f)
+            if len(batch) >= BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
+    for start in range(0, len(col.fids), BATCH_SIZE):
+        chunk = col.fids[start:start + BATCH_SIZE]
+        req = request()
+        req.setFilterFids(chunk)
+        by_id = {f.id(): f for f in col.source.getFeatures(req)}
+        yield [by_id[fid] for fid in chunk if fid in by_id]
+
+
+def _is_empty(col: ReportColumn) -> bool:
+    return col.count == 0 or (col.fids is not None and not col.fids)
+
+
+def _column_rows(col: ReportColumn, canceled):
+    """
+    Lignes d'une colonne, par lot : [(libellé, [[libellés enfants] par relation])].
+    Les enfants sont lus lot par lot (une requête par relation et par lot).
+    """
+    label = Labeler(col.label_spec, col.fields, col.context)
+    groups = []
+    for rel in col.relations:
+        pk_idx = [col.fields.indexOf(pk) for pk, _ in rel.pairs]
+        fk_idx = [rel.fields.indexOf(fk) for _, fk in rel.pairs]
+        usable = pk_idx and min(pk_idx) >= 0 and min(fk_idx) >= 0
+        child_label = Labeler(rel.label_spec, rel.fields, rel.context) if usable else None
+        groups.append((rel, pk_idx, fk_idx, child_label))
+
+    for batch in _parent_batches(col, label.needs_geometry()):
+        if canceled():
+            return
+        keys = [[] for _ in groups]
+        for f in batch:
+            attrs = f.attributes()
+            for g, (_, pk_idx, _, child_label) in enumerate(groups):
+                key = tuple(attrs[i] for i in pk_idx) if child_label else None
+                keys[g].append(None if key is None or any(_is_null(v) for v in key) else key)
+        indexes = []
+        for (rel, _, fk_idx, child_label), batch_keys in zip(groups, keys):
+            wanted = {k for k in batch_keys if k is not None}
+            indexes.append(_children_of(rel, fk_idx, child_label, wanted, canceled) if child_label else {})
+            if canceled():
+                return
+        rows = []
+        for i, f in enumerate(batch):
+            kids = [index.get(batch_keys[i], []) for index, batch_keys in zip(indexes, keys)]
+            rows.append((label(f) or str(f.id()), kids))
+        label.counted(len(rows))
+        yield rows
+
+
+def write_html_report(out, columns, progress=None, canceled=None) -> int:
+    """
+    Écrit le rapport complet dans `out` (fichier texte ouvert) : une section
+    par colonne, entités puis enfants par relation. Retourne le nombre de lignes écrites.
+    """
+    progress = progress or (lambda pct: None)
+    canceled = canceled or (lambda: False)
+    total = sum(max(1, c.count) for c in columns) or 1
+    done = 0
+    rows = 0
+    out.write(HTML_HEAD)
+    for col in columns:
+        out.write(f"<h2>{html_escape(col.title)}</h2>\n")
+        if _is_empty(col):
+            out.write("<p class='meta'><i>Aucune entité affichée dans cette colonne.</i></p>\n")
+            done += 1
+            continue
+
+        titles = [f"→ {html_escape(rel.child_name)}" for rel in col.relations]
+        out.write("<details open><summary>Entités et relations</summary><ul>\n")
+        for batch in _column_rows(col, canceled):
+            parts = []
+            for label, kids in batch:
+                parts.append(f"<li>{html_escape(label)}")
+                if titles:
+                    parts.append("<ul>")
+                    for title, labels in zip(titles, kids):
+                        if labels:
+                            parts.append(f"<li>{title}<ul>")
+                            parts.extend(f"<li>{html_escape(k)}</li>" for k in labels)
+                            parts.append("</ul></li>")
+                            rows += len(labels)
+                        else:
+                            parts.append(f"<li>{title}</li>")
+                    parts.append("</ul>")
+                parts.append("</li>\n")
+                rows += 1
+            out.write("".join(parts))
+            done += len(batch)
+            progress(min(100.0, 100.0 * done / total))
+        if canceled():
+            return rows
+        out.write("</ul></details>\n")
+    out.write(HTML_FOOT)
+    progress(100.0)
+    return rows
+
+
+COMPACT_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Rapport LinQ</title>
+  <style>
+    body { font-family: sans-serif; margin: 1.5em; }
+    h1 { margin-bottom: 0.5em; }
+    h2 { margin-top: 1.5em; border-bottom: 1px solid #ccc; padding-bottom: 0.2em; }
+    details { margin-left: 1.2em; }
+    details > summary { cursor: pointer; font-weight: 500; }
+    ul { list-style-type: disc; margin-left: 1.5em; }
+    li { margin: 2px 0; }
+    #q { width: 28em; padding: 4px; }
+    .meta { color: #555; font-size: 0.9em; }
+    button.more { margin: 4px 0; }
+  </style>
+</head>
+<body>
+<h1>Rapport LinQ – Relations et entités visibles</h1>
+<input id="q" type="search" placeholder="Rechercher une entité (libellés de premier niveau)…">
+<div id="linq"></div>
+"""
+
+# Lecture des données et rendu à la demande : une page de lignes par colonne,
+# les relations et les enfants ne sont créés qu'à l'ouverture d'une entité.
+COMPACT_SCRIPT = """<script>
+(function () {
+  var L = JSON.parse(document.getElementById('linq-labels').textContent), LL = null;
+  var cols = [].map.call(document.querySelectorAll('script.linq-col'), function (s) { return JSON.parse(s.textContent); });
+  var PAGE = 200, root = document.getElementById('linq'), q = document.getElementById('q'), timer = null;
+  function el(tag, txt, cls) {
+    var e = document.createElement(tag);
+    if (txt != null) e.textContent = txt;
+    if (cls) e.className = cls;
+    return e;
+  }
+  function lazy(title, build) {
+    var li = el('li'), d = el('details');
+    d.appendChild(el('summary', title)); li.appendChild(d);
+    d.addEventListener('toggle', function () {
+      if (d.open && !d.built) { d.built = true; d.appendChild(build()); }
+    });
+    return li;
+  }
+  function group(title, kids) {
+    if (!kids.length) return el('li', title);
+    return lazy(title + ' (' + kids.length + ')', function () {
+      var ul = el('ul');
+      kids.forEach(function (k) { ul.appendChild(el('li', L[k])); });
+      return ul;
+    });
+  }
+  function row(c, r) {
+    if (!c.g.length) return el('li', L[r[0]]);
+    return lazy(L[r[0]], function () {
+      var ul = el('ul');
+      c.g.forEach(function (g, i) { ul.appendChild(group('→ ' + g, r[1][i])); });
+      return ul;
+    });
+  }
+  function fill(ul, c, rows, start) {
+    var end = Math.min(rows.length, start + PAGE);
+    for (var i = start; i < end; i++) ul.appendChild(row(c, rows[i]));
+    if (end < rows.length) {
+      var li = el('li'), b = el('button', 'Afficher plus (' + (rows.length - end) + ' restantes)', 'more');
+      b.onclick = function () { ul.removeChild(li); fill(ul, c, rows, end); };
+      li.appendChild(b); ul.appendChild(li);
+    }
+  }
+  function render() {
+    var needle = q.value.trim().toLowerCase();
+    if (needle && !LL) LL = L.map(function (s) { return s.toLowerCase(); });
+    root.textContent = '';
+    cols.forEach(function (c) {
+      root.appendChild(el('h2', c.t));
+      var rows = needle ? c.p.filter(function (r) { return LL[r[0]].indexOf(needle) >= 0; }) : c.p;
+      if (!rows.length) {
+        root.appendChild(el('p', needle ? 'Aucune entité ne correspond.' : 'Aucune entité affichée dans cette colonne.', 'meta'));
+        return;
+      }
+      var d = el('details'), ul = el('ul');
+      d.open = true;
+      d.appendChild(el('summary', 'Entités et relations (' + rows.length + ')'));
+      d.appendChild(ul); root.appendChild(d);
+      fill(ul, c, rows, 0);
+    });
+  }
+  q.addEventListener('input', function () { clearTimeout(timer); timer = setTimeout(render, 200); });
+  render();
+})();
+</script>
+"""
+
+
+def _json(value) -> str:
+    """JSON compact, sûr dans une balise <script>."""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def write_compact_report(out, columns, progress=None, canceled=None) -> int:
+    """
+    Rapport interactif compact : une balise JSON par colonne
+    {"t": titre, "g": [couches enfants], "p": [[libellé, [[enfants] par relation]], ...]},
+    où chaque libellé est un numéro dans la table commune écrite à la fin.
+    Les lignes partent dans le fichier lot par lot ; seule la table des libellés
+    (valeurs distinctes) est gardée en mémoire. Retourne le nombre de lignes.
+    """
+    progress = progress or (lambda pct: None)
+    canceled = canceled or (lambda: False)
+    total = sum(max(1, c.count) for c in columns) or 1
+    done = 0
+    rows = 0
+    labels = {}
+
+    def ref(text):
+        idx = labels.get(text)
+        if idx is None:
+            idx = labels[text] = len(labels)
+        return idx
+
+    out.write(COMPACT_HEAD)
+    for col in columns:
+        head = _json({"t": col.title, "g": [rel.child_name for rel in col.relations]})
+        out.write('<script type="application/json" class="linq-col">' + head[:-1] + ',"p":[')
+        first = True
+        if not _is_empty(col):
+            for batch in _column_rows(col, canceled):
+                parts = []
+                for label, kids in batch:
+                    item = [ref(label), [[ref(k) for k in group] for group in kids]] if kids else [ref(label)]
+                    parts.append(_json(item))
+                    rows += 1 + sum(len(k) for k in kids)
+                if parts:
+                    out.write(("" if first else ",\n") + ",\n".join(parts))
+                    first = False
+                done += len(batch)
+                progress(min(100.0, 100.0 * done / total))
+            if canceled():
+                return rows
+        else:
+            done += 1
+        out.write(']}</script>\n')
+
+    ordered = [None] * len(labels)
+    for text, idx in labels.items():
+        ordered[idx] = text
+    out.write('<script type="application/json" id="linq-labels">' + _json(ordered) + '</script>\n')
+    out.write(COMPACT_SCRIPT)
+    out.write(HTML_FOOT)
+    progress(100.0)
+    return rows
+
+
+class HtmlReportTask(QgsTask):
+    """Écrit le rapport en arrière-plan ; annulable depuis la barre des tâches QGIS."""
+    def __init__(self, path, columns, writer=write_html_report, description='Rapport LinQ'):
+        super().__init__(description, QgsTask.CanCancel)
+        self.path = path
+        self.columns = columns
+        self.writer = writer
+        self.rows = 0
+        self.error = None
+
+    def run(self):
+        try:
+            with timer('rapport HTML'), open(self.path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as out:
+                self.rows = self.writer(out, self.columns, self.setProgress, self.isCanceled)
+        except Exception as ex:
+            self.error = str(ex)
+            return False
+        return not self.isCanceled()
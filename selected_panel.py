@@ -11,11 +11,13 @@ from qgis.PyQt.QtWidgets import (
     QScrollArea, QTreeView, QMenu, QMessageBox, QStyle, QApplication, QCheckBox,
     QInputDialog, QSpinBox, QDialog, QDialogButtonBox, QTextEdit
 )
-from qgis.core import QgsProject, QgsVectorLayer, QgsFeature, QgsApplication
+from qgis.core import QgsProject, QgsVectorLayer, QgsFeature, QgsApplication, QgsTransaction, Qgis
 from .relation_utils import (
     find_direct_relation, children_for_relation, set_child_fk,
-    new_prefilled_link_feature
+    new_prefilled_link_feature, _pairs_parent_child
 )
+from .graph_analytics import commit_order
+from .profiling import timer, timed, count, FEATURES_READ, EXPRESSIONS_EVALUATED
 
 MIME = 'application/x-linq-feature'
 
@@ -53,6 +55,7 @@ class TreeModel(QAbstractItemModel):
         self.col = column_widget
         self.root = Node('root', 0)
 
+    @timed('arbre : reconstruction')
     def rebuild(self):
         self.beginResetModel()
         self.root = Node('root', 0)
@@ -84,6 +87,7 @@ class TreeModel(QAbstractItemModel):
             self.root.append(top)
             shown += 1
 
+        self._counted(lyr, shown)
         self.endResetModel()
         # MAJ du titre avec compteur
         try:
@@ -94,12 +98,20 @@ class TreeModel(QAbstractItemModel):
     def ensure_loaded(self, node: 'Node'):
         if node.node_type != NT_REL_GROUP or node._loaded:
             return
-        parent_feat = node.parent.feature; rel = node.relation
-        childs = children_for_relation(parent_feat, rel)
-        for ch in childs:
-            lbl = self.col.format_label_for_layer(node.layer, ch) or str(ch.id())
-            node.append(Node(lbl, NT_CHILD_FEAT, layer=node.layer, feature=ch, relation=rel, parent=node))
-        node._loaded = True
+        with timer('arbre : enfants'):
+            parent_feat = node.parent.feature; rel = node.relation
+            childs = children_for_relation(parent_feat, rel)
+            for ch in childs:
+                lbl = self.col.format_label_for_layer(node.layer, ch) or str(ch.id())
+                node.append(Node(lbl, NT_CHILD_FEAT, layer=node.layer, feature=ch, relation=rel, parent=node))
+            node._loaded = True
+        self._counted(node.layer, len(childs))
+
+    def _counted(self, layer, n):
+        """Compte n entités lues (et n expressions si le libellé est une expression), une fois par lot."""
+        count(FEATURES_READ, n)
+        if self.col.label_spec(layer)[0] == 'expr':
+            count(EXPRESSIONS_EVALUATED, n)
 
     def index(self, row, col, parent):
         parent_node = self.nodeFromIndex(parent)
@@ -573,6 +585,69 @@ class ColumnWidget(QWidget):
         # 3) Sinon, formatage général de la colonne
         return self.format_label(layer, feat)
 
+    def label_spec(self, layer):
+        """
+        Règle de libellé de `layer` dans cette colonne, sous forme transportable
+        (même priorité que format_label_for_layer) : ('expr', texte),
+        ('field', nom), ('id', None) ou ('first', None).
+        """
+        expr = self.child_display_expr.get(layer.id())
+        if expr:
+            return ('expr', expr)
+        chosen = self.child_display_field.get(layer.id())
+        if chosen == "__ID__":
+            return ('id', None)
+        if chosen:
+            return ('field', chosen)
+        if self.display_expr:
+            return ('expr', self.display_expr)
+        if self.display_field:
+            return ('field', self.display_field)
+        return ('first', None)
+
+    def report_column(self, all_features=False):
+        """
+        Copie de cette colonne pour HtmlReportTask (à appeler dans le thread principal).
+        all_features=False : entités affichées (limite Max et filtre texte respectés) ;
+        True : toutes les entités de la couche.
+        """
+        from qgis.core import QgsVectorLayerFeatureSource, QgsExpressionContext, QgsExpressionContextUtils
+        from .report_writer import ReportColumn, ReportRelation
+
+        def context(layer):
+            ctx = QgsExpressionContext()
+            ctx.appendScopes(QgsExpressionContextUtils.globalProjectLayerScopes(layer))
+            return ctx
+
+        lyr = self.layer
+        if all_features:
+            fids = None
+            count = max(0, int(lyr.featureCount()))
+        else:
+            fids = []
+            for r in range(self.proxy.rowCount()):
+                node = self.model.nodeFromIndex(self.proxy.mapToSource(self.proxy.index(r, 0)))
+                if node.feature is not None:
+                    fids.append(node.feature.id())
+            count = len(fids)
+
+        relations = []
+        selected_ids = self.provider_selected_ids()
+        child_filter = self.provider_filter_children()
+        for rel in QgsProject.instance().relationManager().relations().values():
+            if not rel.referencedLayer() or rel.referencedLayer().id() != lyr.id():
+                continue
+            child = rel.referencingLayer()
+            if child is None or (child_filter and child.id() not in selected_ids):
+                continue
+            relations.append(ReportRelation(
+                child.name(), QgsVectorLayerFeatureSource(child), child.fields(),
+                self.label_spec(child), context(child), _pairs_parent_child(rel)))
+
+        title = (self.title.text() or lyr.name()).replace("<b>", "").replace("</b>", "")
+        return ReportColumn(title, QgsVectorLayerFeatureSource(lyr), lyr.fields(),
+                            self.label_spec(lyr), context(lyr), count, fids, relations)
+
     def set_child_display_field(self, child_layer, field_name_or_id):
         if field_name_or_id not in ("__ID__",) and field_name_or_id not in child_layer.fields().names():
             return
@@ -594,67 +669,6 @@ class ColumnWidget(QWidget):
         self.child_display_field.pop(lid, None)
         self.rebuild()
 
-    # ----- Export HTML (section pour cette colonne) -----
-    def to_html_section(self) -> str:
-        """
-        Construit un fragment HTML représentant cette colonne :
-        - titre de la couche
-        - arbre filtré (selon le proxy) dans des <ul><li>
-        - le label de chaque noeud est self.model / self.proxy (donc respect
-          le champ / expression / filtre définis par l'utilisateur·ice).
-        """
-
-        def esc(s):
-            if s is None:
-                return ""
-            return (
-                str(s)
-                .replace("&", "&amp;")
-                .replace("<", "&lt;")
-                .replace(">", "&gt;")
-            )
-
-        proxy = self.proxy
-        model = self.model
-
-        # Si rien n'est affiché dans la colonne, on retourne une petite note
-        if proxy.rowCount() == 0:
-            title_txt = esc(self.layer.name())
-            return f"<h2>{title_txt}</h2><p class='meta'><i>Aucune entité affichée dans cette colonne.</i></p>"
-
-        def recurse(proxy_index):
-            # proxy_index : index dans le proxy -> on récupère le Node source
-            src_index = proxy.mapToSource(proxy_index)
-            node = model.nodeFromIndex(src_index)
-            label = esc(node.label)
-
-            # Enfants visibles (après filtrage du proxy)
-            child_count = proxy.rowCount(proxy_index)
-            if child_count == 0:
-                return f"<li>{label}</li>"
-
-            html = [f"<li>{label}<ul>"]
-            for row in range(child_count):
-                child_proxy_index = proxy.index(row, 0, proxy_index)
-                html.append(recurse(child_proxy_index))
-            html.append("</ul></li>")
-            return "".join(html)
-
-        # Titre : on nettoie un peu le titre HTML (<b>...</b>) pour le rapport
-        raw_title = self.title.text() or self.layer.name()
-        # On enlève grossièrement les balises <b> éventuelles
-        clean_title = raw_title.replace("<b>", "").replace("</b>", "")
-        h = [f"<h2>{esc(clean_title)}</h2>"]
-
-        # Arbre : racine = index invalide, on parcourt les lignes de premier niveau
-        h.append("<details open><summary>Entités et relations</summary><ul>")
-        for r in range(proxy.rowCount()):
-            idx = proxy.index(r, 0)
-            h.append(recurse(idx))
-        h.append("</ul></details>")
-
-        return "\n".join(h)
-
     # ----- Expression Builder -----
     def _open_qgis_expression_dialog(self, layer, initial_expr, window_title):
         ExprDlg = None
@@ -740,6 +754,12 @@ class ColumnWidget(QWidget):
     def _ask_commit(self, layer: QgsVectorLayer):
         if not layer.isEditable():
             return
+        if self.board:
+            # Une seule question pour toutes les couches modifiées via LinQ
+            self.board.mark_touched(layer)
+            self.board.commit_pending()
+            self._update_edit_style()
+            return
         ans = QMessageBox.question(self, "Enregistrer les modifications ?",
                                    f"Enregistrer maintenant les modifications sur « {layer.name()} » ?",
                                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
@@ -882,34 +902,36 @@ class ColumnWidget(QWidget):
             # Prévisualisation claire des changements
             pairs = list(rel_pc.fieldPairs().items())  # [(pk_parent, fk_child), ...]
             lines = []
-            for fid in ids:
-                ch = src_layer.getFeature(fid)
-                if not ch.isValid():
-                    continue
-                # PATCH: libellé de la colonne source (exactement comme affiché)
-                label = self.board.label_for(src_layer, ch) if self.board else self.format_label_for_layer(src_layer, ch)
-                for pk, fk in pairs:
-                    old = ch[fk] if fk in ch.fields().names() else None
-                    new = parent_feat[pk] if pk in parent_feat.fields().names() else None
-                    old_s = "NULL" if old in (None, "") else str(old)
-                    new_s = "NULL" if new in (None, "") else str(new)
-                    lines.append(f'{label} : {fk}  {old_s} → {new_s}')
+            with timer('dépôt : aperçu', f"{len(ids)} entité(s)"):
+                for fid in ids:
+                    ch = src_layer.getFeature(fid)
+                    if not ch.isValid():
+                        continue
+                    # PATCH: libellé de la colonne source (exactement comme affiché)
+                    label = self.board.label_for(src_layer, ch) if self.board else self.format_label_for_layer(src_layer, ch)
+                    for pk, fk in pairs:
+                        old = ch[fk] if fk in ch.fields().names() else None
+                        new = parent_feat[pk] if pk in parent_feat.fields().names() else None
+                        old_s = "NULL" if old in (None, "") else str(old)
+                        new_s = "NULL" if new in (None, "") else str(new)
+                        lines.append(f'{label} : {fk}  {old_s} → {new_s}')
 
             if not ConfirmFKDialog.ask(self, "Confirmer les mises à jour (1→N)", lines):
                 return
 
             # Application des changements (sans commit auto)
             changed = 0
-            for fid in ids:
-                ch = src_layer.getFeature(fid)
-                if ch.isValid() and set_child_fk(src_layer, rel_pc, parent_feat, ch):
-                    changed += 1
+            with timer('dépôt', f"1→N, {len(ids)} entité(s)"):
+                for fid in ids:
+                    ch = src_layer.getFeature(fid)
+                    if ch.isValid() and set_child_fk(src_layer, rel_pc, parent_feat, ch):
+                        changed += 1
 
             src_layer.triggerRepaint()
             self._mb(f'Relation posée (1→N) sur {changed} entité(s). Enregistre quand tu veux.')
             # PATCH: maj des crayons de toutes les colonnes affichant cette couche
             if self.board:
-                self.board.refresh_edit_state_for(src_layer)
+                self.board.mark_touched(src_layer)
             else:
                 self._update_edit_style()
             self.rebuild()
@@ -942,12 +964,13 @@ class ColumnWidget(QWidget):
             if not ConfirmFKDialog.ask(self, "Confirmer les mises à jour (1→N)", lines):
                 return
 
-            ok = set_child_fk(tgt_layer, rel_cp, parent_feat, child_feat)
+            with timer('dépôt', "1→N, 1 entité"):
+                ok = set_child_fk(tgt_layer, rel_cp, parent_feat, child_feat)
             tgt_layer.triggerRepaint()
             self._mb('Relation posée (1→N). Enregistre quand tu veux.' if ok else 'Échec de la mise à jour (1→N).',
                      0 if ok else 2)
             if self.board:
-                self.board.refresh_edit_state_for(tgt_layer)
+                self.board.mark_touched(tgt_layer)
             else:
                 self._update_edit_style()
             self.rebuild()
@@ -1038,30 +1061,31 @@ class ColumnWidget(QWidget):
             created_links = []
 
             # 3) Pour CHAQUE entité glissée, on crée une ligne dans la table d’assoc
-            for fid in ids:
-                src_feat = src_layer.getFeature(fid)
-                if not src_feat.isValid():
-                    continue
+            with timer('dépôt', f"N↔N, {len(ids)} entité(s)"):
+                for fid in ids:
+                    src_feat = src_layer.getFeature(fid)
+                    if not src_feat.isValid():
+                        continue
 
-                try:
-                    link_feat = new_prefilled_link_feature(L, rel_src, rel_tgt, src_feat, target_feat)
-                except KeyError as ex:
-                    self._mb(f"FK introuvable dans la table d’association : {ex}", 2)
-                    continue
+                    try:
+                        link_feat = new_prefilled_link_feature(L, rel_src, rel_tgt, src_feat, target_feat)
+                    except KeyError as ex:
+                        self._mb(f"FK introuvable dans la table d’association : {ex}", 2)
+                        continue
 
-                if not L.addFeature(link_feat):
-                    continue
+                    if not L.addFeature(link_feat):
+                        continue
 
-                # On essaie de récupérer la version "vue par la couche"
-                try:
-                    persisted = L.getFeature(link_feat.id())
-                except Exception:
-                    persisted = link_feat
+                    # On essaie de récupérer la version "vue par la couche"
+                    try:
+                        persisted = L.getFeature(link_feat.id())
+                    except Exception:
+                        persisted = link_feat
 
-                if persisted and persisted.isValid():
-                    created_links.append(persisted)
-                else:
-                    created_links.append(link_feat)
+                    if persisted and persisted.isValid():
+                        created_links.append(persisted)
+                    else:
+                        created_links.append(link_feat)
 
             if not created_links:
                 self._mb("Impossible d’ajouter dans la table d’association.", 2)
@@ -1070,7 +1094,7 @@ class ColumnWidget(QWidget):
             # 4) Mise à jour visuelle / crayons
             L.triggerRepaint()
             if self.board:
-                self.board.refresh_edit_state_for(L)
+                self.board.mark_touched(L)
             else:
                 self._update_edit_style()
 
@@ -1111,6 +1135,12 @@ class SelectionBoard(QWidget):
         self.btn_reload = QPushButton('Actualiser')
         self.btn_reload.setToolTip("Recharger les colonnes affichées")
         self.btn_clear = QPushButton('Vider')
+        self.btn_commit_all = QPushButton('Tout enregistrer')
+        self.btn_commit_all.setToolTip("Enregistrer en une fois les modifications LinQ en attente "
+                                       "(parents avant enfants, tables de liaison en dernier)")
+        self.btn_commit_all.setEnabled(False)
+        self._touched = set()   # couches modifiées via LinQ (drops, détachements, associations)
+        self._commit_rank_cache = None   # (snapshot, {id couche: rang d'enregistrement})
         self.chkFilterChildren = QCheckBox("Filtrer l'affichage des entités enfants selon les tables chargées")
 
         self.spinMax = QSpinBox()
@@ -1122,7 +1152,7 @@ class SelectionBoard(QWidget):
         bar.addStretch(1)
         bar.addWidget(QLabel("Max:")); bar.addWidget(self.spinMax)
         bar.addWidget(self.chkFilterChildren)
-        bar.addWidget(self.btn_reload); bar.addWidget(self.btn_clear)
+        bar.addWidget(self.btn_reload); bar.addWidget(self.btn_clear); bar.addWidget(self.btn_commit_all)
         root.addLayout(bar)
 
         self.scroll = QScrollArea(); self.scroll.setWidgetResizable(True)
@@ -1137,6 +1167,7 @@ class SelectionBoard(QWidget):
         self.btn_add.clicked.connect(self.add_selected_layer)
         self.btn_clear.clicked.connect(self.clear_columns)
         self.btn_reload.clicked.connect(self.reload_columns)
+        self.btn_commit_all.clicked.connect(lambda: self.commit_pending())
         self.chkFilterChildren.toggled.connect(self._on_filter_children_toggled)
         self.spinMax.valueChanged.connect(self._on_max_changed)
 
@@ -1259,29 +1290,204 @@ class SelectionBoard(QWidget):
         """Force le rafraîchissement du style 'crayon' pour toutes
         les colonnes affichant cette couche."""
         lid = layer.id()
+        try:
+            if not (layer.isEditable() and layer.isModified()):
+                self._touched.discard(lid)   # enregistrée ou annulée
+        except Exception:
+            pass
         for c in getattr(self, "columns", []):
             try:
                 if c.layer.id() == lid:
                     c._update_edit_style()
             except Exception:
                 pass
+        self._update_commit_button()
+
+    def mark_touched(self, layer):
+        """À appeler après une modification faite par LinQ (dépôt, détachement, association)."""
+        try:
+            if layer.isEditable() and layer.isModified():
+                self._touched.add(layer.id())
+        except Exception:
+            pass
+        self.refresh_edit_state_for(layer)
+
+    # ----- Enregistrement groupé des modifications LinQ -----
+    def _commit_rank(self) -> dict:
+        """{id couche: rang d'enregistrement}, calculé une fois par snapshot."""
+        if self._commit_rank_cache is None or self._commit_rank_cache[0] is not self.snapshot:
+            order = commit_order(self.snapshot) if self.snapshot else []
+            self._commit_rank_cache = (self.snapshot, {lid: i for i, lid in enumerate(order)})
+        return self._commit_rank_cache[1]
+
+    def pending_layers(self):
+        """Couches modifiées via LinQ ayant encore des modifications non enregistrées (sans effet de bord)."""
+        prj = QgsProject.instance()
+        out = []
+        for lid in self._touched:
+            lyr = prj.mapLayer(lid)
+            try:
+                if isinstance(lyr, QgsVectorLayer) and lyr.isEditable() and lyr.isModified():
+                    out.append(lyr)
+            except Exception:
+                pass
+        # Parents avant enfants, tables de liaison en dernier
+        rank = self._commit_rank()
+        out.sort(key=lambda l: (rank.get(l.id(), len(rank)), l.name().lower()))
+        return out
+
+    @staticmethod
+    def _modified(layers):
+        out = []
+        for lyr in layers:
+            try:
+                if isinstance(lyr, QgsVectorLayer) and lyr.isEditable() and lyr.isModified():
+                    out.append(lyr)
+            except Exception:
+                pass
+        return out
 
-    # ----- Construction du rapport HTML pour toutes les colonnes -----
-    def build_html_report(self) -> str:
+    def _also_committed(self, project, mode, layers):
         """
-        Construit le corps HTML du rapport à partir de TOUTES les colonnes
-        actuellement affichées dans LinQ (ordre gauche → droite).
+        Couches hors LinQ que le commit enregistrera aussi : en mode « buffered »,
+        toutes les couches modifiées du projet ; avec des groupes de transactions,
+        les autres couches modifiées des groupes concernés.
         """
-        parts = []
-        for col in self.columns:
+        if mode == 'buffered':
             try:
-                section = col.to_html_section()
-            except Exception as ex:
-                # On évite que tout casse à cause d'une colonne
-                name = getattr(col.layer, 'name', lambda: '<?>')()
-                section = (
-                    f"<h2>{name}</h2>"
-                    f"<p class='meta' style='color:red'>Erreur dans cette colonne : {ex}</p>"
-                )
-            parts.append(section)
-        return "\n".join(parts)
\ No newline at end of file
+                others = project.editBufferGroup().modifiedLayers()
+            except AttributeError:
+                others = project.mapLayers().values()
+        elif mode == 'groups':
+            others = []
+            for lyr in layers:
+                group = self._transaction_group(project, lyr)
+                if group is not None:
+                    others += list(group.layers())
+        else:
+            return []
+        ids = {l.id() for l in layers}
+        seen, out = set(), []
+        for lyr in self._modified(others):
+            if lyr.id() not in ids and lyr.id() not in seen:
+                seen.add(lyr.id())
+                out.append(lyr)
+        return sorted(out, key=lambda l: l.name().lower())
+
+    @staticmethod
+    def _group_key(layer):
+        """(fournisseur, chaîne de connexion) : identifie le groupe de transactions de la couche."""
+        return layer.providerType(), QgsTransaction.connectionString(layer.source())
+
+    @classmethod
+    def _transaction_group(cls, project, layer):
+        try:
+            return project.transactionGroup(*cls._group_key(layer))
+        except Exception:
+            return None
+
+    def _update_commit_button(self):
+        n = len(self.pending_layers())
+        self.btn_commit_all.setEnabled(n > 0)
+        self.btn_commit_all.setText(f'Tout enregistrer ({n})' if n else 'Tout enregistrer')
+        self.btn_commit_all.setStyleSheet("QPushButton { color: white; background:#d11; }" if n else "")
+
+    @staticmethod
+    def _change_count(layer) -> int:
+        buf = layer.editBuffer()
+        if not buf:
+            return 0
+        return (len(buf.addedFeatures()) + len(buf.changedAttributeValues())
+                + len(buf.deletedFeatureIds()) + len(buf.changedGeometries()))
+
+    @staticmethod
+    def _transaction_mode(project) -> str:
+        """'groups' (groupes de transactions automatiques), 'buffered' ou '' (aucun)."""
+        try:
+            mode = project.transactionMode()
+            if mode == Qgis.TransactionMode.AutomaticGroups:
+                return 'groups'
+            if mode == Qgis.TransactionMode.BufferedGroups:
+                return 'buffered'
+            return ''
+        except AttributeError:
+            try:
+                return 'groups' if project.autoTransaction() else ''
+            except Exception:
+                return ''
+
+    def commit_pending(self, ask=True) -> bool:
+        """
+        Enregistre toutes les modifications LinQ en attente, en une fois :
+        - groupes de transactions du projet : un seul commit par groupe
+          (tout ou rien côté base, les modifications restent en attente en cas d'échec) ;
+        - mode « buffered » du projet : un seul commit pour toutes les couches ;
+          les couches hors LinQ qu'un tel commit enregistre aussi sont listées
+          dans la confirmation ;
+        - sinon : couches enregistrées dans l'ordre des relations (parents
+          d'abord) ; au premier échec on s'arrête, les couches suivantes
+          gardent leurs modifications en attente.
+        """
+        layers = self.pending_layers()
+        if not layers:
+            self._update_commit_button()
+            return True
+        prj = QgsProject.instance()
+        mode = self._transaction_mode(prj)
+        extra = self._also_committed(prj, mode, layers)
+        if ask:
+            lines = [f"{i}. {l.name()} : {self._change_count(l)} modification(s)"
+                     for i, l in enumerate(layers, start=1)]
+            if extra:
+                lines += ["", "Enregistrées aussi (même transaction, modifications hors LinQ) :"]
+                lines += [f"- {l.name()} : {self._change_count(l)} modification(s)" for l in extra]
+            if not ConfirmFKDialog.ask(self, "Enregistrer toutes les modifications LinQ ?", lines):
+                return False
+
+        errors = []
+        done = []
+        if mode == 'buffered':
+            ok, errs = prj.commitChanges(True, layers[0])
+            if ok:
+                done = list(layers)
+            else:
+                errors += list(errs) or ["Échec de l'enregistrement groupé."]
+        else:
+            committed_groups = set()
+            for lyr in layers:
+                group = None
+                if mode == 'groups':
+                    group = self._transaction_group(prj, lyr)
+                # Clé stable : l'enveloppe Python du groupe est recréée à chaque appel
+                key = self._group_key(lyr) if group is not None else None
+                if key is not None and key in committed_groups:
+                    done.append(lyr)      # déjà enregistrée avec son groupe
+                    continue
+                if lyr.commitChanges():
+                    done.append(lyr)
+                    if key is not None:
+                        committed_groups.add(key)
+                    continue
+                errors.append(f"« {lyr.name()} » : " + "; ".join(lyr.commitErrors() or ["échec"]))
+                if group is not None:
+                    # Rien n'a été écrit pour ce groupe : les modifications restent en attente
+                    errors.append("Groupe de transactions : rien n'a été validé pour ce groupe.")
+                break
+
+        for lyr in layers + extra:
+            self.refresh_edit_state_for(lyr)
+        if errors:
+            remaining = [l.name() for l in layers if l not in done]
+            msg = "\n".join(errors)
+            if done:
+                msg += "\n\nDéjà enregistrées : " + ", ".join(l.name() for l in done)
+            if remaining:
+                msg += "\nToujours en attente : " + ", ".join(remaining)
+            QMessageBox.warning(self, "Échec de l'enregistrement", msg)
+            return False
+        _push_bar(self.iface, 'ok', f"Modifications enregistrées sur {len(done)} couche(s).")
+        return True
+
+    def report_columns(self, all_features=False):
+        """Colonnes à passer à HtmlReportTask (ordre gauche → droite)."""
+        return [col.report_column(all_features) for col in self.columns]
\ No newline at end of file